@@ -1,7 +1,53 @@
+"""
+measurements of galaxy statistics relevant for LSS studies from the literature
+
+Submodules and the functions listed in `__all__` are imported on first
+attribute access, so ``import lss_observations`` does not load astropy,
+scipy or any measurement until one is needed.
+"""
+
 from __future__ import (absolute_import, division, print_function, unicode_literals)
 
-from .yang_2012_wp import yang_2012_wp
-from .zehavi_2011_wp import zehavi_2011_wp
-from .hearin_2014_wp import hearin_2014_wp
-from .watson_2014_wp import watson_2014_wp
-from .campbell_2016_wp import campbell_2016_wp
\ No newline at end of file
+from .lazy import lazy_package
+
+#public name -> submodule defining it, None for the submodules themselves
+_lazy_attributes = {
+    'yang_2012_wp': 'yang_2012_wp',
+    'zehavi_2011_wp': 'zehavi_2011_wp',
+    'hearin_2014_wp': 'hearin_2014_wp',
+    'watson_2014_wp': 'watson_2014_wp',
+    'campbell_2016_wp': 'campbell_2016_wp',
+    'yang_2012_wp_bins': 'yang_2012_wp',
+    'zehavi_2011_wp_bins': 'zehavi_2011_wp',
+    'hearin_2014_wp_bins': 'hearin_2014_wp',
+    'watson_2014_wp_bins': 'watson_2014_wp',
+    'campbell_2016_wp_bins': 'campbell_2016_wp',
+    'watson_2014_delta_sigma': 'watson_2014_delta_sigma',
+    'watson_2014_wp_delta_sigma': 'watson_2014_delta_sigma',
+    'Covariance': 'covariance',
+    'abundance_matching': None,
+    'binary_store': None,
+    'catalog': None,
+    'chunked': None,
+    'compression': None,
+    'covariance': None,
+    'fetch': None,
+    'incomplete_gamma': None,
+    'instrumentation': None,
+    'likelihood': None,
+    'littleh': None,
+    'luminosity_functions': None,
+    'measurement_registry': None,
+    'sampling': None,
+    'shared_data': None,
+    'stacking': None,
+    'stellar_mass_functions': None,
+    'wp_interpolation': None,
+}
+
+__all__ = ['yang_2012_wp', 'zehavi_2011_wp', 'hearin_2014_wp', 'watson_2014_wp',
+           'campbell_2016_wp', 'yang_2012_wp_bins', 'zehavi_2011_wp_bins',
+           'hearin_2014_wp_bins', 'watson_2014_wp_bins', 'campbell_2016_wp_bins',
+           'watson_2014_delta_sigma', 'watson_2014_wp_delta_sigma', 'Covariance']
+
+lazy_package(__name__, _lazy_attributes)
@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+
+"""
+abundance matching with inverse cumulative number density tables
+"""
+
+from __future__ import (division, print_function, absolute_import, unicode_literals)
+import numpy as np
+from .measurement_registry import MeasurementRegistry
+
+__all__ = ['CumulativeTable', 'cumulative_table', 'abundance_match']
+
+#cumulative tables, keyed by model class, parameters and grid
+_tables = MeasurementRegistry(maxsize=64, name='cumulative_tables')
+
+#default grids, log10 stellar mass in Msol/h^2 and absolute magnitude
+DEFAULT_MSTAR_RANGE = (7.0, 13.0)
+DEFAULT_MAG_RANGE = (-25.0, -14.0)
+
+#error estimates are reported for the part of a table above this cumulative
+#number density in h^3 Mpc^-3, about one object per (2 Gpc/h)^3
+MIN_NUMBER_DENSITY = 1e-10
+
+
+class CumulativeTable(object):
+    """
+    monotone table of cumulative number density for abundance matching
+
+    For stellar mass functions the table holds n(>mstar), for luminosity
+    functions n(<mag), i.e. the number density of galaxies brighter than
+    mag.  Thresholds are found by linear interpolation in log10(n), which is
+    a smooth function of log10(mstar) or magnitude.
+
+    Attributes
+    ----------
+    x : numpy.ndarray
+        grid of log10(mstar) or absolute magnitude
+
+    log_n : numpy.ndarray
+        log10 of the cumulative number density on `x`, strictly decreasing
+        in the direction of brighter or more massive galaxies
+
+    interpolation_error : float
+        estimate of the maximum error of `threshold` in dex (or magnitudes)
+        due to interpolating the table, for number densities above
+        `MIN_NUMBER_DENSITY`
+
+    quadrature_error : float
+        estimate of the maximum error of `threshold` in dex (or magnitudes)
+        due to integrating the model numerically.  Zero if the model has an
+        analytic cumulative number density.
+
+    error : float
+        sum of `interpolation_error` and `quadrature_error`
+    """
+
+    def __init__(self, x, log_n, magnitudes=False, interpolation_error=0.0,
+                 quadrature_error=0.0):
+        """
+        Parameters
+        ----------
+        x : array_like
+            increasing grid of log10(mstar) or absolute magnitude
+
+        log_n : array_like
+            log10 of the cumulative number density on `x`
+
+        magnitudes : bool
+            True if `x` are magnitudes
+        """
+
+        self.magnitudes = magnitudes
+        x = np.asarray(x, dtype=float)
+        log_n = np.asarray(log_n, dtype=float)
+
+        #keep the part of the table that is strictly monotone and finite
+        keep = np.isfinite(log_n)
+        x, log_n = x[keep], log_n[keep]
+        if magnitudes:
+            keep = np.concatenate([[True], np.diff(log_n) > 0])
+        else:
+            keep = np.concatenate([np.diff(log_n) < 0, [True]])
+        x, log_n = x[keep], log_n[keep]
+        if len(x) < 2:
+            msg = ("the model has no finite number density on the table grid.")
+            raise ValueError(msg)
+
+        #np.interp needs increasing abscissae
+        order = np.argsort(log_n)
+        self.x = x
+        self.log_n = log_n
+        self._xp = log_n[order]
+        self._fp = x[order]
+        for a in (self.x, self.log_n, self._xp, self._fp):
+            a.setflags(write=False)
+
+        self.interpolation_error = float(interpolation_error)
+        self.quadrature_error = float(quadrature_error)
+
+    @property
+    def error(self):
+        """
+        estimated error bound of `threshold` in dex (or magnitudes)
+        """
+        return self.interpolation_error + self.quadrature_error
+
+    @property
+    def n_range(self):
+        """
+        (min, max) cumulative number density covered by the table
+        """
+        return 10.0**self._xp[0], 10.0**self._xp[-1]
+
+    def threshold(self, n, log=False):
+        """
+        stellar mass or magnitude threshold at cumulative number density `n`
+
+        Parameters
+        ----------
+        n : array_like
+            cumulative number density in units h^3 Mpc^-3
+
+        log : bool
+            if True, return log10(mstar) instead of mstar.  Ignored for
+            luminosity functions.
+
+        Returns
+        -------
+        x : numpy.ndarray
+            stellar mass in units Msol/h^2, or absolute magnitude in units
+            Mag - 5log(h).  NaN where `n` is outside of `n_range`.
+        """
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_n = np.log10(np.asarray(n, dtype=float))
+        x = np.interp(log_n, self._xp, self._fp, left=np.nan, right=np.nan)
+        if self.magnitudes or log:
+            return x
+        return 10.0**x
+
+    def number_density(self, x, log=False):
+        """
+        cumulative number density at stellar mass or magnitude `x`
+
+        Parameters
+        ----------
+        x : array_like
+            stellar mass in units Msol/h^2, or absolute magnitude
+
+        log : bool
+            if True, `x` is log10(mstar).  Ignored for luminosity functions.
+
+        Returns
+        -------
+        n : numpy.ndarray
+            cumulative number density in units h^3 Mpc^-3, NaN outside of
+            the table grid
+        """
+
+        x = np.asarray(x, dtype=float)
+        if not (self.magnitudes or log):
+            x = np.log10(x)
+        log_n = np.interp(x, self.x, self.log_n, left=np.nan, right=np.nan)
+        return 10.0**log_n
+
+
+def cumulative_table(model, x_range=None, n_points=4001):
+    """
+    build (or return the cached) cumulative number density table of a model
+
+    Parameters
+    ----------
+    model : object
+        a stellar mass function from `stellar_mass_functions` or a luminosity
+        function from `luminosity_functions`, i.e. an object with `params`
+        and `phi_grid`.  If it has a `number_density` method the table is
+        built from the analytic cumulative number density.
+
+    x_range : tuple, optional
+        (min, max) of the table in log10(mstar / Msol h^-2), or absolute
+        magnitude for luminosity functions.  Models without an analytic
+        number density are integrated numerically and truncated at the
+        bright/massive end of the range.
+
+    n_points : int
+        number of grid points, must be odd
+
+    Returns
+    -------
+    table : CumulativeTable
+
+    Notes
+    -----
+    Tables are cached on the model class, its parameters and the grid, so
+    repeated calls with the same model are free; a model whose attributes
+    are changed in place gets a new table.
+    """
+
+    magnitudes = _is_luminosity_function(model)
+    if x_range is None:
+        x_range = DEFAULT_MAG_RANGE if magnitudes else DEFAULT_MSTAR_RANGE
+    x_range = (float(x_range[0]), float(x_range[1]))
+    if not x_range[0] < x_range[1]:
+        msg = ("`x_range` must be increasing.")
+        raise ValueError(msg)
+    n_points = int(n_points)
+    if n_points < 5 or n_points % 2 == 0:
+        msg = ("`n_points` must be an odd integer >= 5.")
+        raise ValueError(msg)
+
+    params = tuple(np.asarray(model.params, dtype=float).ravel())
+    key = (type(model).__name__, params, getattr(model, 'littleh', None), x_range, n_points)
+    return _tables.get(key, lambda: _build_table(model, x_range, n_points, magnitudes))
+
+
+def abundance_match(model, n, x_range=None, n_points=4001, log=False):
+    """
+    map cumulative number densities to stellar mass or magnitude thresholds
+
+    Parameters
+    ----------
+    model : object
+        a stellar mass or luminosity function, see `cumulative_table`
+
+    n : array_like
+        cumulative number densities in units h^3 Mpc^-3, e.g. n(>Mhalo) of
+        the halos in a simulation box
+
+    x_range, n_points :
+        table grid, see `cumulative_table`
+
+    log : bool
+        if True, return log10(mstar) for stellar mass functions
+
+    Returns
+    -------
+    x : numpy.ndarray
+        stellar mass in units Msol/h^2 or absolute magnitude, such that the
+        model predicts a cumulative number density `n` of more massive (or
+        brighter) galaxies.  NaN where `n` is not covered by the table.
+
+    Examples
+    --------
+    >>> from lss_observations.stellar_mass_functions import LiWhite_2009_phi
+    >>> mstar = abundance_match(LiWhite_2009_phi(), n_halo)
+    """
+
+    table = cumulative_table(model, x_range=x_range, n_points=n_points)
+    return table.threshold(n, log=log)
+
+
+def _is_luminosity_function(model):
+    from .luminosity_functions import Blanton_2003_phi
+    return isinstance(model, Blanton_2003_phi)
+
+
+def _build_table(model, x_range, n_points, magnitudes):
+    """
+    integrate a model on a grid and estimate the errors of the inverse table
+    """
+
+    x = np.linspace(x_range[0], x_range[1], n_points)
+    h = x[1] - x[0]
+
+    quadrature_error = 0.0
+    if magnitudes:
+        #analytic, n(<mag)
+        n = model.number_density(-np.inf, x)
+    elif hasattr(model, 'number_density'):
+        #analytic, n(>mstar)
+        n = model.number_density(10.0**x, np.inf)
+    else:
+        phi = model.phi_grid(10.0**x)[0]
+        #n(>x) by the trapezoid rule from the massive end of the grid, and
+        #with twice the step size for a Richardson estimate of the error
+        n = _reverse_cumtrapz(phi, h)
+        n2 = _reverse_cumtrapz(phi[::2], 2.0*h)
+        dn = np.abs(n[::2] - n2)/3.0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dx = dn/phi[::2]
+        dx = dx[np.isfinite(dx) & (n[::2] > MIN_NUMBER_DENSITY)]
+        quadrature_error = dx.max() if len(dx) else 0.0
+
+    with np.errstate(divide='ignore'):
+        log_n = np.log10(n)
+    log_n[~(n > 0)] = -np.inf
+
+    #interpolation error: invert a table of every other point and compare
+    #with the skipped points, scaled by 1/4 for the second order error of
+    #linear interpolation at the full resolution
+    half = CumulativeTable(x[::2], log_n[::2], magnitudes=magnitudes)
+    test = log_n[1::2] > np.log10(MIN_NUMBER_DENSITY)
+    x_test = np.interp(log_n[1::2][test], half._xp, half._fp, left=np.nan, right=np.nan)
+    dx = np.abs(x_test - x[1::2][test])
+    dx = dx[np.isfinite(dx)]
+    interpolation_error = dx.max()/4.0 if len(dx) else 0.0
+
+    return CumulativeTable(x, log_n, magnitudes=magnitudes,
+                           interpolation_error=interpolation_error,
+                           quadrature_error=quadrature_error)
+
+
+def _reverse_cumtrapz(y, h):
+    """
+    cumulative trapezoid integral of `y` from each point to the end of the grid
+    """
+    y = y[::-1]
+    n = np.concatenate([[0.0], np.cumsum(0.5*h*(y[1:] + y[:-1]))])
+    return n[::-1]
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+"""
+package import time
+"""
+
+from __future__ import (division, print_function, absolute_import, unicode_literals)
+import os
+import subprocess
+import sys
+from .common import package_dir, package_name
+
+#statement run in a fresh interpreter for each measurement
+_setup = "import sys; sys.path.insert(0, {0!r})".format(os.path.dirname(package_dir))
+
+
+class TimeImport(object):
+    """
+    time ``import lss_observations`` in a fresh interpreter
+    """
+
+    repeat = 5
+
+    def timeraw_import_package(self):
+        return _setup + "\nimport {0}".format(package_name)
+
+    def timeraw_import_stellar_mass_functions(self):
+        return _setup + "\nimport {0}.stellar_mass_functions".format(package_name)
+
+    def track_import_time(self):
+        """
+        minimum wall time of the package import in seconds, as reported by
+        ``python -X importtime``
+        """
+        return min(import_time() for i in range(self.repeat))
+    track_import_time.unit = 'seconds'
+
+
+def import_time(module=None):
+    """
+    cumulative import time in seconds of `module` in a fresh interpreter
+
+    Parameters
+    ----------
+    module : string, optional
+        module to import, default is the package itself
+    """
+
+    if module is None:
+        module = package_name
+    code = _setup + "\nimport {0}".format(module)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    #the last line is the requested module, "import time: self | cumulative | name"
+    for line in reversed(result.stderr.splitlines()):
+        fields = [f.strip() for f in line.split('|')]
+        if len(fields) == 3 and fields[2] == module:
+            return int(fields[1])*1e-6
+    msg = ("could not find {0} in the import time report.".format(module))
+    raise RuntimeError(msg)
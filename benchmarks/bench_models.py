@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+"""
+construction and evaluation of the stellar mass and luminosity functions
+"""
+
+from __future__ import (division, print_function, absolute_import, unicode_literals)
+import numpy as np
+from .common import import_package
+
+SMF_MODELS = ['LiWhite_2009_phi', 'Baldry_2011_phi', 'Yang_2012_phi', 'Tomczak_2014_phi']
+BANDS = ['u', 'g', 'r', 'i', 'z']
+MODELS = SMF_MODELS + ['Blanton_2003_phi-'+band for band in BANDS]
+TABULATED_MODELS = ['Blanton_2003_phi-'+band+'-tabulated' for band in BANDS]
+
+SIZES = [10, 10**3, 10**5, 10**7]
+
+
+def make_model(name):
+    """
+    construct a model by name, 'Blanton_2003_phi-<band>[-tabulated]' for the
+    luminosity functions
+    """
+
+    if name.startswith('Blanton_2003_phi'):
+        luminosity_functions = import_package('luminosity_functions')
+        parts = name.split('-')
+        mode = parts[2] if len(parts) > 2 else 'schechter'
+        return luminosity_functions.Blanton_2003_phi(band=parts[1], mode=mode)
+    stellar_mass_functions = import_package('stellar_mass_functions')
+    return getattr(stellar_mass_functions, name)()
+
+
+def make_input(name, size, seed=0):
+    """
+    random stellar masses in Msol/h^2 or absolute magnitudes
+    """
+
+    rng = np.random.default_rng(seed)
+    if name.startswith('Blanton_2003_phi'):
+        return rng.uniform(-24.0, -16.0, size)
+    return 10.0**rng.uniform(8.0, 12.0, size)
+
+
+class TimeConstruction(object):
+    """
+    construction of each model
+    """
+
+    params = [MODELS]
+    param_names = ['model']
+
+    def setup(self, name):
+        #import outside of the timed function
+        make_model(name)
+
+    def time_construct(self, name):
+        make_model(name)
+
+
+class TimeCall(object):
+    """
+    `__call__` on arrays of increasing size
+    """
+
+    params = [MODELS + TABULATED_MODELS, SIZES]
+    param_names = ['model', 'size']
+    timeout = 300
+
+    def setup(self, name, size):
+        self.model = make_model(name)
+        self.x = make_input(name, size)
+        try:
+            self.model(self.x[:10])
+        except ImportError:
+            #optional dependency of the model is not installed
+            raise NotImplementedError()
+
+    def time_call(self, name, size):
+        self.model(self.x)
+
+
+class TimeNumberDensity(object):
+    """
+    `number_density` of the models that have one, for arrays of limits
+    """
+
+    params = [MODELS, [1, 10**3, 10**5]]
+    param_names = ['model', 'size']
+
+    def setup(self, name, size):
+        self.model = make_model(name)
+        if not hasattr(self.model, 'number_density'):
+            raise NotImplementedError()
+        x = np.sort(make_input(name, 2*size).reshape(2, size), axis=0)
+        self.a, self.b = x[0], x[1]
+
+    def time_number_density(self, name, size):
+        self.model.number_density(self.a, self.b)
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+"""
+cold and warm calls of the wp loaders for every sample and bin
+"""
+
+from __future__ import (division, print_function, absolute_import, unicode_literals)
+import math
+from .common import import_package
+
+#(loader, keyword arguments) of every measurement offered by the loaders
+WP_CASES = []
+for sample in ['Volume1', 'Volume2', 'Mass-limit']:
+    for lo, hi in [(9.0, 9.5), (9.5, 10.0), (10.0, 10.5), (10.5, 11.0), (11.0, 11.5)]:
+        WP_CASES.append(('yang_2012_wp', dict(min_mstar=10**lo, max_mstar=10**hi, sample=sample)))
+for sample in ['all', 'blue', 'red']:
+    for lo in [-23.0, -22.0, -21.0, -20.0, -19.0, -18.0]:
+        WP_CASES.append(('zehavi_2011_wp', dict(Mr_min=lo, Mr_max=lo+1.0, sample=sample)))
+for hi in [-22.0, -21.5, -21.0, -20.5, -20.0, -19.5, -19.0, -18.5, -18.0]:
+    WP_CASES.append(('zehavi_2011_wp', dict(Mr_min=None, Mr_max=hi, sample='all')))
+for loader in ['hearin_2014_wp', 'watson_2014_wp']:
+    for sample in ['all', 'red', 'blue']:
+        for thresh in [9.49, 9.89, 10.29]:
+            WP_CASES.append((loader, dict(mstar_thresh=10**thresh, sample=sample)))
+for method in ['theta_weights', 'nearest_neighbor']:
+    for sample in ['all', 'blue', 'red']:
+        for lo, hi in [(9.5, 10.0), (10.0, 10.5), (10.5, 11.0), (11.0, 11.5)]:
+            WP_CASES.append(('campbell_2016_wp', dict(min_mstar=10**lo, max_mstar=10**hi,
+                                                      method=method, sample=sample)))
+
+
+def _label(case):
+    loader, kwargs = case
+    args = ','.join('{0}={1}'.format(k, _format(kwargs[k])) for k in sorted(kwargs))
+    return '{0}({1})'.format(loader, args)
+
+
+def _format(value):
+    if isinstance(value, float) and value > 1e3:
+        return '1e{0:.2f}'.format(math.log10(value))
+    return str(value)
+
+
+_cases = dict((_label(case), case) for case in WP_CASES)
+
+
+class _WpBenchmark(object):
+
+    params = [sorted(_cases)]
+    param_names = ['measurement']
+
+    def setup(self, label):
+        package = import_package()
+        self.registry = import_package('measurement_registry').registry
+        loader, self.kwargs = _cases[label]
+        self.loader = getattr(package, loader)
+        try:
+            self.loader(**self.kwargs)
+        except (IOError, OSError, ValueError):
+            #the measurement is listed by the loader but not available
+            raise NotImplementedError()
+
+
+class TimeWpCold(_WpBenchmark):
+    """
+    first call of a loader, with an empty measurement cache
+
+    The binary store is already open, so this times parsing the store views
+    into a measurement rather than building the store.
+    """
+
+    number = 1
+    repeat = 10
+
+    def setup(self, label):
+        _WpBenchmark.setup(self, label)
+        self.registry.clear()
+
+    def time_call(self, label):
+        self.loader(**self.kwargs)
+
+
+class TimeWpWarm(_WpBenchmark):
+    """
+    repeated call of a loader, answered by the measurement cache
+    """
+
+    def time_call(self, label):
+        self.loader(**self.kwargs)
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+
+"""
+shared helpers for the benchmarks
+"""
+
+from __future__ import (division, print_function, absolute_import, unicode_literals)
+import importlib
+import os
+import sys
+
+__all__ = ['package_dir', 'package_name', 'import_package']
+
+#the benchmarks live in a subdirectory of the package
+package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+package_name = os.path.basename(package_dir)
+
+
+def import_package(submodule=None):
+    """
+    import the package, or one of its submodules, by its directory name
+    """
+
+    parent = os.path.dirname(package_dir)
+    if parent not in sys.path:
+        sys.path.insert(0, parent)
+    name = package_name if submodule is None else package_name+'.'+submodule
+    return importlib.import_module(name)
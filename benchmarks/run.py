@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+
+"""
+minimal runner for the asv-style benchmarks in this directory
+
+The benchmark modules follow the airspeed velocity (asv) conventions, so they
+can also be run with asv: classes with ``time_*``, ``timeraw_*`` and
+``track_*`` methods, optional ``setup``, ``params``/``param_names``,
+``number`` and ``repeat`` attributes, and ``NotImplementedError`` raised in
+``setup`` to skip a parameter combination.
+
+Usage::
+
+    python -m benchmarks.run                      # run everything
+    python -m benchmarks.run -b TimeWpWarm        # benchmarks matching a regex
+    python -m benchmarks.run --compare benchmarks/results/old.json
+
+Results are written as JSON to ``benchmarks/results/<commit>.json``.  With
+``--compare`` the run is compared with an earlier result file and the exit
+status is 1 if any benchmark got slower than ``--factor``.
+"""
+
+from __future__ import (division, print_function, absolute_import, unicode_literals)
+import argparse
+import datetime
+import importlib
+import inspect
+import itertools
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import timeit
+
+from .common import package_dir
+
+__all__ = ['discover', 'run_benchmark', 'run', 'compare', 'main']
+
+_benchmark_dir = os.path.dirname(os.path.abspath(__file__))
+
+#target duration of one timing sample, used to choose `number`
+SAMPLE_TIME = 0.05
+
+DEFAULT_REPEAT = 5
+
+
+def discover(pattern=None):
+    """
+    find the benchmarks in the ``bench_*.py`` modules of this directory
+
+    Parameters
+    ----------
+    pattern : string, optional
+        regular expression, only benchmarks whose name matches are returned
+
+    Returns
+    -------
+    benchmarks : list
+        list of (name, class, method name) tuples, with names of the form
+        'bench_module.Class.method'
+    """
+
+    benchmarks = []
+    for filename in sorted(os.listdir(_benchmark_dir)):
+        if not (filename.startswith('bench_') and filename.endswith('.py')):
+            continue
+        module_name = filename[:-3]
+        module = importlib.import_module('.'+module_name, __package__)
+        for class_name, cls in sorted(vars(module).items()):
+            if not inspect.isclass(cls) or class_name.startswith('_'):
+                continue
+            if cls.__module__ != module.__name__:
+                continue
+            for method in sorted(dir(cls)):
+                if method.startswith(('time_', 'timeraw_', 'track_')):
+                    name = '.'.join([module_name, class_name, method])
+                    if pattern is None or re.search(pattern, name):
+                        benchmarks.append((name, cls, method))
+    return benchmarks
+
+
+def run_benchmark(cls, method):
+    """
+    run one benchmark for every combination of its parameters
+
+    Returns
+    -------
+    result : dict
+        dictionary with 'params', 'param_names', 'unit' and 'results', a
+        mapping of the parameter combination (joined with ', ') to a dict of
+        statistics, or None if the combination was skipped
+    """
+
+    params = getattr(cls, 'params', [])
+    if params and not isinstance(params[0], (list, tuple)):
+        params = [params]
+    param_names = list(getattr(cls, 'param_names', []))
+    func = getattr(cls, method)
+    unit = getattr(func, 'unit', 'seconds')
+
+    results = {}
+    for combination in itertools.product(*params) if params else [()]:
+        label = ', '.join(str(p) for p in combination)
+        try:
+            results[label] = _run_one(cls, method, combination)
+        except NotImplementedError:
+            results[label] = None
+
+    return {'params': [list(map(str, p)) for p in params], 'param_names': param_names,
+            'unit': unit, 'results': results}
+
+
+def _run_one(cls, method, args):
+    repeat = getattr(cls, 'repeat', DEFAULT_REPEAT)
+    number = getattr(cls, 'number', 0)
+
+    def setup():
+        instance = cls()
+        if hasattr(instance, 'setup'):
+            instance.setup(*args)
+        return instance
+
+    def teardown(instance):
+        if hasattr(instance, 'teardown'):
+            instance.teardown(*args)
+
+    if method.startswith('track_'):
+        instance = setup()
+        try:
+            return {'value': getattr(instance, method)(*args)}
+        finally:
+            teardown(instance)
+
+    if method.startswith('timeraw_'):
+        instance = setup()
+        try:
+            code = getattr(instance, method)(*args)
+        finally:
+            teardown(instance)
+        samples = [_time_raw(code) for i in range(repeat)]
+        return _statistics(samples, 1)
+
+    samples = []
+    instance = setup()
+    try:
+        func = getattr(instance, method)
+        call = lambda: func(*args)
+        if not number:
+            number = _calibrate(call)
+        for i in range(repeat):
+            if number == 1 and i > 0:
+                #single calls get a fresh setup each, e.g. to clear caches
+                teardown(instance)
+                instance = setup()
+                func = getattr(instance, method)
+                call = lambda: func(*args)
+            samples.append(timeit.timeit(call, number=number)/number)
+    finally:
+        teardown(instance)
+    return _statistics(samples, number)
+
+
+def _calibrate(call):
+    """
+    number of calls per sample so that one sample takes about `SAMPLE_TIME`
+    """
+    number = 1
+    while True:
+        t = timeit.timeit(call, number=number)
+        if t >= SAMPLE_TIME or number >= 10**6:
+            return number
+        number = number*10 if t < SAMPLE_TIME/10 else number*2
+
+
+def _time_raw(code):
+    """
+    wall time of running `code` once in a fresh interpreter
+    """
+    wrapper = ("import time\n"
+               "t = time.perf_counter()\n"
+               "exec(compile({0!r}, '<benchmark>', 'exec'))\n"
+               "print(time.perf_counter() - t)\n").format(code)
+    output = subprocess.check_output([sys.executable, '-c', wrapper], universal_newlines=True)
+    return float(output.strip().splitlines()[-1])
+
+
+def _statistics(samples, number):
+    samples = sorted(samples)
+    n = len(samples)
+    median = samples[n//2] if n % 2 else 0.5*(samples[n//2-1] + samples[n//2])
+    return {'min': samples[0], 'median': median, 'max': samples[-1],
+            'repeat': n, 'number': number}
+
+
+def run(pattern=None, verbose=True):
+    """
+    run the benchmarks matching `pattern`
+
+    Returns
+    -------
+    report : dict
+        machine readable report with environment information and a
+        'benchmarks' mapping of benchmark name to the result of
+        `run_benchmark`
+    """
+
+    report = {'commit': _git_commit(),
+              'date': datetime.datetime.now().isoformat(),
+              'python': platform.python_version(),
+              'platform': platform.platform(),
+              'machine': platform.machine(),
+              'versions': _versions(),
+              'benchmarks': {}}
+
+    for name, cls, method in discover(pattern):
+        result = run_benchmark(cls, method)
+        report['benchmarks'][name] = result
+        if verbose:
+            _print_result(name, result)
+    return report
+
+
+def compare(old, new, factor=1.2):
+    """
+    compare two reports
+
+    Parameters
+    ----------
+    old, new : dict
+        reports as returned by `run` or loaded from the JSON result files
+
+    factor : float
+        ratio of the new to the old minimum time above which a benchmark is
+        counted as a regression
+
+    Returns
+    -------
+    rows : list
+        list of (name, params, old, new, ratio) for every timing present in
+        both reports, sorted by decreasing ratio
+
+    regressions : list
+        the subset of `rows` with ratio > `factor`
+    """
+
+    rows = []
+    for name, result in new['benchmarks'].items():
+        if name not in old['benchmarks']:
+            continue
+        old_results = old['benchmarks'][name]['results']
+        for label, stats in result['results'].items():
+            old_stats = old_results.get(label)
+            if stats is None or old_stats is None or 'min' not in stats:
+                continue
+            ratio = stats['min']/old_stats['min'] if old_stats['min'] > 0 else float('inf')
+            rows.append((name, label, old_stats['min'], stats['min'], ratio))
+    rows.sort(key=lambda row: -row[4])
+    regressions = [row for row in rows if row[4] > factor]
+    return rows, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="run the lss_observations benchmarks")
+    parser.add_argument('-b', '--bench', default=None,
+                        help="regular expression selecting benchmarks")
+    parser.add_argument('-o', '--output', default=None,
+                        help="result file, default benchmarks/results/<commit>.json")
+    parser.add_argument('--compare', default=None,
+                        help="earlier result file to compare with")
+    parser.add_argument('--factor', type=float, default=1.2,
+                        help="slowdown counted as a regression, default 1.2")
+    parser.add_argument('-q', '--quiet', action='store_true')
+    args = parser.parse_args(argv)
+
+    report = run(args.bench, verbose=not args.quiet)
+
+    output = args.output
+    if output is None:
+        results_dir = os.path.join(_benchmark_dir, 'results')
+        if not os.path.isdir(results_dir):
+            os.makedirs(results_dir)
+        output = os.path.join(results_dir, '{0}.json'.format(report['commit'] or 'unknown'))
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=1, sort_keys=True)
+    print("results written to {0}".format(output))
+
+    if args.compare is not None:
+        with open(args.compare) as f:
+            old = json.load(f)
+        rows, regressions = compare(old, report, factor=args.factor)
+        for name, label, t_old, t_new, ratio in regressions:
+            print("REGRESSION {0}({1}): {2:.3g} s -> {3:.3g} s ({4:.2f}x)"
+                  .format(name, label, t_old, t_new, ratio))
+        if regressions:
+            return 1
+    return 0
+
+
+def _print_result(name, result):
+    for label, stats in sorted(result['results'].items()):
+        if stats is None:
+            value = 'skipped'
+        elif 'value' in stats:
+            value = '{0} {1}'.format(stats['value'], result['unit'])
+        else:
+            value = '{0:.3g} s'.format(stats['min'])
+        print("{0}({1}): {2}".format(name, label, value))
+
+
+def _git_commit():
+    try:
+        output = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                         cwd=package_dir, stderr=subprocess.STDOUT,
+                                         universal_newlines=True)
+        return output.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _versions():
+    versions = {}
+    for name in ['numpy', 'scipy', 'astropy']:
+        try:
+            versions[name] = importlib.import_module(name).__version__
+        except ImportError:
+            versions[name] = None
+    return versions
+
+
+if __name__ == '__main__':
+    sys.exit(main())
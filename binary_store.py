@@ -0,0 +1,397 @@
+# -*- coding: utf-8 -*-
+
+"""
+memory-mapped binary store of the ASCII tables bundled with the package
+
+All of the ``*.dat`` tables under `wp_measurements`, `phi_measurements` and
+`delta_sigma_measurements` are compiled into a single float64 ``.npy`` blob
+holding the stream of numbers in each file, with a JSON index of offsets and
+row lengths.  The blob is opened with ``mmap`` so loaders get
+zero-copy, read-only views and every process on a machine shares the same
+physical pages.  The index records a SHA-256 hash of the source files and
+their sizes and modification times; the store is rebuilt automatically
+whenever the sources change.  Opening the store only compares the sizes and
+modification times, the sources are hashed only when those differ.
+
+The store can be (re)built explicitly with::
+
+    python -m lss_observations.binary_store
+"""
+
+from __future__ import (division, print_function, absolute_import, unicode_literals)
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import numpy as np
+from . import instrumentation
+
+__all__ = ['get_table', 'get_values', 'build_store', 'source_files', 'source_hash']
+
+STORE_VERSION = 2
+
+#directories scanned for tables, relative to the package
+SOURCE_DIRS = ['wp_measurements', 'phi_measurements', 'delta_sigma_measurements']
+
+_package_dir = os.path.dirname(os.path.abspath(__file__))
+
+_lock = threading.Lock()
+_store = None
+
+#padded copies of tables with rows of unequal length
+_ragged_tables = {}
+
+
+def default_store_dir():
+    """
+    directory the store is written to
+
+    Set the ``LSS_OBSERVATIONS_STORE`` environment variable to override the
+    default location inside the package.
+    """
+    return os.environ.get('LSS_OBSERVATIONS_STORE',
+                          os.path.join(_package_dir, '_store'))
+
+
+def source_files():
+    """
+    return the sorted relative paths of all tables compiled into the store
+    """
+
+    files = []
+    for source_dir in SOURCE_DIRS:
+        top = os.path.join(_package_dir, source_dir)
+        for root, dirs, filenames in os.walk(top):
+            dirs.sort()
+            for filename in sorted(filenames):
+                if filename.endswith('.dat'):
+                    path = os.path.join(root, filename)
+                    path = os.path.relpath(path, _package_dir)
+                    files.append(path.replace(os.sep, '/'))
+    return files
+
+
+def source_hash(files=None):
+    """
+    SHA-256 hash of the names and contents of the source tables
+    """
+
+    if files is None:
+        files = source_files()
+
+    h = hashlib.sha256()
+    h.update(str(STORE_VERSION).encode())
+    for relpath in files:
+        h.update(relpath.encode('utf-8'))
+        with open(os.path.join(_package_dir, relpath), 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def _source_signature(files):
+    """
+    (relpath, size, mtime_ns) of each source table, compared before the hash
+    """
+
+    signature = []
+    for relpath in files:
+        st = os.stat(os.path.join(_package_dir, relpath))
+        signature.append([relpath, st.st_size, st.st_mtime_ns])
+    return signature
+
+
+def parse_table(path):
+    """
+    parse a whitespace delimited table of numbers
+
+    Lines starting with '#' are skipped, LaTeX column separators are ignored
+    and unicode minus signs are accepted.  Missing values are written as
+    'nan'.
+
+    Parameters
+    ----------
+    path : string
+        path to the table
+
+    Returns
+    -------
+    values : numpy.ndarray
+        all numbers in the file in reading order
+
+    row_lengths : list
+        number of values on each non-empty line
+
+    Raises
+    ------
+    ValueError
+        if a value is not a number
+    """
+
+    values = []
+    row_lengths = []
+    with instrumentation.span('store.parse', os.path.getsize(path)):
+        with io.open(path, encoding='utf-8') as f:
+            for lineno, line in enumerate(f, 1):
+                line = line.split('#', 1)[0]
+                line = line.replace('−', '-').replace('&', ' ').replace('\\\\', ' ')
+                row = line.split()
+                if row:
+                    values.extend(_to_float(v, path, lineno) for v in row)
+                    row_lengths.append(len(row))
+
+    return np.array(values, dtype=float), row_lengths
+
+
+def _to_float(value, path, lineno):
+    try:
+        return float(value)
+    except ValueError:
+        msg = ("malformed value {0!r} on line {1} of {2}.".format(value, lineno, path))
+        raise ValueError(msg)
+
+
+def build_store(store_dir=None):
+    """
+    compile all source tables into the binary store
+
+    The blob and index are written to temporary files and moved into place,
+    so concurrent builds and readers never see a partially written store.
+    They are published readable by all users (mode 0644 less the umask), so
+    a store built by one user is shared by the processes of every user.
+
+    Parameters
+    ----------
+    store_dir : string, optional
+        output directory, see `default_store_dir`
+
+    Returns
+    -------
+    index_path : string
+        path to the JSON index of the new store
+    """
+
+    if store_dir is None:
+        store_dir = default_store_dir()
+    if not os.path.isdir(store_dir):
+        os.makedirs(store_dir)
+
+    files = source_files()
+    signature = _source_signature(files)
+    digest = source_hash(files)
+    tables, index = _compile(files)
+
+    blob_name = 'tables-{0}.npy'.format(digest[:16])
+    blob_path = os.path.join(store_dir, blob_name)
+    fd, tmp = tempfile.mkstemp(dir=store_dir, suffix='.npy.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        np.save(f, tables)
+    _publish(tmp, blob_path)
+
+    meta = {'version': STORE_VERSION, 'hash': digest, 'signature': signature,
+            'blob': blob_name, 'dtype': tables.dtype.str, 'tables': index}
+    index_path = _write_index(store_dir, meta)
+
+    #remove blobs left behind by older builds
+    for filename in os.listdir(store_dir):
+        if filename.startswith('tables-') and filename.endswith('.npy') and filename != blob_name:
+            try:
+                os.remove(os.path.join(store_dir, filename))
+            except OSError:
+                pass
+
+    return index_path
+
+
+def _write_index(store_dir, meta):
+    index_path = os.path.join(store_dir, 'index.json')
+    fd, tmp = tempfile.mkstemp(dir=store_dir, suffix='.json.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(meta, f, sort_keys=True)
+    _publish(tmp, index_path)
+    return index_path
+
+
+def _publish(tmp, path):
+    """
+    move a temporary file written with `tempfile.mkstemp`, which is only
+    readable by its owner, into place with the usual file mode
+    """
+
+    umask = os.umask(0o022)
+    os.umask(umask)
+    os.chmod(tmp, 0o644 & ~umask)
+    os.replace(tmp, path)
+
+
+def get_values(relpath):
+    """
+    return all numbers in a bundled table, in reading order, as a read-only,
+    zero-copy view into the store
+
+    Parameters
+    ----------
+    relpath : string
+        path of the table relative to the package,
+        e.g. 'wp_measurements/zehavi_2011_data/table8/wp_covar_20.0.dat'
+
+    Returns
+    -------
+    values : numpy.ndarray
+        one dimensional array of values
+    """
+
+    with instrumentation.span('store.read') as span:
+        blob, index = _open_store()
+        offset, row_lengths = _lookup(index, relpath)
+        values = blob[offset:offset+sum(row_lengths)]
+        span.nbytes = values.nbytes
+    return values
+
+
+def get_table(relpath):
+    """
+    return a bundled table as a read-only, zero-copy view into the store
+
+    Parameters
+    ----------
+    relpath : string
+        path of the table relative to the package,
+        e.g. 'wp_measurements/hearin_2014_data/table_1.dat'
+
+    Returns
+    -------
+    table : numpy.ndarray
+        array of shape (nrows, ncols).  If the rows of the file have unequal
+        lengths, shorter rows are padded at the end with NaN; such tables are
+        copied once per process rather than viewed.
+    """
+
+    with instrumentation.span('store.read') as span:
+        table = _get_table(relpath)
+        span.nbytes = table.nbytes
+    return table
+
+
+def _get_table(relpath):
+    blob, index = _open_store()
+    offset, row_lengths = _lookup(index, relpath)
+    nrows = len(row_lengths)
+    ncols = max(row_lengths) if row_lengths else 0
+
+    if all(n == ncols for n in row_lengths):
+        return blob[offset:offset+nrows*ncols].reshape(nrows, ncols)
+
+    try:
+        return _ragged_tables[relpath]
+    except KeyError:
+        pass
+    table = np.full((nrows, ncols), np.nan)
+    for i, n in enumerate(row_lengths):
+        table[i, :n] = blob[offset:offset+n]
+        offset += n
+    table.setflags(write=False)
+    _ragged_tables[relpath] = table
+    return table
+
+
+def _lookup(index, relpath):
+    try:
+        return index[relpath]
+    except KeyError:
+        msg = ("table {0} is not in the binary store.".format(relpath))
+        raise ValueError(msg)
+
+
+def _compile(files):
+    """
+    parse `files` and pack them into one flat array plus an offset index
+    """
+
+    parsed = [parse_table(os.path.join(_package_dir, relpath)) for relpath in files]
+    index = {}
+    offset = 0
+    for relpath, (values, row_lengths) in zip(files, parsed):
+        index[relpath] = [offset, row_lengths]
+        offset += len(values)
+    if parsed:
+        tables = np.concatenate([values for values, row_lengths in parsed])
+    else:
+        tables = np.empty(0)
+    return tables, index
+
+
+def _read_index(store_dir):
+    try:
+        with open(os.path.join(store_dir, 'index.json')) as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def _is_current(meta, store_dir, files):
+    """
+    True if the store described by `meta` was built from the current sources
+    """
+
+    if meta is None or meta.get('version') != STORE_VERSION:
+        return False
+    signature = _source_signature(files)
+    if meta.get('signature') == signature:
+        return True
+    #the sources were touched, e.g. by a reinstall, compare their contents
+    if meta.get('hash') != source_hash(files):
+        return False
+    #record the new signature so later processes skip the hash
+    try:
+        _write_index(store_dir, dict(meta, signature=signature))
+    except (IOError, OSError):
+        pass
+    return True
+
+
+def _open_store():
+    """
+    open (building or rebuilding first if necessary) the store for this process
+    """
+
+    global _store
+    if _store is not None:
+        return _store
+
+    with _lock, instrumentation.span('store.open'):
+        if _store is not None:
+            return _store
+
+        store_dir = default_store_dir()
+        files = source_files()
+
+        meta = _read_index(store_dir)
+        if not _is_current(meta, store_dir, files):
+            try:
+                build_store(store_dir)
+                meta = _read_index(store_dir)
+            except (IOError, OSError):
+                meta = None
+
+        blob = None
+        if meta is not None:
+            try:
+                blob = np.load(os.path.join(store_dir, meta['blob']), mmap_mode='r')
+            except (IOError, OSError, ValueError):
+                blob = None
+
+        if blob is None:
+            #store directory is not writable, keep the compiled tables in memory
+            tables, index = _compile(files)
+            tables.setflags(write=False)
+            _store = (tables, index)
+        else:
+            _store = (blob.view(np.ndarray), meta['tables'])
+
+    return _store
+
+
+if __name__ == '__main__':
+    print(build_store())
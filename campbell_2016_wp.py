@@ -7,16 +7,18 @@ projected two point correlation function measurements from Campbell 2016
 """
 
 from __future__ import print_function, division
-from astropy.table import Table
-from astropy.io import ascii
 import os
 import numpy as np
+from .measurement_registry import registry
+from .littleh import convert_measurement, WP_UNITS
+from .catalog import find
+from .stacking import stack_measurements
 
-__all__ = ['campbell_2016_wp']
+__all__ = ['campbell_2016_wp', 'campbell_2016_wp_bins']
 __author__=['Duncan Campbell']
 
 def campbell_2016_wp(min_mstar=10**9.5, max_mstar=10**10.0,
-                     method='theta_weights', sample='all'):
+                     method='theta_weights', sample='all', h=None):
     """
     projected two point correlation function measurements from Campbell et al. 2016
     
@@ -35,74 +37,90 @@ def campbell_2016_wp(min_mstar=10**9.5, max_mstar=10**10.0,
     sample : string
         all, red, blue
     
+    h : float or array_like, optional
+        if given, the measurement is converted from h=1 units to this value
+        of h, see `littleh.convert_measurement`.  An array of h values adds
+        a leading axis of the same shape.
+    
     Returns
     -------
     measurement : numpy.ndarray
-        array of shape (2,14), where the first row is rp in :math:`h^-1` Mpc, and 
-        the second row is wp in :math:`h^-1` Mpc.
+        array of shape (2,15), where the first row is rp in :math:`h^-1` Mpc, and 
+        the second row is wp in :math:`h^-1` Mpc.  For an array of h values
+        the shape is h.shape + (2,15).
     
-    covariance : numpy.matrix
-        matrix of shape (14,14) of covariances between the ith and jth rp
-        measurments of wp 
+    Notes
+    -----
+    Measurements are cached in `lss_observations.measurement_registry.registry`
+    after the first call and the returned arrays are read-only.  Copy them
+    before modifying in place.
     """
     
-    #get files for specified sample
-    if method == 'nearest_neighbor':
-        filenames = ['wp_data_nearest_neighbor_all_11.0_11.5_0.npy',
-                     'wp_data_nearest_neighbor_all_10.0_10.5_0.npy',
-                     'wp_data_nearest_neighbor_all_10.5_11.0_0.npy',
-                     'wp_data_nearest_neighbor_all_9.5_10.0_0.npy',
-                     'wp_data_nearest_neighbor_blue_11.0_11.5_0.npy',
-                     'wp_data_nearest_neighbor_blue_10.0_10.5_0.npy',
-                     'wp_data_nearest_neighbor_blue_10.5_11.0_0.npy',
-                     'wp_data_nearest_neighbor_blue_9.5_10.0_0.npy',
-                     'wp_data_nearest_neighbor_red_11.0_11.5_0.npy',
-                     'wp_data_nearest_neighbor_red_10.0_10.5_0.npy',
-                     'wp_data_nearest_neighbor_red_10.5_11.0_0.npy',
-                     'wp_data_nearest_neighbor_red_9.5_10.0_0.npy']
-    elif method == 'theta_weights':
-        filenames = ['wp_data_no_collisions_all_11.0_11.5_0.npy',
-                     'wp_data_no_collisions_all_10.0_10.5_0.npy',
-                     'wp_data_no_collisions_all_10.5_11.0_0.npy',
-                     'wp_data_no_collisions_all_9.5_10.0_0.npy',
-                     'wp_data_no_collisions_blue_11.0_11.5_0.npy',
-                     'wp_data_no_collisions_blue_10.0_10.5_0.npy',
-                     'wp_data_no_collisions_blue_10.5_11.0_0.npy',
-                     'wp_data_no_collisions_blue_9.5_10.0_0.npy',
-                     'wp_data_no_collisions_red_11.0_11.5_0.npy',
-                     'wp_data_no_collisions_red_10.0_10.5_0.npy',
-                     'wp_data_no_collisions_red_10.5_11.0_0.npy',
-                     'wp_data_no_collisions_red_9.5_10.0_0.npy']
-    else:
+    if method not in ('nearest_neighbor', 'theta_weights'):
         msg = ("method not recognized.")
         raise ValueError(msg)
     
-    if sample=='all':
-        filenames = filenames[:4]
-    elif sample=='blue':
-        filenames = filenames[4:8]
-    elif sample=='red':
-        filenames = filenames[8:]
-    else:
-        msg = ("sample not recognized.")
-        raise ValueError(msg)
+    #get file for specified sample and stellar mass bin
+    entry = find('campbell_2016', sample, min_mstar, max_mstar, method=method)
+    filename = entry.source
+    mass_bin = (entry.lo, entry.hi)
     
-    min_mstar = np.log10(min_mstar)
-    max_mstar = np.log10(max_mstar)
-    mass_bin = (min_mstar,max_mstar)
-    
-    #get files for specified stellar mass bin
-    if mass_bin==(9.5,10.0):
-        filename = filenames[3]
-    elif mass_bin==(10.0,10.5):
-        filename = filenames[2]
-    elif mass_bin==(10.5,11.0):
-        filename = filenames[1]
-    elif mass_bin==(11.0,11.5):
-        filename = filenames[0]
-    else:
-        msg = ("requested mass bin not available.")
-        raise ValueError(msg)
+    key = ('campbell_2016', sample, mass_bin, method)
+    measurement = registry.get(key, lambda: _load_wp(filename))
+    if h is not None:
+        return convert_measurement(measurement, h, WP_UNITS)
+    return measurement
+
+
+def campbell_2016_wp_bins(method='theta_weights', sample='all'):
+    """
+    all stellar mass bins of a sample from Campbell et al. 2016 in one call
+    
+    Parameters
+    ----------
+    method : string
+        'nearest_neighbor', 'theta_weights'
+    
+    sample : string
+        all, red, blue
+    
+    Returns
+    -------
+    rp : numpy.ndarray
+        array of shape (15,) of rp in :math:`h^-1` Mpc
+    
+    wp : numpy.ndarray
+        array of shape (3,15) of wp in :math:`h^-1` Mpc
+    
+    covariance : None
+        no errors are available for these measurements
+    
+    bins : numpy.ndarray
+        array of shape (3,2) of (min_mstar, max_mstar) of each bin in
+        :math:`h^{-2}M_{\odot}`
+    
+    Notes
+    -----
+    Only the bins that are shipped with the package are included; the
+    11.0 < log(mstar) < 11.5 measurements are not available.  The stacked
+    arrays are cached and read-only.
+    """
+    
+    bins = [(10**lo, 10**(lo+0.5)) for lo in (9.5, 10.0, 10.5)]
+    
+    def load():
+        rp, wp, cov = stack_measurements([campbell_2016_wp(min_mstar, max_mstar, method, sample)
+                                          for min_mstar, max_mstar in bins])
+        return rp, wp, cov, np.array(bins)
+    
+    key = ('campbell_2016', sample, 'bins', method)
+    return registry.get(key, load)
+
+
+def _load_wp(filename):
+    """
+    read the wp measurement stored in `filename`
+    """
     
     #read in data
     filepath = os.path.dirname(__file__)
@@ -116,4 +134,3 @@ def campbell_2016_wp(min_mstar=10**9.5, max_mstar=10**10.0,
     measurement = np.vstack((rp,wp))
     
     return measurement
-    
\ No newline at end of file
@@ -0,0 +1,348 @@
+# -*- coding: utf-8 -*-
+
+r"""
+index of every measurement shipped with the package
+
+Each measurement is an `Entry` giving the paper, sample and method, the edges
+of its bin and the file (and column) it is read from.  Stellar mass bins are
+indexed by log10 of the stellar mass in :math:`h^{-2}M_{\odot}` and luminosity
+bins by the absolute magnitude :math:`M_r - 5\log_{10}h`.  Threshold samples
+are bins open on one side.
+
+The entries of each (paper, sample, method) are sorted by their lower edge,
+so exact, tolerant and range lookups are binary searches.
+
+Examples
+--------
+>>> from lss_observations import catalog
+>>> catalog.select(sample='red', quantity='mstar', min=10**10, max=10**11)
+>>> catalog.find('yang_2012', 'Volume1', 10**9.5, 10**10.0)
+"""
+
+from __future__ import (division, print_function, absolute_import, unicode_literals)
+from collections import namedtuple
+import numpy as np
+
+__all__ = ['Entry', 'Catalog', 'catalog', 'find', 'find_many', 'select', 'load']
+
+#default tolerance of bin edge lookups, in dex or magnitudes
+DEFAULT_TOLERANCE = 0.01
+
+Entry = namedtuple('Entry', ['paper', 'sample', 'method', 'lo', 'hi', 'source'])
+Entry.__doc__ = """
+one shipped measurement
+
+`lo` and `hi` are the bin edges in the units of the quantity of the paper,
+see `PAPERS`, with -inf or inf for the open side of a threshold sample.
+`source` is the file, or the arguments of the file reader, of the
+measurement.
+"""
+
+#paper -> (loader, quantity, threshold side) where the quantity is 'mstar'
+#for stellar mass bins indexed by log10(mstar) and 'Mr' for magnitude bins
+PAPERS = {
+    'yang_2012': ('yang_2012_wp', 'mstar', None),
+    'zehavi_2011': ('zehavi_2011_wp', 'Mr', 'hi'),
+    'hearin_2014': ('hearin_2014_wp', 'mstar', 'lo'),
+    'watson_2014': ('watson_2014_wp', 'mstar', 'lo'),
+    'watson_2014_delta_sigma': ('watson_2014_delta_sigma', 'mstar', 'lo'),
+    'campbell_2016': ('campbell_2016_wp', 'mstar', None),
+}
+
+
+def _entries():
+    """
+    the declarative list of shipped measurements
+    """
+
+    #Yang et al. 2012, one file per sample and stellar mass bin
+    for i, sample in enumerate(['Volume1', 'Volume2', 'Mass-limit']):
+        for j, lo in enumerate([9.0, 9.5, 10.0, 10.5, 11.0]):
+            yield Entry('yang_2012', sample, None, lo, lo+0.5,
+                        'xi{0:02d}.dat'.format(5*i+j+1))
+
+    #Zehavi et al. 2011, one wp table per sample with the bins in
+    #consecutive columns, and one covariance file per bin
+    filepath = 'wp_measurements/zehavi_2011_data/'
+    for sample, table, suffix in [('all', 'table7', ''), ('blue', 'table9', '_mblue'),
+                                  ('red', 'table10', '_mred')]:
+        for k, lo in enumerate([-23.0, -22.0, -21.0, -20.0, -19.0, -18.0]):
+            if lo == -23.0 and sample != 'all':
+                #the covariance matrix of this bin is not available
+                continue
+            cov_filename = 'wp_covar_{0:.1f}_{1:.1f}{2}.dat'.format(-lo, -lo-1.0, suffix)
+            yield Entry('zehavi_2011', sample, None, lo, lo+1.0,
+                        (filepath+table+'/', table+'.dat', 1+2*k, cov_filename))
+    for k, hi in enumerate([-22.0, -21.5, -21.0, -20.5, -20.0, -19.5, -19.0, -18.5, -18.0]):
+        yield Entry('zehavi_2011', 'all', 'threshold', -np.inf, hi,
+                    (filepath+'table8/', 'table8.dat', 1+2*k,
+                     'wp_covar_{0:.1f}.dat'.format(-hi)))
+
+    #Hearin et al. 2014 and Watson et al. 2014, stellar mass thresholds of
+    #h=0.7 converted to h=1 in consecutive (value, error) column pairs
+    thresholds = np.log10(np.array([10.0**9.8, 10.0**10.2, 10.0**10.6]) * 0.7**2.0)
+    for paper, files in [('hearin_2014', {'all': 'table_1.dat', 'red': 'table_3.dat',
+                                          'blue': 'table_2.dat'}),
+                         ('watson_2014', {'all': 'table_1.dat', 'red': 'table_A2.dat',
+                                          'blue': 'table_A1.dat'}),
+                         ('watson_2014_delta_sigma', {'all': 'table_4.dat', 'red': 'table_A4.dat',
+                                                      'blue': 'table_A3.dat'})]:
+        for sample in ['all', 'red', 'blue']:
+            for k, lo in enumerate(thresholds):
+                yield Entry(paper, sample, None, float(lo), np.inf, (files[sample], 1+2*k))
+
+    #Campbell et al. 2016, the 11.0 < log(mstar) < 11.5 files are not shipped
+    for method, prefix in [('nearest_neighbor', 'nearest_neighbor'),
+                           ('theta_weights', 'no_collisions')]:
+        for sample in ['all', 'blue', 'red']:
+            for lo in [9.5, 10.0, 10.5]:
+                yield Entry('campbell_2016', sample, method, lo, lo+0.5,
+                            'wp_data_{0}_{1}_{2}_{3}_0.npy'.format(prefix, sample, lo, lo+0.5))
+
+
+class Catalog(object):
+    """
+    sorted index of measurements
+    """
+
+    def __init__(self, entries):
+        """
+        Parameters
+        ----------
+        entries : list
+            list of `Entry`
+        """
+
+        self.entries = tuple(entries)
+        groups = {}
+        for entry in self.entries:
+            groups.setdefault((entry.paper, entry.sample, entry.method), []).append(entry)
+
+        #(paper, sample, method) -> (lo, hi, entries) sorted by (lo, hi)
+        self._groups = {}
+        for group, entries in groups.items():
+            entries.sort(key=lambda e: (e.lo, e.hi))
+            lo = np.array([e.lo for e in entries])
+            hi = np.array([e.hi for e in entries])
+            lo.setflags(write=False)
+            hi.setflags(write=False)
+            self._groups[group] = (lo, hi, tuple(entries))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def samples(self, paper):
+        """
+        return the sorted (sample, method) pairs available for a paper
+        """
+        return sorted(((s, m) for p, s, m in self._groups if p == paper),
+                      key=lambda x: (x[0], x[1] or ''))
+
+    def find(self, paper, sample, min=None, max=None, method=None, tol=DEFAULT_TOLERANCE):
+        r"""
+        return the measurement whose bin edges match `min` and `max`
+
+        Parameters
+        ----------
+        paper : string
+            key of `PAPERS`, e.g. 'yang_2012'
+
+        sample : string
+            e.g. 'all', 'red', 'Volume1'
+
+        min, max : float
+            bin edges in the units of the loader of the paper, e.g. stellar
+            mass in :math:`h^{-2}M_{\odot}` or absolute magnitude.  None for
+            the open side of a threshold sample.
+
+        method : string, optional
+            e.g. 'theta_weights' for campbell_2016 or 'threshold' for the
+            threshold samples of zehavi_2011
+
+        tol : float
+            tolerance on the edges, in dex for stellar masses
+
+        Returns
+        -------
+        entry : Entry
+        """
+
+        index = self.find_many(paper, sample, [min], [max], method=method, tol=tol)
+        return index[0]
+
+    def find_many(self, paper, sample, min, max, method=None, tol=DEFAULT_TOLERANCE):
+        """
+        vectorized `find` of many bins of one sample
+
+        Parameters
+        ----------
+        min, max : array_like
+            arrays of shape (n,) of bin edges, see `find`
+
+        Returns
+        -------
+        entries : list
+            list of n `Entry`
+
+        Raises
+        ------
+        ValueError
+            if the sample is not available or any bin does not match
+        """
+
+        lo_edges, hi_edges, entries = self._group(paper, sample, method)
+        lo = self._edges(paper, min, -np.inf)
+        hi = self._edges(paper, max, np.inf)
+        if lo.shape != hi.shape:
+            msg = ("min and max must have the same shape.")
+            raise ValueError(msg)
+
+        #candidates are the entries with lower edges within tol of lo, almost
+        #always at most one, so check the first candidate of all bins at once
+        start = np.searchsorted(lo_edges, lo - tol, side='left')
+        stop = np.searchsorted(lo_edges, lo + tol, side='right')
+        first = np.minimum(start, len(entries) - 1)
+        found = (start < stop) & _close(hi_edges[first], hi, tol)
+        index = np.where(found, first, -1)
+
+        for k in np.nonzero(~found & (stop - start > 1))[0]:
+            for i in range(start[k] + 1, stop[k]):
+                if _close(hi_edges[i], hi[k], tol):
+                    index[k] = i
+                    break
+
+        missing = np.nonzero(index < 0)[0]
+        if len(missing):
+            bins = ', '.join('({0}, {1})'.format(lo[k], hi[k]) for k in missing[:10])
+            msg = ("requested bin(s) not available for {0} sample '{1}': {2}"
+                   .format(paper, sample, bins))
+            raise ValueError(msg)
+        return [entries[i] for i in index]
+
+    def select(self, paper=None, sample=None, method=None, quantity=None,
+               min=None, max=None):
+        """
+        return all measurements whose bins overlap a range
+
+        Parameters
+        ----------
+        paper, sample, method : string, optional
+            restrict the query, None matches any
+
+        quantity : string, optional
+            'mstar' or 'Mr', restrict the query to papers binned in this
+            quantity.  Required if `min` or `max` is given without `paper`.
+
+        min, max : float, optional
+            range in the units of the loaders, e.g. 10**10 and 10**11.
+            None leaves the range open on that side.
+
+        Returns
+        -------
+        entries : list
+            list of `Entry` sorted by paper, sample, method and lower edge
+        """
+
+        if (min is not None or max is not None) and paper is None and quantity is None:
+            msg = ("quantity is required for a range query over all papers.")
+            raise ValueError(msg)
+
+        result = []
+        for group in sorted(self._groups, key=lambda g: (g[0], g[1], g[2] or '')):
+            p, s, m = group
+            if ((paper is not None and p != paper) or (sample is not None and s != sample) or
+                    (method is not None and m != method) or
+                    (quantity is not None and PAPERS[p][1] != quantity)):
+                continue
+            lo_edges, hi_edges, entries = self._groups[group]
+            lo = -np.inf if min is None else float(self._edges(p, [min], -np.inf)[0])
+            hi = np.inf if max is None else float(self._edges(p, [max], np.inf)[0])
+            #entries starting below the end of the range, ending above its start
+            stop = np.searchsorted(lo_edges, hi, side='left')
+            keep = np.nonzero(hi_edges[:stop] > lo)[0]
+            result.extend(entries[i] for i in keep)
+        return result
+
+    def load(self, entries, h=None):
+        """
+        load measurements with their loaders
+
+        Parameters
+        ----------
+        entries : Entry or list
+            entries as returned by `find` or `select`
+
+        h : float or array_like, optional
+            passed to the loaders, see `littleh`
+
+        Returns
+        -------
+        measurements : object or list
+            the result of the loader for each entry
+        """
+
+        if isinstance(entries, Entry):
+            return _load(entries, h)
+        return [_load(entry, h) for entry in entries]
+
+    def _group(self, paper, sample, method):
+        if paper not in PAPERS:
+            msg = ("paper not recognized.")
+            raise ValueError(msg)
+        try:
+            return self._groups[(paper, sample, method)]
+        except KeyError:
+            msg = ("sample not recognized.")
+            raise ValueError(msg)
+
+    def _edges(self, paper, values, default):
+        """
+        convert bin edges from the units of the loader to those of the index
+        """
+        values = np.array([default if v is None else v for v in np.ravel(values)],
+                          dtype=np.float64)
+        if PAPERS[paper][1] == 'mstar':
+            with np.errstate(divide='ignore'):
+                values = np.where(np.isinf(values), values, np.log10(values))
+        return values
+
+
+def _close(a, b, tol):
+    """
+    elementwise |a - b| <= tol, with infinite edges only matching themselves
+    """
+    with np.errstate(invalid='ignore'):
+        return (a == b) | (np.abs(a - b) <= tol)
+
+
+def _load(entry, h):
+    import importlib
+    loader = PAPERS[entry.paper][0]
+    module = importlib.import_module('.'+loader, __package__)
+    func = getattr(module, loader)
+    quantity, side = PAPERS[entry.paper][1:]
+    if quantity == 'mstar':
+        lo, hi = 10.0**entry.lo, 10.0**entry.hi
+    else:
+        lo, hi = entry.lo, entry.hi
+    if side == 'lo':
+        args = (lo, entry.sample)
+    elif side == 'hi' and entry.method == 'threshold':
+        args = (None, hi, entry.sample)
+    elif entry.method is not None:
+        args = (lo, hi, entry.method, entry.sample)
+    else:
+        args = (lo, hi, entry.sample)
+    return func(*args, h=h)
+
+
+#index of all measurements shipped with the package
+catalog = Catalog(_entries())
+
+find = catalog.find
+find_many = catalog.find_many
+select = catalog.select
+load = catalog.load
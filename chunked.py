@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+
+"""
+bounded-memory evaluation of stellar mass and luminosity functions on large
+(e.g. mock) catalogs
+"""
+
+from __future__ import (division, print_function, absolute_import, unicode_literals)
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+__all__ = ['evaluate', 'blocks']
+
+#number of values per block, 512 KiB per float64 temporary
+DEFAULT_CHUNK_SIZE = 2**16
+
+DEFAULT_WORKERS = min(8, os.cpu_count() or 1)
+
+
+def evaluate(model, x, out=None, dtype=None, chunk_size=DEFAULT_CHUNK_SIZE,
+             workers=DEFAULT_WORKERS, **kwargs):
+    """
+    evaluate a model block by block, writing into a preallocated output
+
+    Parameters
+    ----------
+    model : callable
+        a stellar mass function from `stellar_mass_functions` or a luminosity
+        function from `luminosity_functions`
+
+    x : array_like or string
+        stellar masses or magnitudes, of any shape.  A string is the path of
+        a ``.npy`` file, which is memory-mapped.  Memory-mapped arrays are
+        read one block at a time.
+
+    out : numpy.ndarray or string, optional
+        output array of shape h.shape + x.shape (see the `h` argument of the
+        models), e.g. a `numpy.memmap`.  A string is the path of a ``.npy``
+        file to create, which is memory-mapped.  Default is a new array.
+
+    dtype : data-type, optional
+        dtype of a new output array, e.g. numpy.float32.  Default is the dtype
+        of `out`, or float64.  Models are evaluated in double precision and
+        cast when written.
+
+    chunk_size : int
+        number of values per block
+
+    workers : int
+        number of threads evaluating blocks.  numpy releases the GIL in the
+        model arithmetic, so blocks are evaluated in parallel.
+
+    **kwargs :
+        passed to the model, e.g. ``z`` or ``h``.  Arrays other than `h` with
+        the shape of `x`, e.g. the redshift of each galaxy, are split into the
+        same blocks.
+
+    Returns
+    -------
+    out : numpy.ndarray
+        the model evaluated at `x`
+
+    Notes
+    -----
+    Each thread holds a float64 copy of one block of `x` and the model's
+    temporaries for one block, so the memory used beyond `x` and `out` is a
+    few times ``workers*chunk_size`` values regardless of the size of `x`.
+    Pages of memory-mapped inputs and outputs are file-backed, so the
+    operating system can reclaim them as the evaluation proceeds.
+
+    Examples
+    --------
+    >>> from lss_observations.stellar_mass_functions import Tomczak_2014_phi
+    >>> phi = evaluate(Tomczak_2014_phi(), 'mstar.npy', out='phi.npy',
+    ...                dtype=np.float32, z=np.load('z.npy', mmap_mode='r'))
+    """
+
+    if isinstance(x, (str, bytes, os.PathLike)):
+        x = np.load(x, mmap_mode='r')
+    elif not isinstance(x, np.ndarray):
+        x = np.asarray(x, dtype=np.float64)
+
+    chunk_size = int(chunk_size)
+    if chunk_size < 1:
+        msg = ("`chunk_size` must be positive.")
+        raise ValueError(msg)
+
+    shape = x.shape
+    x = x.reshape(-1)
+    per_value = dict((k, np.asarray(v).reshape(-1)) for k, v in kwargs.items()
+                     if k != 'h' and np.shape(v) == shape and shape != ())
+    shared = dict((k, v) for k, v in kwargs.items() if k not in per_value)
+
+    local = threading.local()
+
+    def run(sl, target):
+        n = sl.stop - sl.start
+        buf = getattr(local, 'buf', None)
+        if buf is None:
+            buf = local.buf = np.empty(chunk_size)
+        #reuse one float64 input buffer per thread
+        xb = buf[:n]
+        np.copyto(xb, x[sl])
+        kw = dict(shared)
+        for k, v in per_value.items():
+            kw[k] = v[sl]
+        result = model(xb, **kw)
+        if target is None:
+            return result
+        target[..., sl] = result
+
+    slices = list(blocks(len(x), chunk_size))
+    if not slices:
+        #an empty input, evaluate once for the shape of the output
+        slices = [slice(0, 0)]
+
+    #the first block gives the shape added by the model, e.g. an axis of h
+    first = np.asarray(run(slices[0], None))
+    lead = first.shape[:first.ndim-1]
+    if isinstance(out, (str, bytes, os.PathLike)):
+        out = np.lib.format.open_memmap(out, mode='w+', shape=lead + shape,
+                                        dtype=np.float64 if dtype is None else dtype)
+    elif out is None:
+        out = np.empty(lead + shape, dtype=np.float64 if dtype is None else dtype)
+    elif out.shape != lead + shape:
+        msg = ("`out` has shape {0}, the model returns shape {1}."
+               .format(out.shape, lead + shape))
+        raise ValueError(msg)
+
+    target = out.reshape(lead + (-1,))
+    if target.size and not np.shares_memory(target, out):
+        msg = ("`out` must be contiguous.")
+        raise ValueError(msg)
+    target[..., slices[0]] = first
+
+    rest = slices[1:]
+    if workers > 1 and len(rest) > 1:
+        with ThreadPoolExecutor(min(int(workers), len(rest))) as executor:
+            for f in [executor.submit(run, sl, target) for sl in rest]:
+                f.result()
+    else:
+        for sl in rest:
+            run(sl, target)
+
+    if isinstance(out, np.memmap):
+        out.flush()
+    return out
+
+
+def blocks(n, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    slices splitting range(n) into blocks of at most `chunk_size`
+    """
+
+    for start in range(0, int(n), int(chunk_size)):
+        yield slice(start, min(start + int(chunk_size), int(n)))
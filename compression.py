@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+
+"""
+compression of joint data vectors onto their most informative modes
+
+A `Compression` projects model vectors of length N onto m << N whitened
+modes, so that the chi-square of a model is a sum of m squares.  The
+projection is computed once per set of measurements from their cached
+covariance matrix:
+
+* by default the modes are the eigenvectors of the covariance matrix, ranked
+  by the signal-to-noise of the data vector in each mode, (v^T d)^2/lambda;
+
+* given signal templates, e.g. derivatives of the model with respect to the
+  fitted parameters, the modes are Karhunen-Loeve modes, the principal
+  components of the whitened templates.
+
+`Compression.information` is the fraction of the total signal-to-noise (or of
+the trace of the Fisher matrix of the templates) retained by the modes.
+"""
+
+from __future__ import (division, print_function, absolute_import, unicode_literals)
+import hashlib
+import numpy as np
+from .likelihood import data_vector
+from .measurement_registry import MeasurementRegistry
+
+__all__ = ['Compression', 'compress']
+
+#fraction of the information kept when the number of modes is not given
+DEFAULT_RETAIN = 0.99
+
+FORMAT_VERSION = 1
+
+#compressions keyed by the identity of the inputs and the options
+_compressions = MeasurementRegistry(maxsize=64, name='compressions')
+
+
+class Compression(object):
+    """
+    linear compression of a data vector
+
+    Attributes
+    ----------
+    matrix : numpy.ndarray
+        array of shape (m, N) projecting a model vector of length N, ordered
+        as for `likelihood.chi_square`, onto m whitened modes
+
+    data : numpy.ndarray
+        the compressed data vector of shape (m,)
+
+    mode_information : numpy.ndarray
+        array of shape (m,) of the fraction of the information in each mode
+
+    digest : string
+        SHA-256 hash of the data vector and covariance matrix the compression
+        was computed from
+    """
+
+    def __init__(self, matrix, data, mode_information, digest):
+        self.matrix = np.ascontiguousarray(matrix, dtype=np.float64)
+        self.data = np.asarray(data, dtype=np.float64)
+        self.mode_information = np.asarray(mode_information, dtype=np.float64)
+        self.digest = str(digest)
+        for a in (self.matrix, self.data, self.mode_information):
+            a.setflags(write=False)
+
+    @property
+    def n_modes(self):
+        """
+        number of modes m
+        """
+        return self.matrix.shape[0]
+
+    @property
+    def information(self):
+        """
+        fraction of the information retained by the modes
+        """
+        return float(np.sum(self.mode_information))
+
+    def project(self, model):
+        """
+        compress model vectors
+
+        Parameters
+        ----------
+        model : array_like
+            array of shape (N,) or (n_walkers, N)
+
+        Returns
+        -------
+        compressed : numpy.ndarray
+            array of shape (m,) or (n_walkers, m)
+        """
+
+        model = np.asarray(model, dtype=np.float64)
+        if model.shape[-1] != self.matrix.shape[1]:
+            msg = ("model vectors have length {0}, the compression expects {1}."
+                   .format(model.shape[-1], self.matrix.shape[1]))
+            raise ValueError(msg)
+        return model.dot(self.matrix.T)
+
+    def chi_square(self, model):
+        """
+        chi-square of one or many model vectors in the compressed space
+
+        Parameters
+        ----------
+        model : array_like
+            array of shape (N,) or (n_walkers, N)
+
+        Returns
+        -------
+        chi2 : float or numpy.ndarray
+            chi-square of each model, with shape model.shape[:-1]
+        """
+
+        r = self.project(model) - self.data
+        return np.sum(r*r, axis=-1)
+
+    def log_likelihood(self, model):
+        """
+        Gaussian log-likelihood, up to a constant, in the compressed space
+        """
+        return -0.5*self.chi_square(model)
+
+    def save(self, path):
+        """
+        write the compression to a ``.npz`` file
+
+        The file holds plain arrays only and is loaded without pickle.
+        """
+
+        np.savez(path, version=np.array(FORMAT_VERSION), matrix=self.matrix, data=self.data,
+                 mode_information=self.mode_information, digest=np.array(self.digest))
+
+    @classmethod
+    def load(cls, path, measurements=None):
+        """
+        read a compression written by `save`
+
+        Parameters
+        ----------
+        path : string
+            path to the ``.npz`` file
+
+        measurements : tuple or list, optional
+            if given, check that the compression was computed from these
+            measurements, see `likelihood.data_vector`
+
+        Returns
+        -------
+        compression : Compression
+        """
+
+        with np.load(path, allow_pickle=False) as f:
+            if int(f['version']) != FORMAT_VERSION:
+                msg = ("unsupported compression file version {0}.".format(int(f['version'])))
+                raise ValueError(msg)
+            compression = cls(f['matrix'], f['data'], f['mode_information'], f['digest'][()])
+
+        if measurements is not None:
+            data, cov, mask = data_vector(measurements)
+            if _digest(data, cov, mask) != compression.digest:
+                msg = ("the compression was computed from different measurements.")
+                raise ValueError(msg)
+        return compression
+
+    def __repr__(self):
+        return "Compression(n_modes={0}, length={1}, information={2:.4f})".format(
+            self.n_modes, self.matrix.shape[1], self.information)
+
+
+def compress(measurements, n_modes=None, retain=DEFAULT_RETAIN, signal=None):
+    """
+    compute, or return the cached, compression of one or more measurements
+
+    Parameters
+    ----------
+    measurements : tuple or list
+        a measurement as returned by one of the loaders, or a list of them for
+        a joint data vector, see `likelihood.data_vector`
+
+    n_modes : int, optional
+        number of modes kept
+
+    retain : float
+        if `n_modes` is not given, keep the fewest modes retaining at least
+        this fraction of the information
+
+    signal : array_like, optional
+        array of shape (k, N) of signal templates on the model vector, e.g.
+        the derivatives of the model with respect to k parameters.  If not
+        given, the modes are the eigenvectors of the covariance matrix
+        ranked by the signal-to-noise of the data.
+
+    Returns
+    -------
+    compression : Compression
+
+    Notes
+    -----
+    Compressions without `signal` are cached on the identity of the inputs,
+    like `likelihood.data_vector`.  Entries masked out of the data vector
+    (non-finite values) get zero weight in the projection.
+    """
+
+    if signal is not None:
+        return _compress(measurements, n_modes, retain, signal)
+
+    if isinstance(measurements, tuple):
+        items = [measurements]
+    else:
+        items = list(measurements)
+    key = (tuple((id(m[0]), id(m[1])) if isinstance(m, tuple) else id(m) for m in items),
+           n_modes, retain)
+
+    def build():
+        #hold references to the inputs so the ids used in the key stay valid
+        return _compress(measurements, n_modes, retain, None), measurements
+
+    return _compressions.get(key, build)[0]
+
+
+def _compress(measurements, n_modes, retain, signal):
+    data, cov, mask = data_vector(measurements)
+    n = len(data)
+
+    if signal is None:
+        #eigenvectors of C, ranked by the signal-to-noise of the data
+        eigenvalues, vectors = np.linalg.eigh(cov.array)
+        if eigenvalues[0] <= 0:
+            raise cov._not_positive_definite()
+        weights = vectors.T/np.sqrt(eigenvalues)[:,None]
+        info = weights.dot(data)**2
+    else:
+        signal = np.atleast_2d(np.asarray(signal, dtype=np.float64))
+        if signal.shape[1] != len(mask):
+            msg = ("signal templates have length {0}, the model vector has length {1}."
+                   .format(signal.shape[1], len(mask)))
+            raise ValueError(msg)
+        #principal components of the whitened templates, projected with
+        #u^T L^{-1} so that the compressed data have unit covariance
+        whitened = cov.whiten(signal[:,mask])
+        u, s, _ = np.linalg.svd(whitened.T, full_matrices=False)
+        if cov.is_diagonal:
+            weights = u.T/np.sqrt(np.diagonal(cov.array))
+        else:
+            from scipy.linalg import solve_triangular
+            weights = solve_triangular(cov.cholesky, u, lower=True, trans='T',
+                                       check_finite=False).T
+        info = s**2
+
+    order = np.argsort(info, kind='stable')[::-1]
+    info = info[order]/np.sum(info)
+    weights = weights[order]
+
+    if n_modes is None:
+        n_modes = int(np.searchsorted(np.cumsum(info), retain*(1.0 - 1e-12))) + 1
+    n_modes = min(max(int(n_modes), 1), len(info), n)
+    weights = weights[:n_modes]
+    info = info[:n_modes]
+
+    #deterministic signs, largest component of each mode positive
+    signs = np.sign(weights[np.arange(n_modes), np.argmax(np.abs(weights), axis=1)])
+    weights = weights*signs[:,None]
+
+    matrix = np.zeros((n_modes, len(mask)))
+    matrix[:,mask] = weights
+    return Compression(matrix, weights.dot(data), info, _digest(data, cov, mask))
+
+
+def _digest(data, cov, mask):
+    h = hashlib.sha256()
+    for a in (data, cov.array, mask):
+        a = np.ascontiguousarray(a)
+        h.update(str(a.shape).encode())
+        h.update(a.tobytes())
+    return h.hexdigest()
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+
+"""
+covariance matrices with cached factorizations
+"""
+
+from __future__ import (division, print_function, absolute_import, unicode_literals)
+import numpy as np
+from . import instrumentation
+
+__all__ = ['Covariance']
+
+#eigenvalue floor of `Covariance.regularize`, relative to the largest eigenvalue
+DEFAULT_RTOL = 1e-6
+
+
+class Covariance(np.ndarray):
+    """
+    covariance matrix of a measurement
+
+    A plain two dimensional `numpy.ndarray` (elementwise operators, no
+    `numpy.matrix` semantics) which additionally computes its Cholesky
+    factor, precision matrix and log-determinant the first time they are
+    needed and caches them on the instance.  The wp loaders return the same
+    `Covariance` object on every call, so the factorization is done once per
+    measurement.
+
+    The cache assumes the matrix is not modified in place; the instances
+    returned by the loaders are read-only.
+
+    Examples
+    --------
+    >>> from lss_observations import zehavi_2011_wp
+    >>> measurement, cov = zehavi_2011_wp(-21.0, -20.0)
+    >>> chi2 = cov.mahalanobis(model - measurement[1])
+    """
+
+    def __new__(cls, cov, name=None):
+        """
+        Parameters
+        ----------
+        cov : array_like
+            symmetric positive definite matrix of shape (N,N).  No copy is
+            made if `cov` is already a float64 array.
+
+        name : string, optional
+            the measurement the matrix belongs to, used in error messages
+        """
+
+        obj = np.asarray(cov, dtype=np.float64).view(cls)
+        if obj.ndim != 2 or obj.shape[0] != obj.shape[1]:
+            msg = ("covariance matrix must be square.")
+            raise ValueError(msg)
+        obj.name = name
+        return obj
+
+    def __array_finalize__(self, obj):
+        self._factors = {}
+        self.name = getattr(obj, 'name', None)
+
+    def __array_wrap__(self, obj, context=None, return_scalar=False):
+        #results of arithmetic are plain arrays, they do not share the cache
+        obj = obj.view(np.ndarray)
+        if return_scalar:
+            return obj[()]
+        return obj
+
+    def __getitem__(self, item):
+        result = super(Covariance, self).__getitem__(item)
+        if isinstance(result, Covariance):
+            return result.view(np.ndarray)
+        return result
+
+    @classmethod
+    def from_errors(cls, sigma):
+        """
+        build a diagonal covariance matrix from uncorrelated errors
+
+        Parameters
+        ----------
+        sigma : array_like
+            array of shape (N,) of 1-sigma errors
+
+        Returns
+        -------
+        cov : Covariance
+            matrix of shape (N,N)
+        """
+
+        sigma = np.asarray(sigma, dtype=np.float64)
+        return cls(np.diag(sigma**2))
+
+    def _factor(self, name, compute):
+        factors = self.__dict__.setdefault('_factors', {})
+        try:
+            return factors[name]
+        except KeyError:
+            with instrumentation.span('covariance.' + name):
+                value = compute()
+            if isinstance(value, np.ndarray):
+                value.setflags(write=False)
+            factors[name] = value
+            return value
+
+    @property
+    def array(self):
+        """
+        the matrix as a plain `numpy.ndarray` view
+        """
+        return self.view(np.ndarray)
+
+    @property
+    def is_diagonal(self):
+        """
+        True if all off-diagonal elements are zero
+        """
+        return self._factor('is_diagonal', lambda: not np.any(self.array - np.diag(np.diagonal(self.array))))
+
+    @property
+    def cholesky(self):
+        """
+        lower triangular Cholesky factor L, with C = L L^T
+
+        Raises
+        ------
+        ValueError
+            if the matrix is not positive definite, see `regularize`
+        """
+        return self._factor('cholesky', self._cholesky)
+
+    def _cholesky(self):
+        try:
+            return np.linalg.cholesky(self.array)
+        except np.linalg.LinAlgError:
+            raise self._not_positive_definite()
+
+    def _not_positive_definite(self):
+        """
+        the error raised when a factorization needs a positive definite matrix
+        """
+
+        eigenvalue = np.linalg.eigvalsh(self.array)[0]
+        msg = ("covariance matrix{0} is not positive definite, its smallest eigenvalue "
+               "is {1:.3g}.  Use `Covariance.regularize` to clip its eigenvalues, or "
+               "leave the measurement out.".format(
+                   '' if self.name is None else ' of ' + self.name, eigenvalue))
+        return ValueError(msg)
+
+    def regularize(self, rtol=DEFAULT_RTOL):
+        """
+        positive definite version of the matrix with clipped eigenvalues
+
+        If the matrix is not positive definite, its eigenvalues below `rtol`
+        times the largest eigenvalue are raised to that floor and the
+        eigenvectors are kept.  Modes whose variance is
+        clipped get a large weight in the chi-square, so fits using a
+        regularized matrix should be checked against leaving the measurement
+        out.
+
+        Parameters
+        ----------
+        rtol : float
+            eigenvalue floor relative to the largest eigenvalue
+
+        Returns
+        -------
+        cov : Covariance
+            the matrix itself if it is positive definite, otherwise a new
+            matrix
+        """
+
+        eigenvalues, vectors = np.linalg.eigh(self.array)
+        if eigenvalues[0] > 0:
+            return self
+        eigenvalues = np.maximum(eigenvalues, rtol*eigenvalues[-1])
+        cov = (vectors*eigenvalues).dot(vectors.T)
+        return Covariance(0.5*(cov + cov.T), name=self.name)
+
+    @property
+    def precision(self):
+        """
+        inverse of the covariance matrix
+        """
+        return self._factor('precision', lambda: self.solve(np.eye(self.shape[0])))
+
+    @property
+    def logdet(self):
+        """
+        natural log of the determinant of the covariance matrix
+        """
+        return self._factor('logdet', lambda: 2.0*np.sum(np.log(np.diag(self.cholesky))))
+
+    def solve(self, b):
+        """
+        solve C x = b using the cached Cholesky factor
+
+        Parameters
+        ----------
+        b : array_like
+            array of shape (N,) or (N,K)
+
+        Returns
+        -------
+        x : numpy.ndarray
+            array with the same shape as `b`
+        """
+        from scipy.linalg import cho_solve
+        return cho_solve((self.cholesky, True), np.asarray(b, dtype=np.float64))
+
+    def whiten(self, r):
+        """
+        transform vectors so that they have unit covariance, L^{-1} r
+
+        Parameters
+        ----------
+        r : array_like
+            array of shape (..., N), vectors along the last axis
+
+        Returns
+        -------
+        w : numpy.ndarray
+            array with the same shape as `r`
+        """
+
+        from scipy.linalg import solve_triangular
+
+        r = np.asarray(r, dtype=np.float64)
+        if self.is_diagonal:
+            #uncorrelated errors, e.g. measurements that only provide sigma
+            return r/self._factor('sigma', lambda: np.sqrt(np.diagonal(self.array)))
+        shape = r.shape
+        r = r.reshape(-1, shape[-1]).T
+        w = solve_triangular(self.cholesky, r, lower=True, check_finite=False)
+        return w.T.reshape(shape)
+
+    def mahalanobis(self, r):
+        """
+        squared Mahalanobis distance r^T C^{-1} r
+
+        Parameters
+        ----------
+        r : array_like
+            residual of shape (N,), or a stack of residuals of shape (..., N)
+
+        Returns
+        -------
+        d2 : float or numpy.ndarray
+            squared distance for each residual, with shape r.shape[:-1]
+        """
+
+        w = self.whiten(r)
+        return np.sum(w*w, axis=-1)
@@ -0,0 +1,428 @@
+# -*- coding: utf-8 -*-
+
+"""
+download the remotely hosted tables listed in the data manifest
+
+The manifest, ``data_manifest.json``, records the source URL, size and
+SHA-256 hash of every table that was downloaded from the authors' web pages
+rather than transcribed from the papers.  `fetch` downloads them concurrently,
+reusing one keep-alive connection per host and worker thread, checks each
+file against its hash while it is streamed and moves it into the data tree
+only once it has been verified, so readers never see a partial or corrupt
+table.  Files that are already present and match the manifest are skipped.
+
+A mirror of the data tree, e.g. on a shared file system or a local web
+server, can be used instead of the original URLs::
+
+    python -m lss_observations.fetch --mirror /shared/lss_observations
+    python -m lss_observations.fetch --mirror http://cache.local/lss_observations
+"""
+
+from __future__ import (division, print_function, absolute_import, unicode_literals)
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+__all__ = ['fetch', 'verify', 'load_manifest', 'update_manifest', 'file_hash']
+
+MANIFEST_VERSION = 1
+
+DEFAULT_WORKERS = 8
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_RETRIES = 2
+
+#number of redirects followed before giving up
+MAX_REDIRECTS = 5
+
+CHUNK_SIZE = 2**16
+
+_package_dir = os.path.dirname(os.path.abspath(__file__))
+_manifest_path = os.path.join(_package_dir, 'data_manifest.json')
+
+#keep-alive connections of each worker thread, keyed by (scheme, host)
+_local = threading.local()
+
+
+def load_manifest(path=None):
+    """
+    read the data manifest
+
+    Parameters
+    ----------
+    path : string, optional
+        path to the manifest, by default the one shipped with the package
+
+    Returns
+    -------
+    files : dict
+        mapping of the path of each table relative to the package to a dict
+        with 'url', 'sha256' and 'size'
+    """
+
+    if path is None:
+        path = _manifest_path
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest.get('version') != MANIFEST_VERSION:
+        msg = ("unsupported data manifest version {0}.".format(manifest.get('version')))
+        raise ValueError(msg)
+    return manifest['files']
+
+
+def file_hash(path):
+    """
+    SHA-256 hex digest of a file
+    """
+
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def verify(dest=None, manifest=None):
+    """
+    check the tables in the data tree against the manifest
+
+    Parameters
+    ----------
+    dest : string, optional
+        root of the data tree, by default the package directory
+
+    manifest : dict, optional
+        manifest as returned by `load_manifest`
+
+    Returns
+    -------
+    bad : list
+        relative paths of the tables that are missing or do not match
+    """
+
+    if dest is None:
+        dest = _package_dir
+    if manifest is None:
+        manifest = load_manifest()
+
+    return [relpath for relpath, entry in sorted(manifest.items())
+            if not _is_current(os.path.join(dest, relpath), entry)]
+
+
+def fetch(paths=None, mirror=None, dest=None, workers=DEFAULT_WORKERS, force=False,
+          timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, manifest=None):
+    """
+    download the tables in the manifest that are missing or out of date
+
+    Parameters
+    ----------
+    paths : list, optional
+        relative paths of the tables to fetch, by default all of them
+
+    mirror : string, optional
+        base URL (http://, https:// or file://) or local directory laid out
+        like the data tree.  Each table is fetched from
+        ``mirror/<relative path>`` instead of its original URL.
+
+    dest : string, optional
+        root of the data tree, by default the package directory
+
+    workers : int
+        number of concurrent downloads
+
+    force : bool
+        download tables even if the local copy matches the manifest
+
+    timeout : float
+        socket timeout in seconds
+
+    retries : int
+        number of further attempts for each failed download
+
+    manifest : dict, optional
+        manifest as returned by `load_manifest`
+
+    Returns
+    -------
+    status : dict
+        mapping of relative path to 'downloaded' or 'current'
+
+    Raises
+    ------
+    IOError
+        if any table could not be downloaded or failed verification.  All
+        other tables are still fetched.
+    """
+
+    if dest is None:
+        dest = _package_dir
+    if manifest is None:
+        manifest = load_manifest()
+    if paths is None:
+        paths = sorted(manifest)
+    else:
+        unknown = [relpath for relpath in paths if relpath not in manifest]
+        if unknown:
+            msg = ("not in the data manifest: {0}".format(', '.join(unknown)))
+            raise ValueError(msg)
+
+    if mirror is not None and '://' not in mirror:
+        mirror = _file_url(os.path.abspath(mirror))
+
+    def task(relpath):
+        entry = manifest[relpath]
+        path = os.path.join(dest, relpath)
+        if not force and _is_current(path, entry):
+            return 'current'
+        if mirror is None:
+            url = entry['url']
+        else:
+            url = mirror.rstrip('/') + '/' + relpath
+        for attempt in range(retries + 1):
+            try:
+                _download(url, path, entry, timeout)
+                return 'downloaded'
+            except (IOError, OSError, ValueError) as e:
+                error = e
+        raise error
+
+    status = {}
+    errors = []
+    with ThreadPoolExecutor(max(1, min(workers, len(paths)))) as executor:
+        futures = [(relpath, executor.submit(task, relpath)) for relpath in paths]
+        for relpath, future in futures:
+            try:
+                status[relpath] = future.result()
+            except (IOError, OSError, ValueError) as e:
+                errors.append('{0}: {1}'.format(relpath, e))
+
+    if errors:
+        msg = ("failed to fetch {0} of {1} tables:\n".format(len(errors), len(paths)) +
+               '\n'.join(errors))
+        raise IOError(msg)
+    return status
+
+
+def update_manifest(path=None, dest=None):
+    """
+    record the hashes and sizes of the tables currently in the data tree
+
+    Run after intentionally updating a table.  The URLs of the entries are
+    kept.
+
+    Returns
+    -------
+    files : dict
+        the new manifest entries
+    """
+
+    if path is None:
+        path = _manifest_path
+    if dest is None:
+        dest = _package_dir
+
+    files = load_manifest(path)
+    for relpath, entry in files.items():
+        filepath = os.path.join(dest, relpath)
+        entry['sha256'] = file_hash(filepath)
+        entry['size'] = os.path.getsize(filepath)
+
+    _atomic_write_text(path, json.dumps({'version': MANIFEST_VERSION, 'files': files},
+                                        indent=1, sort_keys=True) + '\n')
+    return files
+
+
+def _is_current(path, entry):
+    try:
+        if os.path.getsize(path) != entry['size']:
+            return False
+        return file_hash(path) == entry['sha256']
+    except (IOError, OSError):
+        return False
+
+
+def _download(url, path, entry, timeout):
+    """
+    stream `url` into a temporary file next to `path`, verify it and move it
+    into place
+    """
+
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.part')
+    try:
+        h = hashlib.sha256()
+        size = 0
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in _open_stream(url, timeout):
+                h.update(chunk)
+                f.write(chunk)
+                size += len(chunk)
+        if size != entry['size'] or h.hexdigest() != entry['sha256']:
+            msg = ("{0} does not match the data manifest "
+                   "({1} bytes, sha256 {2}).".format(url, size, h.hexdigest()))
+            raise ValueError(msg)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _open_stream(url, timeout):
+    """
+    iterate over the content of `url` in chunks
+    """
+
+    from urllib.parse import urlsplit, urljoin
+
+    for i in range(MAX_REDIRECTS + 1):
+        parts = urlsplit(url)
+        if parts.scheme == 'file':
+            return _read_file(_file_path(url))
+        if parts.scheme not in ('http', 'https'):
+            msg = ("unsupported URL scheme in {0}.".format(url))
+            raise ValueError(msg)
+
+        conn = _connection(parts.scheme, parts.netloc, timeout)
+        target = parts.path or '/'
+        if parts.query:
+            target += '?' + parts.query
+        try:
+            conn.request('GET', target, headers={'Connection': 'keep-alive'})
+            response = conn.getresponse()
+        except Exception:
+            #stale keep-alive connection, do not reuse it
+            _drop_connection(parts.scheme, parts.netloc)
+            raise
+
+        if response.status in (301, 302, 303, 307, 308):
+            location = response.getheader('Location')
+            response.read()
+            if not location:
+                break
+            url = urljoin(url, location)
+            continue
+        if response.status != 200:
+            response.read()
+            msg = ("HTTP {0} {1} for {2}.".format(response.status, response.reason, url))
+            raise IOError(msg)
+        return _read_response(response, parts.scheme, parts.netloc)
+
+    msg = ("too many redirects for {0}.".format(url))
+    raise IOError(msg)
+
+
+def _read_response(response, scheme, netloc):
+    try:
+        for chunk in iter(lambda: response.read(CHUNK_SIZE), b''):
+            yield chunk
+    except Exception:
+        _drop_connection(scheme, netloc)
+        raise
+    if response.will_close:
+        _drop_connection(scheme, netloc)
+
+
+def _read_file(path):
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            yield chunk
+
+
+def _connection(scheme, netloc, timeout):
+    """
+    keep-alive connection to a host, one per worker thread
+    """
+
+    import http.client
+
+    connections = _local.__dict__.setdefault('connections', {})
+    try:
+        return connections[(scheme, netloc)]
+    except KeyError:
+        pass
+    if scheme == 'https':
+        conn = http.client.HTTPSConnection(netloc, timeout=timeout)
+    else:
+        conn = http.client.HTTPConnection(netloc, timeout=timeout)
+    connections[(scheme, netloc)] = conn
+    return conn
+
+
+def _drop_connection(scheme, netloc):
+    connections = _local.__dict__.get('connections', {})
+    conn = connections.pop((scheme, netloc), None)
+    if conn is not None:
+        conn.close()
+
+
+def _file_url(path):
+    from urllib.request import pathname2url
+    return 'file://' + pathname2url(path)
+
+
+def _file_path(url):
+    from urllib.parse import urlsplit
+    from urllib.request import url2pathname
+    parts = urlsplit(url)
+    return url2pathname(parts.netloc + parts.path if parts.netloc not in ('', 'localhost')
+                        else parts.path)
+
+
+def _atomic_write_text(path, text):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="download the remotely hosted tables")
+    parser.add_argument('paths', nargs='*',
+                        help="relative paths of the tables to fetch, default all")
+    parser.add_argument('--mirror', default=None,
+                        help="base URL or directory of a mirror of the data tree")
+    parser.add_argument('--dest', default=None,
+                        help="root of the data tree, default the package directory")
+    parser.add_argument('-j', '--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--force', action='store_true',
+                        help="download tables that are already current")
+    parser.add_argument('--verify', action='store_true',
+                        help="only check the local tables against the manifest")
+    parser.add_argument('--update-manifest', action='store_true',
+                        help="record the hashes of the local tables in the manifest")
+    args = parser.parse_args(argv)
+
+    if args.update_manifest:
+        files = update_manifest(dest=args.dest)
+        print("recorded {0} tables".format(len(files)))
+        return 0
+
+    if args.verify:
+        bad = verify(args.dest)
+        for relpath in bad:
+            print("MISMATCH {0}".format(relpath))
+        return 1 if bad else 0
+
+    try:
+        status = fetch(args.paths or None, mirror=args.mirror, dest=args.dest,
+                       workers=args.workers, force=args.force)
+    except IOError as e:
+        print(e, file=sys.stderr)
+        return 1
+    n = sum(1 for s in status.values() if s == 'downloaded')
+    print("{0} tables downloaded, {1} already current".format(n, len(status) - n))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -7,15 +7,17 @@ projected two point correlation function measurements from Hearin et al. 2014.
 """
 
 from __future__ import print_function, division
-from astropy.table import Table
-from astropy.io import ascii
-import os
 import numpy as np
+from .measurement_registry import registry
+from .littleh import convert_measurement, WP_UNITS
+from .binary_store import get_table
+from .catalog import find
+from .stacking import stack_measurements
 
-__all__ = ['hearin_2014_wp']
+__all__ = ['hearin_2014_wp', 'hearin_2014_wp_bins']
 __author__=['Duncan Campbell']
 
-def hearin_2014_wp(mstar_thresh=10**9.49, sample='all'):
+def hearin_2014_wp(mstar_thresh=10**9.49, sample='all', h=None):
     """
     projected two point correlation function measurements from Hearin et al. 2014
     
@@ -31,6 +33,11 @@ def hearin_2014_wp(mstar_thresh=10**9.49, sample='all'):
         string indicating sample used in the wp calculation:
         e.g. 'all', 'red', 'blue'.
     
+    h : float or array_like, optional
+        if given, the measurement is converted from h=1 units to this value
+        of h, see `littleh.convert_measurement`.  An array of h values adds
+        a leading axis of the same shape.
+    
     Returns
     -------
     measurement : numpy.ndarray
@@ -39,62 +46,84 @@ def hearin_2014_wp(mstar_thresh=10**9.49, sample='all'):
     
     err : numpy.array
         error on the wp measurement
+    
+    Notes
+    -----
+    Measurements are cached in `lss_observations.measurement_registry.registry`
+    after the first call and the returned arrays are read-only.  Copy them
+    before modifying in place.
     """
     
-    littleh=0.7
-    
-    #get files for specified sample
-    if sample == 'all':
-        filename = 'table_1.dat'
-    elif sample == 'red':
-        filename = 'table_3.dat'
-    elif sample == 'blue':
-        filename = 'table_2.dat'
-    else:
-        msg = ("sample not recognized.")
-        raise ValueError(msg)
-    
-    #what are the mass thresholds in h=1?
-    mstar_thresholds = np.array([10.0**9.8, 10.0**10.2, 10.0**10.6]) * littleh**2.0
-    mstar_thresholds = np.log10(mstar_thresholds)
-    
-    #find nearest to the input value
-    mstar_thresh = np.log10(mstar_thresh)
-    mask = np.isclose(mstar_thresh, mstar_thresholds, atol=0.01)
-    
-    if np.any(mask):
-        mstar_thresh = mstar_thresholds[mask]
-    else:
-        msg = ("mass threshold not with 0.01 dex of an available threshold.")
-        raise ValueError(msg)
-    
-    #get files for specified stellar mass bin
-    if mask[0]:
-        column = 1
-    elif mask[1]:
-        column = 3
-    elif mask[2]:
-        column = 5
-    else:
-        msg = ("requested mass threshold not available.")
-        raise ValueError(msg)
+    #get file and column of the specified sample and stellar mass threshold
+    #(the thresholds of h=0.7 converted to h=1)
+    entry = find('hearin_2014', sample, mstar_thresh, None)
+    filename, column = entry.source
+    mstar_thresh = entry.lo
+    
+    key = ('hearin_2014', sample, mstar_thresh, None)
+    measurement = registry.get(key, lambda: _load_wp(filename, column))
+    if h is not None:
+        return convert_measurement(measurement, h, WP_UNITS)
+    return measurement
+
+
+def hearin_2014_wp_bins(sample='all'):
+    """
+    all stellar mass thresholds of a sample from Hearin et al. 2014 in one call
+    
+    Parameters
+    ----------
+    sample : string
+        'all', 'red', 'blue'
+    
+    Returns
+    -------
+    rp : numpy.ndarray
+        array of shape (15,) of rp in :math:`h^-1` Mpc
+    
+    wp : numpy.ndarray
+        array of shape (3,15) of wp in :math:`h^-1` Mpc
+    
+    covariance : numpy.ndarray
+        array of shape (3,15,15) of diagonal covariance matrices built from
+        the errors
+    
+    bins : numpy.ndarray
+        array of shape (3,) of the stellar mass thresholds in
+        :math:`h^{-2}M_{\odot}`
+    
+    Notes
+    -----
+    Each threshold is the cached measurement returned by `hearin_2014_wp`.
+    The stacked arrays are cached and read-only.
+    """
+    
+    bins = [10**9.49, 10**9.89, 10**10.29]
+    
+    def load():
+        rp, wp, cov = stack_measurements([hearin_2014_wp(mstar_thresh, sample)
+                                          for mstar_thresh in bins])
+        return rp, wp, cov, np.array(bins)
+    
+    key = ('hearin_2014', sample, 'bins', None)
+    return registry.get(key, load)
+
+
+def _load_wp(filename, column):
+    """
+    read the wp measurement and errors stored in `column` of `filename`
+    """
     
     #read in data
-    filepath = os.path.dirname(__file__)
-    filepath = os.path.join(filepath,'wp_measurements/hearin_2014_data/')
-    data = ascii.read(filepath+filename)
+    data = get_table('wp_measurements/hearin_2014_data/'+filename)
     
-    rp = np.array(data.columns[0])
-    wp = np.array(data.columns[column])
-    sigma = np.array(data.columns[column+1])
+    rp = data[:,0]
+    wp = data[:,column]
+    sigma = data[:,column+1]
     
     measurement = np.vstack((rp,wp))
     
-    #convert to h=1
-    measurement[0] = measurement[0,:]#*littleh
-    measurement[1] = measurement[1,:]#*littleh
-    sigma = sigma#*littleh
+    #the table is already in h=1 units, other values of h are handled by
+    #`littleh.convert_measurement`
     
     return measurement, sigma
-    
-    
\ No newline at end of file
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+
+"""
+vectorized upper incomplete gamma function for Schechter function integrals
+"""
+
+from __future__ import (division, print_function, absolute_import, unicode_literals)
+import numpy as np
+from scipy.special import gamma, gammaincc, exp1, zeta
+
+__all__ = ['upper_incomplete_gamma']
+
+#within this distance of the non-positive integers, and for x <= 1, the
+#recurrence is started from the series of `_small_s`
+SMALL_S = 0.01
+
+#coefficients of s^k in the series of log(gamma(1+s))/s, k = 1, 2, ...
+_LOG_GAMMA_COEFFICIENTS = np.array([(-1)**k*zeta(k)/k for k in range(2, 12)])
+
+
+def upper_incomplete_gamma(s, x):
+    """
+    non-regularized upper incomplete gamma function at double precision
+
+    .. math::
+        \\Gamma(s,x) = \\int_x^{\\infty} t^{s-1} e^{-t} dt
+
+    Unlike `scipy.special.gammaincc`, `s` may be zero or negative, as needed
+    to integrate Schechter functions with a faint end slope alpha <= -1.
+
+    Parameters
+    ----------
+    s : array_like
+        shape parameter
+
+    x : array_like
+        lower limit of the integral, x >= 0.  For s <= 0 the integral diverges
+        at x = 0 and inf is returned; x = inf gives 0.
+
+    Returns
+    -------
+    G : numpy.ndarray
+        array with the broadcast shape of `s` and `x`
+
+    Notes
+    -----
+    For s > 0 this is ``gamma(s)*gammaincc(s, x)``.  Otherwise `s` is shifted
+    up by the integer n = ceil(-s) into [0, 1), evaluated there (with
+    ``exp1`` for s = 0), and brought back down with the recurrence
+
+    .. math::
+        \\Gamma(s,x) = (\\Gamma(s+1,x) - x^s e^{-x})/s
+
+    A step of the recurrence with s close to zero cancels, so for x <= 1 and
+    s within `SMALL_S` of a non-positive integer the recurrence starts from
+    the power series at that integer plus s instead.  For s <= 0 and x > 1,
+    where the recurrence suffers from cancellation, the Legendre continued
+    fraction is used instead.
+
+    Compared with ``mpmath.gammainc`` the relative error is below 2e-13 for
+    -3 < s < 3 and 0 < x <= 200, including s close to the non-positive
+    integers.
+    """
+
+    s, x = np.broadcast_arrays(np.asarray(s, dtype=float), np.asarray(x, dtype=float))
+    if np.any(x < 0):
+        msg = ("`x` must be non-negative.")
+        raise ValueError(msg)
+
+    n = np.where(s > 0, 0, np.ceil(-s))
+    s0 = s + n
+    #near the non-positive integers start from the series at s0 - 1 (or s0),
+    #within SMALL_S of zero, and take one step less
+    series = (x > 0) & (x <= 1.0) & ((s0 < SMALL_S) | ((n > 0) & (s0 > 1.0 - SMALL_S)))
+    shift = series & (s0 > 0.5)
+    s0 = np.where(shift, s0 - 1.0, s0)
+    n = np.where(shift, n - 1.0, n)
+    #the downward recurrence loses precision to cancellation at large x, where
+    #the continued fraction converges quickly instead
+    use_cf = (s <= 0) & (x > 1.0)
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        G = np.where(s0 > 0, gamma(np.where(s0 > 0, s0, 1.0))*gammaincc(np.where(s0 > 0, s0, 1.0), x), exp1(x))
+        if np.any(series):
+            G = np.where(series, _small_s(np.where(series, s0, 0.0), np.where(series, x, 1.0)), G)
+
+        #step down one unit at a time, only where more steps are needed
+        for k in range(int(n.max()) if n.size else 0):
+            step = n > k
+            sk = s0 - k - 1.0
+            G = np.where(step, (G - x**sk*np.exp(-x))/sk, G)
+
+        if np.any(use_cf):
+            G = np.where(use_cf, _continued_fraction(s, np.where(use_cf, x, 2.0)), G)
+
+        G = np.where((x == 0) & (s <= 0), np.inf, G)
+        G = np.where(x == np.inf, 0.0, G)
+
+    if G.ndim == 0:
+        return G[()]
+    return G
+
+
+def _small_s(s, x, n_terms=25):
+    """
+    upper incomplete gamma function for |s| < SMALL_S and 0 < x <= 1 from
+
+    .. math::
+        \\Gamma(s,x) = (\\Gamma(1+s) - x^s)/s - x^s \\sum_{k=1}^{\\infty} \\frac{(-x)^k}{k!(s+k)}
+
+    with the first term written as x^s expm1(s a)/s, a = log(Gamma(1+s))/s - log(x),
+    which does not cancel as s goes to zero
+    """
+
+    a = -np.euler_gamma - np.log(x)
+    power = np.ones_like(s)
+    for c in _LOG_GAMMA_COEFFICIENTS:
+        power = power*s
+        a = a + c*power
+    y = s*a
+    #expm1(y)/y, 1 at y = 0
+    ratio = np.where(y == 0, 1.0, np.expm1(y)/np.where(y == 0, 1.0, y))
+
+    total = np.zeros_like(a)
+    term = np.ones_like(a)
+    for k in range(1, n_terms):
+        term = term*(-x)/k
+        total = total + term/(s + k)
+    return x**s*(a*ratio - total)
+
+
+def _continued_fraction(s, x, max_iter=500, tol=1e-15):
+    """
+    Legendre continued fraction for the upper incomplete gamma function,
+    evaluated with the modified Lentz algorithm.  Converges for x > 1.
+    """
+
+    tiny = 1e-300
+    b = x + 1.0 - s
+    c = 1.0/tiny
+    d = 1.0/b
+    h = d
+    for i in range(1, max_iter):
+        an = -i*(i - s)
+        b = b + 2.0
+        d = an*d + b
+        d = np.where(np.abs(d) < tiny, tiny, d)
+        c = b + an/c
+        c = np.where(np.abs(c) < tiny, tiny, c)
+        d = 1.0/d
+        delta = d*c
+        h = h*delta
+        if np.all(np.abs(delta - 1.0) < tol):
+            break
+    return np.exp(-x + s*np.log(x))*h
@@ -0,0 +1,401 @@
+# -*- coding: utf-8 -*-
+
+"""
+opt-in timing and counters of the stages of loading measurements and
+evaluating models
+
+Instrumentation is off by default and then costs one check per instrumented
+call.  When it is on, each stage records its call count, cumulative and
+percentile latencies and the bytes it read, and each cache its hit rate:
+
+* ``store.open``, ``store.parse`` and ``store.read``: opening (and building)
+  the binary store, parsing the ASCII tables and reading tables from it
+
+* ``load.<cache>[.<paper>]``: loading a measurement, data vector, table...
+  on a miss of a `MeasurementRegistry`, e.g. ``load.measurements.zehavi_2011``
+
+* ``covariance.<factor>``: factorizations of covariance matrices
+
+* ``evaluate.<model>``, ``integrate.<model>``: calls and integrals of the
+  stellar mass and luminosity functions, with an ``.astropy`` suffix for the
+  astropy backend
+
+* ``likelihood.chi_square``
+
+Instrumentation is enabled with `enable`, within a block with `profile`, or
+for a whole run by setting the ``LSS_OBSERVATIONS_INSTRUMENT`` environment
+variable to 1 (or to ``trace`` to also record trace events).
+
+Examples
+--------
+>>> from lss_observations import instrumentation
+>>> with instrumentation.profile(trace=True) as p:
+...     run_fit()
+>>> p.stats()['stages']['load.measurements.zehavi_2011']['total']
+>>> p.export_chrome_trace('fit.trace.json')
+"""
+
+from __future__ import (division, print_function, absolute_import, unicode_literals)
+import functools
+import os
+import random
+import threading
+import time
+
+__all__ = ['enable', 'disable', 'enabled', 'reset', 'profile', 'span', 'timed',
+           'count_cache', 'stats', 'export_json', 'export_chrome_trace', 'Profile']
+
+#latency samples kept per stage for the percentiles
+MAX_SAMPLES = 4096
+
+#trace events kept per profile
+MAX_EVENTS = 100000
+
+PERCENTILES = (50, 90, 99)
+
+#active recorders, the global one if enabled and one per open `profile`.
+#The tuple is replaced rather than modified, so it can be read without a lock.
+_recorders = ()
+_lock = threading.Lock()
+
+
+class Profile(object):
+    """
+    statistics recorded while instrumentation was on
+
+    Returned by `profile`; the statistics of `enable` are available through
+    the module level `stats`, `export_json` and `export_chrome_trace`.
+    """
+
+    def __init__(self, trace=False):
+        """
+        Parameters
+        ----------
+        trace : bool
+            if True, also keep up to `MAX_EVENTS` timed events for
+            `export_chrome_trace`
+        """
+
+        self.trace = trace
+        self._lock = threading.Lock()
+        self._random = random.Random(0)
+        self.reset()
+
+    def reset(self):
+        """
+        drop everything recorded so far
+        """
+
+        with self._lock:
+            self._stages = {}
+            self._caches = {}
+            self._events = []
+            self._dropped = 0
+            self._start = time.perf_counter()
+            self._start_time = time.time()
+
+    def record(self, name, start, seconds, nbytes=0):
+        with self._lock:
+            try:
+                stage = self._stages[name]
+            except KeyError:
+                stage = self._stages[name] = [0, 0.0, 0.0, 0, []]
+            stage[0] += 1
+            stage[1] += seconds
+            stage[2] = max(stage[2], seconds)
+            stage[3] += nbytes
+            #reservoir sample of the latencies
+            samples = stage[4]
+            if len(samples) < MAX_SAMPLES:
+                samples.append(seconds)
+            else:
+                i = self._random.randrange(stage[0])
+                if i < MAX_SAMPLES:
+                    samples[i] = seconds
+
+            if self.trace:
+                if len(self._events) < MAX_EVENTS:
+                    self._events.append((name, start, seconds, nbytes, threading.get_ident()))
+                else:
+                    self._dropped += 1
+
+    def count_cache(self, name, hit):
+        with self._lock:
+            counts = self._caches.setdefault(name, [0, 0])
+            counts[0 if hit else 1] += 1
+
+    def stats(self):
+        """
+        snapshot of the statistics
+
+        Returns
+        -------
+        stats : dict
+            ``stages`` maps each stage to its ``count``, ``total``, ``mean``,
+            ``max`` and percentile (``p50``, ``p90``, ``p99``) latencies in
+            seconds and the ``bytes`` read, ``caches`` maps each cache to its
+            ``hits``, ``misses`` and ``hit_rate``, and ``elapsed`` is the
+            wall time in seconds since the profile started.
+        """
+
+        with self._lock:
+            stages = {}
+            for name, (count, total, maximum, nbytes, samples) in self._stages.items():
+                s = dict(count=count, total=total, mean=total/count, max=maximum, bytes=nbytes)
+                samples = sorted(samples)
+                for q in PERCENTILES:
+                    s['p{0}'.format(q)] = _percentile(samples, q)
+                stages[name] = s
+            caches = {}
+            for name, (hits, misses) in self._caches.items():
+                caches[name] = dict(hits=hits, misses=misses, hit_rate=hits/(hits + misses))
+            return dict(stages=stages, caches=caches,
+                        elapsed=time.perf_counter() - self._start)
+
+    def export_json(self, path=None):
+        """
+        write `stats` as JSON
+
+        Parameters
+        ----------
+        path : string, optional
+            output file.  If not given, the JSON string is returned.
+        """
+
+        import json
+        text = json.dumps(self.stats(), indent=2, sort_keys=True)
+        if path is None:
+            return text
+        with open(path, 'w') as f:
+            f.write(text)
+
+    def export_chrome_trace(self, path):
+        """
+        write the recorded events in the Chrome trace event format, which
+        can be opened in chrome://tracing or https://ui.perfetto.dev
+
+        Only profiles recorded with ``trace=True`` have events.
+        """
+
+        import json
+        pid = os.getpid()
+        with self._lock:
+            events = list(self._events)
+            dropped = self._dropped
+        trace = []
+        for name, start, seconds, nbytes, tid in events:
+            event = dict(name=name, cat=name.split('.', 1)[0], ph='X', pid=pid, tid=tid,
+                         ts=(start - self._start)*1e6, dur=seconds*1e6)
+            if nbytes:
+                event['args'] = dict(bytes=nbytes)
+            trace.append(event)
+        metadata = dict(start_time=self._start_time, dropped_events=dropped)
+        with open(path, 'w') as f:
+            json.dump(dict(traceEvents=trace, displayTimeUnit='ms', otherData=metadata), f)
+
+
+class _Span(object):
+    """
+    times a block and records it in the active recorders
+    """
+
+    __slots__ = ('name', 'nbytes', 'start')
+
+    def __init__(self, name, nbytes):
+        self.name = name
+        self.nbytes = nbytes
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        for recorder in _recorders:
+            recorder.record(self.name, self.start, seconds, self.nbytes)
+        return False
+
+
+class _NullSpan(object):
+    """
+    span returned while instrumentation is off
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_null_span = _NullSpan()
+
+#the recorder of `enable`
+_global = Profile()
+
+
+def enable(trace=False):
+    """
+    turn on instrumentation for the whole process
+
+    Parameters
+    ----------
+    trace : bool
+        if True, also keep timed events for `export_chrome_trace`
+    """
+
+    global _recorders
+    with _lock:
+        _global.trace = trace
+        if _global not in _recorders:
+            _recorders = _recorders + (_global,)
+
+
+def disable():
+    """
+    turn off the instrumentation turned on by `enable`, keeping the
+    statistics recorded so far
+    """
+
+    global _recorders
+    with _lock:
+        _recorders = tuple(r for r in _recorders if r is not _global)
+
+
+def enabled():
+    """
+    True if anything is being recorded
+    """
+    return bool(_recorders)
+
+
+def reset():
+    """
+    drop the statistics recorded by `enable`
+    """
+    _global.reset()
+
+
+def stats():
+    """
+    snapshot of the statistics recorded by `enable`, see `Profile.stats`
+    """
+    return _global.stats()
+
+
+def export_json(path=None):
+    """
+    write the statistics recorded by `enable` as JSON, see `Profile.export_json`
+    """
+    return _global.export_json(path)
+
+
+def export_chrome_trace(path):
+    """
+    write the events recorded by ``enable(trace=True)``, see
+    `Profile.export_chrome_trace`
+    """
+    return _global.export_chrome_trace(path)
+
+
+class profile(object):
+    """
+    record the statistics of a block of code
+
+    Statistics recorded within the block are also added to those of `enable`
+    if it is on, and to those of enclosing profiles.
+
+    Examples
+    --------
+    >>> with profile() as p:
+    ...     zehavi_2011_wp_bins('all')
+    >>> p.stats()['caches']['measurements']
+    """
+
+    def __init__(self, trace=False):
+        self.profile = Profile(trace=trace)
+
+    def __enter__(self):
+        global _recorders
+        with _lock:
+            _recorders = _recorders + (self.profile,)
+        return self.profile
+
+    def __exit__(self, *exc):
+        global _recorders
+        with _lock:
+            _recorders = tuple(r for r in _recorders if r is not self.profile)
+        return False
+
+
+def span(name, nbytes=0):
+    """
+    context manager timing a block as stage `name`
+
+    The returned object has an `nbytes` attribute that may be set within the
+    block, e.g. once the size of what was read is known.
+    """
+
+    if not _recorders:
+        return _null_span
+    return _Span(name, nbytes)
+
+
+def timed(stage, method=False):
+    """
+    decorator timing each call of a function as `stage`
+
+    Parameters
+    ----------
+    stage : string
+        name of the stage
+
+    method : bool
+        if True, the function is a method and the stage is named
+        ``<stage>.<class name>``, with an ``.astropy`` suffix if the
+        instance uses the astropy backend
+    """
+
+    def decorator(f):
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            if not _recorders:
+                return f(*args, **kwargs)
+            name = stage
+            if method:
+                self = args[0]
+                name = '{0}.{1}'.format(stage, type(self).__name__)
+                if getattr(self, 'backend', None) == 'astropy':
+                    name += '.astropy'
+            with _Span(name, 0):
+                return f(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count_cache(name, hit):
+    """
+    count a hit (or miss) of cache `name`
+    """
+
+    for recorder in _recorders:
+        recorder.count_cache(name, hit)
+
+
+def _percentile(samples, q):
+    """
+    linearly interpolated percentile of sorted samples
+    """
+
+    if not samples:
+        return None
+    x = (len(samples) - 1)*q/100.0
+    i = int(x)
+    if i + 1 >= len(samples):
+        return samples[-1]
+    return samples[i] + (x - i)*(samples[i+1] - samples[i])
+
+
+_mode = os.environ.get('LSS_OBSERVATIONS_INSTRUMENT', '').strip().lower()
+if _mode in ('1', 'true', 'yes', 'on', 'trace'):
+    enable(trace=(_mode == 'trace'))
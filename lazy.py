@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+"""
+helpers for deferring expensive imports and attributes until first use
+"""
+
+from __future__ import (division, print_function, absolute_import, unicode_literals)
+import importlib
+import sys
+import types
+
+__all__ = ['lazy_property', 'lazy_package', 'LazyPackage']
+
+
+class lazy_property(object):
+    """
+    decorator for an attribute that is computed on first access
+
+    The value is stored in the instance ``__dict__``, which shadows the
+    descriptor, so later accesses are plain attribute lookups.
+    """
+
+    def __init__(self, func):
+        self.func = func
+        self.name = func.__name__
+        self.__doc__ = func.__doc__
+
+    def __get__(self, obj, cls=None):
+        if obj is None:
+            return self
+        value = self.func(obj)
+        obj.__dict__[self.name] = value
+        return value
+
+
+def lazy_package(package, attributes):
+    """
+    make the attributes of a package import on first access
+
+    Parameters
+    ----------
+    package : string
+        name of the package, i.e. ``__name__`` of its ``__init__``
+
+    attributes : dict
+        mapping of attribute name to the name of the submodule that defines
+        it, relative to `package`.  An attribute mapped to None is the
+        submodule itself.
+
+    Notes
+    -----
+    The class of the package module is replaced by `LazyPackage`.  Resolved
+    values are bound on the package, so each attribute is only resolved
+    once.
+    """
+
+    module = sys.modules[package]
+    module.__dict__['_lazy_attributes'] = dict(attributes)
+    module.__class__ = LazyPackage
+
+
+class LazyPackage(types.ModuleType):
+    """
+    package module that imports its attributes on first access, see
+    `lazy_package`
+    """
+
+    def __getattr__(self, name):
+        attributes = self.__dict__.get('_lazy_attributes', {})
+        try:
+            module_name = attributes[name]
+        except KeyError:
+            msg = ("module {0!r} has no attribute {1!r}".format(self.__name__, name))
+            raise AttributeError(msg)
+        if module_name is None:
+            value = importlib.import_module('.'+name, self.__name__)
+        else:
+            value = getattr(importlib.import_module('.'+module_name, self.__name__), name)
+        setattr(self, name, value)
+        return self.__dict__[name]
+
+    def __setattr__(self, name, value):
+        #the import system binds every submodule on its package once it is
+        #loaded, which would shadow a function of the same name, e.g.
+        #`zehavi_2011_wp`; keep the function bound instead
+        attributes = self.__dict__.get('_lazy_attributes', {})
+        module_name = attributes.get(name)
+        if (module_name is not None and isinstance(value, types.ModuleType) and
+                value.__name__ == self.__name__+'.'+module_name):
+            value = getattr(value, name)
+        types.ModuleType.__setattr__(self, name, value)
+
+    def __dir__(self):
+        return sorted(set(self.__dict__) | set(self.__dict__.get('_lazy_attributes', {})))
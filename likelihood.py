@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+
+"""
+vectorized Gaussian likelihoods for the wp measurements
+"""
+
+from __future__ import (division, print_function, absolute_import, unicode_literals)
+import numpy as np
+from scipy.linalg import block_diag
+from .covariance import Covariance
+from .instrumentation import timed
+from .measurement_registry import MeasurementRegistry
+
+__all__ = ['chi_square', 'log_likelihood', 'data_vector']
+
+#joint data vectors and covariance matrices, keyed by the identity of the inputs
+_data_vectors = MeasurementRegistry(maxsize=64, name='data_vectors')
+
+
+def data_vector(measurements):
+    """
+    data vector and covariance matrix of one or more measurements
+
+    Parameters
+    ----------
+    measurements : tuple or list
+        a measurement as returned by one of the wp loaders, i.e. a tuple of
+        (measurement, covariance) or (measurement, err), or a list of such
+        tuples for a joint data vector.
+
+    Returns
+    -------
+    data : numpy.ndarray
+        the wp values of all measurements concatenated in order, with any
+        non-finite entries removed
+
+    cov : Covariance
+        block diagonal covariance matrix of `data`
+
+    mask : numpy.ndarray
+        boolean array selecting the entries of the concatenated model vector
+        that correspond to `data`
+
+    Notes
+    -----
+    The result is cached on the identity of the inputs, so passing the
+    (cached, read-only) objects returned by the loaders costs a dictionary
+    lookup after the first call.  Arrays that are modified in place after
+    being passed here are not picked up.
+    """
+
+    if isinstance(measurements, tuple):
+        measurements = [measurements]
+    else:
+        measurements = list(measurements)
+
+    key = tuple((id(m[0]), id(m[1])) if isinstance(m, tuple) else id(m) for m in measurements)
+    data, cov, mask, refs = _data_vectors.get(key, lambda: _build_data_vector(measurements))
+    return data, cov, mask
+
+
+@timed('likelihood.chi_square')
+def chi_square(measurements, model):
+    """
+    chi-square of one or many model vectors
+
+    Parameters
+    ----------
+    measurements : tuple or list
+        a measurement as returned by one of the wp loaders, or a list of them
+        for a joint fit, see `data_vector`.
+
+    model : array_like
+        model wp values of shape (n_rp,), or (n_walkers, n_rp) to evaluate
+        many models at once.  For a joint fit the model vectors of the
+        individual measurements are concatenated in the same order as
+        `measurements`.
+
+    Returns
+    -------
+    chi2 : float or numpy.ndarray
+        chi-square of each model, with shape model.shape[:-1]
+    """
+
+    data, cov, mask = data_vector(measurements)
+
+    model = np.asarray(model, dtype=np.float64)
+    if model.shape[-1] != len(mask):
+        msg = ("model vectors have length {0}, the data vector has length {1}."
+               .format(model.shape[-1], len(mask)))
+        raise ValueError(msg)
+    if not mask.all():
+        model = model[..., mask]
+
+    return cov.mahalanobis(model - data)
+
+
+def log_likelihood(measurements, model, normalize=False):
+    """
+    Gaussian log-likelihood of one or many model vectors
+
+    The call signature works with the ``vectorize=True`` option of
+    `emcee.EnsembleSampler`: given models of shape (n_walkers, n_rp) it
+    returns an array of shape (n_walkers,).
+
+    Parameters
+    ----------
+    measurements : tuple or list
+        a measurement as returned by one of the wp loaders, or a list of them
+        for a joint fit, see `data_vector`.
+
+    model : array_like
+        model wp values of shape (n_rp,) or (n_walkers, n_rp)
+
+    normalize : bool
+        if True, include the -0.5*(log|C| + N log(2 pi)) normalization
+
+    Returns
+    -------
+    lnlike : float or numpy.ndarray
+        log-likelihood of each model, with shape model.shape[:-1]
+    """
+
+    lnlike = -0.5*chi_square(measurements, model)
+    if normalize:
+        data, cov, mask = data_vector(measurements)
+        lnlike = lnlike - 0.5*(cov.logdet + len(data)*np.log(2.0*np.pi))
+    return lnlike
+
+
+def _build_data_vector(measurements):
+    """
+    concatenate measurements into one data vector and block covariance matrix
+    """
+
+    data = []
+    covs = []
+    for m in measurements:
+        if not isinstance(m, tuple) or len(m) != 2:
+            msg = ("measurements must be (measurement, covariance) or "
+                   "(measurement, err) tuples as returned by the wp loaders.")
+            raise ValueError(msg)
+        measurement, err = m
+        data.append(np.asarray(measurement)[1])
+        if isinstance(err, Covariance):
+            covs.append(err)
+        elif np.ndim(err) == 2:
+            covs.append(Covariance(err))
+        else:
+            covs.append(Covariance.from_errors(err))
+
+    data = np.concatenate(data)
+    mask = np.isfinite(data)
+    for cov, sl in zip(covs, _block_slices(covs)):
+        mask[sl] &= np.isfinite(np.diag(cov))
+
+    if mask.all():
+        if len(covs) == 1:
+            cov = covs[0]
+        else:
+            cov = Covariance(block_diag(*covs), name=_joint_name(covs))
+            #reuse the factorizations already cached on the individual blocks
+            cov._factor('cholesky', lambda: block_diag(*[c.cholesky for c in covs]))
+    else:
+        cov = Covariance(block_diag(*covs)[np.ix_(mask, mask)], name=_joint_name(covs))
+        data = data[mask]
+
+    #hold references to the inputs so the ids used in the cache key stay
+    #valid, wrapped so that the registry does not mark them read-only
+    refs = lambda: measurements
+    return data, cov, mask, refs
+
+
+def _joint_name(covs):
+    names = [cov.name for cov in covs if cov.name is not None]
+    return ' + '.join(names) if names else None
+
+
+def _block_slices(covs):
+    slices = []
+    start = 0
+    for cov in covs:
+        slices.append(slice(start, start+cov.shape[0]))
+        start += cov.shape[0]
+    return slices
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+
+r"""
+conversion of measurements and models between values of little h
+
+The measurements and models in this package are given in h=1 units, e.g.
+rp in :math:`h^{-1}` Mpc, stellar mass in :math:`h^{-2}M_{\odot}` and number
+densities in :math:`h^{3}Mpc^{-3}`.  The functions here convert them to the
+units of a given Hubble parameter h, or of an array of h values at once, in
+which case the results carry a leading axis with the shape of `h`.
+
+The h scaling of each kind of quantity is recorded once as a `Units` tuple,
+e.g. `WP_UNITS`, next to the loaders and models that use it.
+"""
+
+from __future__ import (division, print_function, absolute_import, unicode_literals)
+from collections import namedtuple
+import numpy as np
+from .covariance import Covariance
+
+__all__ = ['Units', 'WP_UNITS', 'DELTA_SIGMA_UNITS', 'SMF_UNITS', 'LF_UNITS',
+           'h_axis', 'from_h1', 'to_h1', 'native', 'convert_measurement']
+
+Units = namedtuple('Units', ['x', 'y', 'magnitude'])
+Units.__doc__ = r"""
+powers of h of the units of the abscissa `x` and ordinate `y` of a
+measurement or model, e.g. -1 for :math:`h^{-1}` Mpc.  If `magnitude` is
+True, `x` is an absolute magnitude and its power refers to the luminosity,
+i.e. -2 for :math:`M - 5\log_{10}h`.
+"""
+
+#rp and wp in h^-1 Mpc
+WP_UNITS = Units(x=-1, y=-1, magnitude=False)
+
+#rp in h^-1 kpc, Delta Sigma in h Msol pc^-2
+DELTA_SIGMA_UNITS = Units(x=-1, y=1, magnitude=False)
+
+#stellar mass in h^-2 Msol, phi in h^3 Mpc^-3 dex^-1
+SMF_UNITS = Units(x=-2, y=3, magnitude=False)
+
+#absolute magnitude M - 5log10(h), phi in h^3 Mpc^-3 mag^-1
+LF_UNITS = Units(x=-2, y=3, magnitude=True)
+
+
+def h_axis(h, ndim=0):
+    """
+    h as an array that broadcasts against arrays with `ndim` dimensions
+
+    Parameters
+    ----------
+    h : float or array_like
+        Hubble parameter(s) in units of 100 km/s/Mpc
+
+    ndim : int
+        number of dimensions of the values to convert
+
+    Returns
+    -------
+    h : numpy.ndarray
+        array of shape h.shape + (1,)*ndim
+    """
+
+    h = np.asarray(h, dtype=np.float64)
+    if np.any(h <= 0):
+        msg = ("h must be positive.")
+        raise ValueError(msg)
+    return h.reshape(h.shape + (1,)*ndim)
+
+
+def from_h1(x, h, power, magnitude=False):
+    """
+    convert values in h=1 units to the units of `h`
+
+    Parameters
+    ----------
+    x : array_like
+        values in h=1 units
+
+    h : float or array_like
+        target value(s) of h
+
+    power : int
+        power of h of the units of `x`, e.g. -1 for :math:`h^{-1}` Mpc
+
+    magnitude : bool
+        if True, `x` is an absolute magnitude, see `Units`
+
+    Returns
+    -------
+    x : numpy.ndarray
+        array of shape h.shape + x.shape
+    """
+
+    x = np.asarray(x, dtype=np.float64)
+    h = h_axis(h, x.ndim)
+    if magnitude:
+        return x - 2.5*power*np.log10(h)
+    return x*h**power
+
+
+def to_h1(x, h, power, magnitude=False):
+    """
+    convert values in the units of `h` to h=1 units, the inverse of `from_h1`
+
+    Returns
+    -------
+    x : numpy.ndarray
+        array of shape h.shape + x.shape
+    """
+
+    x = np.asarray(x, dtype=np.float64)
+    h = h_axis(h, x.ndim)
+    if magnitude:
+        return x + 2.5*power*np.log10(h)
+    return x*h**(-power)
+
+
+def native(x, native_h, h, units):
+    """
+    convert the input of a model to the h of the published fit
+
+    Parameters
+    ----------
+    x : array_like
+        input in the units of `h`, e.g. stellar masses
+
+    native_h : float
+        value of h assumed by the published fit
+
+    h : float or array_like
+        value(s) of h of `x`, None for h=1 units
+
+    units : Units
+        h scaling of the input and output of the model
+
+    Returns
+    -------
+    x : numpy.ndarray
+        log10 of `x`, or the magnitude if ``units.magnitude``, in the units
+        of the fit, with a leading axis of the shape of `h` if it is an array
+
+    scale : float or numpy.ndarray
+        factor converting the output of the fit to the units of `h`,
+        broadcastable against `x`
+
+    Notes
+    -----
+    The input and output are converted with the single ratio h/native_h,
+    so arrays of h cost one broadcast operation each way.
+    """
+
+    x = np.asarray(x)
+    if h is None:
+        if native_h == 1.0:
+            return x if units.magnitude else np.log10(x), 1.0
+        r = np.float64(1.0/native_h)
+    else:
+        r = h_axis(h, x.ndim)/native_h
+
+    log_r = np.log10(r)
+    if units.magnitude:
+        x = x + 2.5*units.x*log_r
+    else:
+        x = np.log10(x) - units.x*log_r
+    return x, r**units.y
+
+
+def convert_measurement(result, h, units=WP_UNITS):
+    """
+    convert a measurement returned by one of the loaders to the units of `h`
+
+    Parameters
+    ----------
+    result : tuple or numpy.ndarray
+        (measurement, covariance) or (measurement, err) as returned by the
+        loaders, or a bare measurement array of shape (2,n)
+
+    h : float or array_like
+        target value(s) of h
+
+    units : Units
+        h scaling of the measurement
+
+    Returns
+    -------
+    result : tuple or numpy.ndarray
+        the converted measurement, of shape h.shape + (2,n), and covariance
+        matrix or errors, of shape h.shape + (n,n) or h.shape + (n,).  For a
+        scalar h a covariance matrix is returned as a `Covariance` that
+        reuses the Cholesky factor of the original.
+    """
+
+    if isinstance(result, tuple):
+        measurement, err = result
+    else:
+        measurement, err = result, None
+
+    measurement = np.asarray(measurement, dtype=np.float64)
+    h_x = h_axis(h, 1)
+    scale = np.concatenate([h_x**units.x, h_x**units.y], axis=-1)
+    measurement = measurement*scale[..., None]
+
+    if err is None:
+        return measurement
+
+    s = h_axis(h, np.ndim(err))**units.y
+    if np.ndim(err) == 2 and np.ndim(h) == 0:
+        cov = Covariance(np.asarray(err)*s**2, name=getattr(err, 'name', None))
+        if isinstance(err, Covariance) and 'cholesky' in err.__dict__.get('_factors', {}):
+            cov._factor('cholesky', lambda: err.cholesky*s)
+        return measurement, cov
+    if np.ndim(err) == 2:
+        return measurement, np.asarray(err)*s**2
+    return measurement, np.asarray(err)*s
@@ -6,64 +6,65 @@ callable stellar mass functions from the literature
 
 from __future__ import (division, print_function, absolute_import, unicode_literals)
 import numpy as np
-
-from astropy.table import Table
-from astropy.io import ascii
-from astropy.modeling.models import custom_model
-#from scipy.special import gammaincc, gammaincinv
-from mpmath import gammainc
-from astro_utils.schechter_functions import MagSchechter
+from .binary_store import get_table
+from .lazy import lazy_property
+from .littleh import native, LF_UNITS
+from .instrumentation import timed
+from .mixins import PhiMixin
+from .measurement_registry import registry
 
 # set location of tabvulated data
-import os
-filepath = os.path.dirname(__file__)
-filepath = os.path.join(filepath,'phi_measurements/')
+filepath = 'phi_measurements/'
 
-__all__ = ['Blanton_2003_phi']
+__all__ = ['Blanton_2003_phi', 'mag_schechter_grid']
 
-class Blanton_2003_phi(object):
+class Blanton_2003_phi(PhiMixin):
     """
     stellar mass function from Blanton et al. (2003)
     """
     def __init__(self, band='r', **kwargs):
         """
+        Parameters
+        ----------
+        band : string
+            SDSS band, one of 'u', 'g', 'r', 'i', 'z'
+
+        mode : string
+            'schechter' (default) evaluates the Schechter function fit when
+            called, 'tabulated' interpolates the measured non-parametric
+            luminosity function, see `tabulated`.
         """
 
         self.littleh = 1.0
 
+        self.mode = kwargs.get('mode', 'schechter')
+        if self.mode not in ('schechter', 'tabulated'):
+            msg = ("`mode` must be 'schechter' or 'tabulated'.")
+            raise ValueError(msg)
+
         # parameters from table #2
         if band == 'u':
             filename = 'lumfunc-u.sample10ubright15.dat'
-            col_names = ['absolute_magnitude', 'phi', 'sigma_phi']
-            self.data = ascii.read(filepath+filename, format='ascii', names=col_names)
             self.phi0   = 3.05 * 10**(-2)
             self.x0     = -17.93
             self.alpha0 = -0.92
         elif band == 'g':
             filename = 'lumfunc-g.sample10gbright15.dat'
-            col_names = ['absolute_magnitude', 'phi', 'sigma_phi']
-            self.data = ascii.read(filepath+filename, format='ascii', names=col_names)
             self.phi0   = 2.18 * 10**(-2)
             self.x0     = -19.39
             self.alpha0 = -0.89
         elif band == 'r':
             filename = 'lumfunc-r.sample10bbright15.dat'
-            col_names = ['absolute_magnitude', 'phi', 'sigma_phi']
-            self.data = ascii.read(filepath+filename, names=col_names)
             self.phi0   = 1.49 * 10**(-2)
             self.x0     = -20.44
             self.alpha0 = -1.05
         elif band == 'i':
             filename = 'lumfunc-i.sample10ibright15.dat'
-            col_names = ['absolute_magnitude', 'phi', 'sigma_phi']
-            self.data = ascii.read(filepath+filename, format='ascii', names=col_names)
             self.phi0   = 1.47 * 10**(-2)
             self.x0     = -20.82
             self.alpha0 = -1.00
         elif band == 'z':
             filename = 'lumfunc-z.sample10zbright15.dat'
-            col_names = ['absolute_magnitude', 'phi', 'sigma_phi']
-            self.data = ascii.read(filepath+filename, format='ascii', names=col_names)
             self.phi0   = 1.35 * 10**(-2)
             self.x0     = -21.18
             self.alpha0 = -1.08
@@ -71,14 +72,31 @@ class Blanton_2003_phi(object):
             msg = ('band not recognized.  `band` must be one of [u,g,r,i,z].')
             raise ValueError(msg)
 
-        # define components of double Schechter function
-        s = MagSchechter(phi0=self.phi0, M0=self.x0, alpha=self.alpha0)
+        self.band = band
+        self._data_filename = filepath+filename
 
-        # create model
-        self.s = s
+    @lazy_property
+    def data(self):
+        """
+        astropy table of the measured luminosity function
 
+        The table is read once per band and shared by all instances; its
+        columns are read-only.
+        """
+        return _band_data(self.band, self._data_filename)[0]
 
-    def __call__(self, mag):
+    @lazy_property
+    def s(self):
+        """
+        `astro_utils` Schechter function, imported on first access
+        """
+        from astro_utils.schechter_functions import MagSchechter
+
+        # define components of double Schechter function
+        return MagSchechter(phi0=self.phi0, M0=self.x0, alpha=self.alpha0)
+
+    @timed('evaluate', method=True)
+    def __call__(self, mag, h=None):
         """
         stellar mass function from Blanton et al. (2003).
 
@@ -87,16 +105,236 @@ class Blanton_2003_phi(object):
         mag : array_like
             Absolute magnitude in units, Mag = Mag - 5log(h)
 
+        h : float or array_like, optional
+            if given, `mag` is the absolute magnitude and phi is in units
+            Mpc^-3 dex^-1 for this value of h.  An array of h values adds a
+            leading axis of the same shape to the result.
+
         Returns
         -------
-        phi : nunpy.array
+        phi : numpy.ndarray
             number density in units h^3 Mpc^-3 dex^-1
         """
 
+        if h is not None:
+            mag, scale = native(mag, 1.0, h, LF_UNITS)
+            return self(mag)*scale
+
+        if self.mode == 'tabulated':
+            return self.tabulated(mag)
+
         return self.s(mag)
 
-    def number_density(self, a, b):
+    def tabulated(self, mag):
+        """
+        measured non-parametric luminosity function, linearly interpolated
+
+        Parameters
+        ----------
+        mag : array_like
+            Absolute magnitude in units, Mag = Mag - 5log(h)
+
+        Returns
+        -------
+        phi : numpy.ndarray
+            number density in units h^3 Mpc^-3 mag^-1, NaN outside of the
+            range of the measurement
+        """
+
+        return _band_data(self.band, self._data_filename)[1](mag)
+
+    @timed('integrate', method=True)
+    def number_density(self, a, b, h=None):
+        """
+        number density of galaxies with absolute magnitudes between `a` and `b`
+
+        Parameters
+        ----------
+        a, b : array_like
+            bright and faint magnitude limits in units, Mag = Mag - 5log(h).
+            -inf and inf are accepted.  The limits broadcast against each
+            other, so many thresholds can be evaluated in a single call.
+
+        h : float or array_like, optional
+            if given, `a` and `b` are absolute magnitudes and n is in units
+            Mpc^-3 for this value of h.  An array of h values adds a leading
+            axis of the same shape to the result.
+
+        Returns
+        -------
+        n : float or numpy.ndarray
+            number density in units h^3 Mpc^-3.  The result is negative if
+            b < a.
+
+        Notes
+        -----
+        With y = 10^(-0.4(M - M0)) the integral is
+
+        .. math::
+            n = \\phi_0 [\\Gamma(\\alpha+1, y_b) - \\Gamma(\\alpha+1, y_a)]
+
+        evaluated with `upper_incomplete_gamma` at double precision, which
+        also handles faint end slopes alpha <= -1.
+        """
+
+        from .incomplete_gamma import upper_incomplete_gamma
+
+        a, b = np.broadcast_arrays(np.asarray(a, dtype=float), np.asarray(b, dtype=float))
+        a, scale = native(a, 1.0, h, LF_UNITS)
+        b, scale = native(b, 1.0, h, LF_UNITS)
+        s = self.alpha0 + 1.0
+        with np.errstate(over='ignore'):
+            ya = 10.0**(-0.4*(a - self.x0))
+            yb = 10.0**(-0.4*(b - self.x0))
+        n = self.phi0*(upper_incomplete_gamma(s, yb) - upper_incomplete_gamma(s, ya))
+        return n*scale
+
+    @property
+    def params(self):
+        """
+        parameter vector (phi0, x0, alpha0) used by `phi_grid`
+        """
+        return np.array([self.phi0, self.x0, self.alpha0])
+
+    def phi_grid(self, mag, params=None):
         """
+        evaluate the luminosity function for many parameter vectors at once
+
+        Parameters
+        ----------
+        mag : array_like
+            Absolute magnitude in units, Mag = Mag - 5log(h)
+
+        params : array_like, optional
+            array of shape (N,3) of parameter vectors ordered as
+            (phi0, x0, alpha0).  Default is `params`.
+
+        Returns
+        -------
+        phi : numpy.ndarray
+            array of shape (N,)+mag.shape of number densities in units
+            h^3 Mpc^-3 mag^-1
         """
-        return self.s.number_density(a,b)
 
+        if params is None:
+            params = self.params
+        params = np.atleast_2d(np.asarray(params, dtype=float))
+        if params.ndim != 2 or params.shape[1] != 3:
+            msg = ("`params` must have shape (N,3).")
+            raise ValueError(msg)
+
+        return mag_schechter_grid(mag, params)
+
+
+def _mag_schechter(mag, phi0, M0, alpha):
+    """
+    magnitude schechter function evaluated directly with numpy
+    """
+    mag = np.asarray(mag, dtype=float)
+    norm = 0.4*np.log(10.0)*phi0
+    y = 10.0**(-0.4*(mag-M0))
+    return norm*y**(alpha+1.0)*np.exp(-y)
+
+
+def mag_schechter_grid(mag, params):
+    """
+    sum of magnitude schechter functions for many parameter vectors at once
+
+    Parameters
+    ----------
+    mag : array_like
+        absolute magnitude
+
+    params : array_like
+        array of shape (N,3*k) of parameter vectors of a sum of k Schechter
+        functions, ordered as (phi0, M0, alpha) of the first component, then
+        the second, ...  k=1 is a single and k=2 a double Schechter function.
+
+    Returns
+    -------
+    phi : numpy.ndarray
+        array of shape (N,)+mag.shape
+    """
+
+    params = np.atleast_2d(np.asarray(params, dtype=float))
+    if params.ndim != 2 or params.shape[1] % 3 != 0:
+        msg = ("`params` must have shape (N,3*k).")
+        raise ValueError(msg)
+
+    mag = np.asarray(mag, dtype=float)
+    shape = (params.shape[0],) + (1,)*mag.ndim
+
+    phi = 0.0
+    for k in range(params.shape[1]//3):
+        phi0 = params[:,3*k].reshape(shape)
+        M0 = params[:,3*k+1].reshape(shape)
+        alpha = params[:,3*k+2].reshape(shape)
+        phi = phi + _mag_schechter(mag, phi0, M0, alpha)
+    return phi
+
+
+def _read_table(filename, col_names):
+    """
+    return a tabulated luminosity function from the binary store as a table
+    """
+    from astropy.table import Table
+
+    data = get_table(filename)
+    return Table([data[:,i] for i in range(len(col_names))], names=col_names, copy=False)
+
+
+def _band_data(band, filename):
+    """
+    return the (table, interpolator) of a band, shared by all instances
+    """
+    key = ('blanton_2003', band, None, None)
+    return registry.get(key, lambda: _load_band(filename))
+
+
+def _load_band(filename):
+    col_names = ['absolute_magnitude', 'phi', 'sigma_phi']
+    data = _read_table(filename, col_names)
+    x = np.asarray(data['absolute_magnitude'])
+    y = np.asarray(data['phi'])
+    return data, _UniformInterpolator(x, y)
+
+
+class _UniformInterpolator(object):
+    """
+    linear interpolation on a nearly uniform grid
+
+    The interval containing each point is found arithmetically from the mean
+    grid spacing, followed by a one step correction for the small deviations
+    from uniform spacing, instead of a binary search.
+    """
+
+    def __init__(self, x, y):
+        order = np.argsort(x)
+        self.x = np.ascontiguousarray(x[order], dtype=float)
+        self.y = np.ascontiguousarray(y[order], dtype=float)
+        self.slope = np.diff(self.y)/np.diff(self.x)
+        self.x0 = self.x[0]
+        self.dx = (self.x[-1] - self.x[0])/(len(self.x) - 1)
+        for a in (self.x, self.y, self.slope):
+            a.setflags(write=False)
+
+        #the correction step assumes every point is within one interval of
+        #its arithmetic guess
+        i = np.arange(len(self.x) - 1)
+        if np.any(np.abs((self.x[:-1] - self.x0)/self.dx - i) > 0.5):
+            msg = ("grid is not uniform enough for arithmetic indexing.")
+            raise ValueError(msg)
+
+    def __call__(self, x):
+        x = np.asarray(x, dtype=float)
+        n = len(self.x) - 1
+        with np.errstate(invalid='ignore'):
+            i = np.floor((x - self.x0)/self.dx)
+        i = np.clip(np.nan_to_num(i), 0, n - 1).astype(np.intp)
+        i -= (x < self.x[i]) & (i > 0)
+        i += (x >= self.x[i+1]) & (i < n - 1)
+        y = self.y[i] + self.slope[i]*(x - self.x[i])
+        outside = ~((x >= self.x[0]) & (x <= self.x[-1]))
+        if np.any(outside):
+            y = np.where(outside, np.nan, y)
+        return y
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+
+"""
+process-wide registry of loaded measurements
+"""
+
+from __future__ import (division, print_function, absolute_import, unicode_literals)
+from collections import OrderedDict, namedtuple
+import threading
+import numpy as np
+from . import instrumentation
+
+__all__ = ['MeasurementRegistry', 'registry']
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'evictions', 'maxsize', 'currsize'])
+
+
+class MeasurementRegistry(object):
+    """
+    bounded LRU cache of measurements keyed by (paper, sample, bin, method)
+
+    Each measurement is loaded the first time it is requested and every array
+    in the result is marked read-only, so the same objects can be handed back
+    on subsequent calls without copying.
+    """
+
+    def __init__(self, maxsize=256, name='registry'):
+        """
+        Parameters
+        ----------
+        maxsize : int
+            maximum number of measurements held before the least recently
+            used one is evicted.  None means unbounded.
+
+        name : string
+            name of the cache in the statistics of `instrumentation`
+        """
+
+        self.maxsize = maxsize
+        self.name = name
+        self._cache = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, loader):
+        """
+        return the measurement stored under `key`, loading it if necessary
+
+        Parameters
+        ----------
+        key : tuple
+            hashable key, by convention (paper, sample, bin, method)
+
+        loader : callable
+            function with no arguments that returns the measurement.  It is
+            only called on a cache miss.
+
+        Returns
+        -------
+        measurement : object
+            result of `loader` with all numpy arrays made read-only
+        """
+
+        with self._lock:
+            try:
+                value = self._cache[key]
+            except KeyError:
+                self.misses += 1
+            else:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                if instrumentation._recorders:
+                    instrumentation.count_cache(self.name, True)
+                return value
+
+        #load outside the lock so slow reads do not serialize other lookups
+        if instrumentation._recorders:
+            instrumentation.count_cache(self.name, False)
+            stage = 'load.' + self.name
+            if isinstance(key, tuple) and key and isinstance(key[0], str):
+                stage += '.' + key[0]
+            with instrumentation.span(stage):
+                value = _freeze(loader())
+        else:
+            value = _freeze(loader())
+
+        with self._lock:
+            #another thread may have loaded the same key in the meantime
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            self._cache[key] = value
+            self._evict()
+        return value
+
+    def clear(self):
+        """
+        drop all cached measurements and reset the hit/miss counters
+        """
+
+        with self._lock:
+            self._cache.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def resize(self, maxsize):
+        """
+        change the maximum number of cached measurements
+        """
+
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict()
+
+    def info(self):
+        """
+        return a snapshot of the cache statistics
+
+        Returns
+        -------
+        info : CacheInfo
+            named tuple of (hits, misses, evictions, maxsize, currsize)
+        """
+
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.evictions,
+                             self.maxsize, len(self._cache))
+
+    def keys(self):
+        """
+        return the keys of the cached measurements, least recently used first
+        """
+
+        with self._lock:
+            return list(self._cache.keys())
+
+    def items(self):
+        """
+        return the (key, measurement) pairs in the cache, least recently used
+        first, without counting them as hits
+        """
+
+        with self._lock:
+            return list(self._cache.items())
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._cache
+
+    def __len__(self):
+        with self._lock:
+            return len(self._cache)
+
+    def _evict(self):
+        if self.maxsize is None:
+            return
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+            self.evictions += 1
+
+
+def _freeze(value):
+    """
+    mark every numpy array in a (possibly nested) result as read-only
+    """
+
+    if isinstance(value, np.ndarray):
+        value.setflags(write=False)
+    elif isinstance(value, (tuple, list)):
+        for v in value:
+            _freeze(v)
+    elif isinstance(value, dict):
+        for v in value.values():
+            _freeze(v)
+    return value
+
+
+#shared by all of the measurement loaders in the package
+registry = MeasurementRegistry(name='measurements')
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+"""
+methods shared by the stellar mass and luminosity functions
+"""
+
+from __future__ import (division, print_function, absolute_import, unicode_literals)
+
+__all__ = ['PhiMixin']
+
+
+class PhiMixin(object):
+    """
+    methods of a callable stellar mass or luminosity function built on the
+    helpers in `chunked` and `sampling`
+    """
+
+    def evaluate(self, x, out=None, **kwargs):
+        """
+        evaluate the function on a large catalog in bounded memory, block by
+        block and in parallel
+
+        Parameters
+        ----------
+        x : array_like or string
+            stellar mass in units Msol/h^2, or absolute magnitude in units
+            Mag - 5log(h) for luminosity functions, e.g. a memory-mapped array
+            or the path of a ``.npy`` file
+
+        out : numpy.ndarray or string, optional
+            output array or ``.npy`` path.  See `chunked.evaluate` for this
+            and additional keyword arguments, e.g. ``dtype=numpy.float32``.
+
+        Returns
+        -------
+        phi : numpy.ndarray
+            the function evaluated at `x`, as returned by `__call__`
+        """
+
+        from .chunked import evaluate
+        return evaluate(self, x, out=out, **kwargs)
+
+    def sample(self, size, limits=None, seed=None, **kwargs):
+        """
+        draw random values from the normalized distribution between `limits`
+
+        Parameters
+        ----------
+        size : int
+            number of values to draw
+
+        limits : tuple, optional
+            (min, max) of the drawn values
+
+        seed : None, int, numpy.random.SeedSequence or numpy.random.Generator
+            seed of the random stream
+
+        Returns
+        -------
+        x : numpy.ndarray
+            array of shape (size,) of stellar masses in units Msol/h^2, or of
+            absolute magnitudes in units Mag - 5log(h) for luminosity
+            functions
+
+        Notes
+        -----
+        See `sampling.sample` for additional keyword arguments, and
+        `sampling.sample_chunks` to draw in bounded memory.
+        """
+
+        from .sampling import sample
+        return sample(self, size, limits=limits, seed=seed, **kwargs)
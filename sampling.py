@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+
+"""
+Monte Carlo sampling of stellar masses and magnitudes from a phi
+"""
+
+from __future__ import (division, print_function, absolute_import, unicode_literals)
+import numpy as np
+from .abundance_matching import cumulative_table
+
+__all__ = ['sample', 'sample_chunks', 'spawn_streams']
+
+#number of values drawn per chunk
+DEFAULT_CHUNK_SIZE = 2**20
+
+
+def sample_chunks(model, size, limits=None, seed=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                  log=False, x_range=None, n_points=4001):
+    """
+    draw values from a stellar mass or luminosity function in chunks
+
+    Values are drawn by inverse transform sampling of the cached cumulative
+    number density table of the model (see
+    `abundance_matching.cumulative_table`), so no rejection step is needed.
+
+    Parameters
+    ----------
+    model : object
+        a stellar mass function from `stellar_mass_functions` or a luminosity
+        function from `luminosity_functions`
+
+    size : int
+        total number of values to draw
+
+    limits : tuple, optional
+        (min, max) stellar mass in units Msol/h^2 (log10 if `log` is True), or
+        absolute magnitude.  Default is the range of the table.
+
+    seed : None, int, array_like, numpy.random.SeedSequence or numpy.random.Generator
+        seed of the random stream, passed to `numpy.random.default_rng`
+
+    chunk_size : int
+        maximum number of values per chunk
+
+    log : bool
+        if True, draw (and interpret `limits` as) log10(mstar).  Ignored for
+        luminosity functions.
+
+    x_range, n_points :
+        table grid, see `abundance_matching.cumulative_table`
+
+    Yields
+    ------
+    x : numpy.ndarray
+        array of at most `chunk_size` values
+
+    Notes
+    -----
+    The values drawn from a given seed do not depend on `chunk_size`, so a
+    stream can be consumed in chunks of any size and reproduce `sample`.
+    """
+
+    size = int(size)
+    chunk_size = int(chunk_size)
+    if size < 0:
+        msg = ("`size` must be non-negative.")
+        raise ValueError(msg)
+    if chunk_size < 1:
+        msg = ("`chunk_size` must be positive.")
+        raise ValueError(msg)
+
+    table = cumulative_table(model, x_range=x_range, n_points=n_points)
+    n_min, n_max = _number_density_limits(table, limits, log)
+    rng = np.random.default_rng(seed)
+
+    while size > 0:
+        n = min(size, chunk_size)
+        u = rng.random(n)
+        yield table.threshold(n_min + u*(n_max - n_min), log=log)
+        size -= n
+
+
+def sample(model, size, limits=None, seed=None, chunk_size=DEFAULT_CHUNK_SIZE,
+           log=False, x_range=None, n_points=4001):
+    """
+    draw values from a stellar mass or luminosity function
+
+    Parameters
+    ----------
+    model : object
+        a stellar mass or luminosity function
+
+    size : int
+        number of values to draw
+
+    limits, seed, chunk_size, log, x_range, n_points :
+        see `sample_chunks`
+
+    Returns
+    -------
+    x : numpy.ndarray
+        array of shape (size,) of stellar masses in units Msol/h^2 (log10
+        if `log` is True) or absolute magnitudes
+
+    Examples
+    --------
+    >>> from lss_observations.stellar_mass_functions import Baldry_2011_phi
+    >>> mstar = sample(Baldry_2011_phi(), 10**6, limits=(10**9, 10**12), seed=42)
+    """
+
+    out = np.empty(int(size))
+    i = 0
+    for chunk in sample_chunks(model, size, limits=limits, seed=seed,
+                               chunk_size=chunk_size, log=log,
+                               x_range=x_range, n_points=n_points):
+        out[i:i+len(chunk)] = chunk
+        i += len(chunk)
+    return out
+
+
+def spawn_streams(seed, n):
+    """
+    split a seed into independent seeds for parallel sampling
+
+    Parameters
+    ----------
+    seed : None, int, array_like or numpy.random.SeedSequence
+        root seed
+
+    n : int
+        number of streams, e.g. one per thread or process
+
+    Returns
+    -------
+    seeds : list
+        list of `n` `numpy.random.SeedSequence` objects, each of which can be
+        passed as `seed` to `sample` or `sample_chunks`.  The same root seed
+        always yields the same streams.
+
+    Examples
+    --------
+    >>> seeds = spawn_streams(42, 8)
+    >>> parts = pool.map(lambda s: sample(model, 10**8, seed=s), seeds)
+    """
+
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    return seed.spawn(int(n))
+
+
+def _number_density_limits(table, limits, log):
+    """
+    range of cumulative number density corresponding to `limits`
+    """
+
+    n_min, n_max = table.n_range
+    if limits is None:
+        return n_min, n_max
+
+    lo, hi = float(limits[0]), float(limits[1])
+    if not lo < hi:
+        msg = ("`limits` must be increasing.")
+        raise ValueError(msg)
+
+    n = table.number_density(np.array([lo, hi]), log=log)
+    if not np.all(np.isfinite(n)):
+        msg = ("`limits` are outside of the cumulative number density table, "
+               "pass a wider `x_range`.")
+        raise ValueError(msg)
+    return n.min(), n.max()
@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+
+"""
+share the loaded measurements with worker processes through shared memory
+
+The measurements in `lss_observations.measurement_registry.registry`, the
+covariance matrices and their cached factorizations are packed into a single
+`multiprocessing.shared_memory` segment by the parent process.  Workers attach
+to the segment and put zero-copy, read-only views of the arrays back into
+their own registry, so they neither parse measurement files nor factorize
+covariance matrices, and the arrays are held in memory only once however many
+workers there are.
+
+Examples
+--------
+>>> from multiprocessing import Pool
+>>> from lss_observations import shared_data
+>>> shared = shared_data.publish()
+>>> with Pool(8, initializer=shared_data.attach, initargs=(shared,)) as pool:
+...     sampler = emcee.EnsembleSampler(nwalkers, ndim, lnprob, pool=pool)
+...     sampler.run_mcmc(p0, nsteps)
+
+The segment is removed when `shared` is closed, garbage collected or the
+parent process exits.
+"""
+
+from __future__ import (division, print_function, absolute_import, unicode_literals)
+import os
+import threading
+import weakref
+import numpy as np
+from .covariance import Covariance
+from .measurement_registry import registry
+
+__all__ = ['SharedData', 'publish', 'attach', 'preload']
+
+#factorizations computed for every covariance matrix before publishing
+DEFAULT_FACTORS = ('cholesky', 'logdet')
+
+#byte alignment of the arrays in the segment
+ALIGNMENT = 64
+
+#segments attached in this process, by name, kept open for the views into them
+_attached = {}
+_lock = threading.Lock()
+
+
+class SharedData(object):
+    """
+    handle of a shared memory segment holding published measurements
+
+    The handle is small and picklable, so it can be passed to workers, e.g.
+    as ``initargs`` of a `multiprocessing.Pool`.  Only the process that
+    created the segment removes it.
+    """
+
+    def __init__(self, shm, entries):
+        self.name = shm.name
+        self.size = shm.size
+        self.entries = entries
+        self._shm = shm
+        self._finalizer = weakref.finalize(self, _release, shm, os.getpid())
+
+    def keys(self):
+        """
+        return the registry keys of the published measurements
+        """
+        return [key for key, spec in self.entries]
+
+    def close(self):
+        """
+        remove the segment
+
+        Workers that are already attached keep their views until they exit.
+        """
+        if self._finalizer is not None:
+            self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __getstate__(self):
+        return {'name': self.name, 'size': self.size, 'entries': self.entries}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._shm = None
+        self._finalizer = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __repr__(self):
+        return "SharedData(name={0!r}, size={1}, measurements={2})".format(
+            self.name, self.size, len(self.entries))
+
+
+def preload():
+    """
+    load every measurement offered by the wp and Delta Sigma loaders into
+    the registry
+    """
+
+    from . import (yang_2012_wp_bins, zehavi_2011_wp_bins, hearin_2014_wp_bins,
+                   watson_2014_wp_bins, campbell_2016_wp_bins,
+                   watson_2014_delta_sigma, watson_2014_wp_delta_sigma)
+
+    for sample in ['Volume1', 'Volume2', 'Mass-limit']:
+        yang_2012_wp_bins(sample)
+    for sample in ['all', 'red', 'blue']:
+        zehavi_2011_wp_bins(sample)
+        hearin_2014_wp_bins(sample)
+        watson_2014_wp_bins(sample)
+        for thresh in [9.49, 9.89, 10.29]:
+            watson_2014_delta_sigma(10**thresh, sample)
+            watson_2014_wp_delta_sigma(10**thresh, sample)
+        for method in ['theta_weights', 'nearest_neighbor']:
+            campbell_2016_wp_bins(method, sample)
+    zehavi_2011_wp_bins('all', threshold=True)
+
+
+def publish(load=True, factors=DEFAULT_FACTORS):
+    """
+    copy the measurements in the registry into a new shared memory segment
+
+    Parameters
+    ----------
+    load : bool
+        if True, load every measurement with `preload` first.  Otherwise only
+        the measurements already in the registry are published.
+
+    factors : tuple
+        names of the `Covariance` factorizations, e.g. 'cholesky', 'logdet',
+        'precision', computed before publishing.  Factorizations that are
+        already cached are always published.
+
+    Returns
+    -------
+    shared : SharedData
+        handle to pass to `attach` in the workers
+
+    Notes
+    -----
+    Registry entries holding objects other than arrays, tuples, lists,
+    dicts, numbers and strings, e.g. astropy tables, are not published;
+    workers load those themselves.
+    """
+
+    from multiprocessing import shared_memory
+
+    if load:
+        preload()
+
+    layout = _Layout()
+    entries = []
+    for key, value in registry.items():
+        try:
+            spec = layout.add(value, factors)
+        except _Unsupported:
+            continue
+        entries.append((key, spec))
+
+    shm = shared_memory.SharedMemory(create=True, size=max(layout.size, 1))
+    try:
+        layout.write(shm.buf)
+    except BaseException:
+        shm.close()
+        shm.unlink()
+        raise
+    return SharedData(shm, entries)
+
+
+def attach(shared):
+    """
+    attach to a published segment and add its measurements to the registry
+
+    Intended as the initializer of worker processes.  Measurements already
+    in the registry of the worker are kept.
+
+    Parameters
+    ----------
+    shared : SharedData
+        handle returned by `publish` in the parent process
+
+    Returns
+    -------
+    n : int
+        number of measurements added to the registry
+    """
+
+    buf = _attach_segment(shared.name)
+
+    if registry.maxsize is not None and registry.maxsize < len(registry) + len(shared.entries):
+        registry.resize(len(registry) + len(shared.entries))
+
+    n = 0
+    for key, spec in shared.entries:
+        if key in registry:
+            continue
+        value = _rebuild(spec, buf)
+        registry.get(key, lambda: value)
+        n += 1
+    return n
+
+
+class _Unsupported(Exception):
+    pass
+
+
+class _Layout(object):
+    """
+    offsets of the arrays to pack into the segment
+    """
+
+    def __init__(self):
+        self.size = 0
+        self.arrays = []
+
+    def add(self, value, factors):
+        """
+        return the spec of `value`, reserving space for its arrays
+        """
+
+        if isinstance(value, Covariance):
+            for name in factors:
+                try:
+                    getattr(value, name)
+                except ValueError:
+                    #not positive definite, workers raise the same error when they use it
+                    pass
+            cached = {}
+            for name, factor in value.__dict__.get('_factors', {}).items():
+                cached[name] = self.add(factor, ())
+            return ('covariance', self._add_array(value.array), cached, value.name)
+        if isinstance(value, np.ndarray):
+            return self._add_array(value)
+        if isinstance(value, (tuple, list)):
+            return (type(value).__name__, [self.add(v, factors) for v in value])
+        if isinstance(value, dict):
+            return ('dict', [(k, self.add(v, factors)) for k, v in value.items()])
+        if value is None or isinstance(value, (bool, int, float, complex, str, bytes, np.generic)):
+            return ('object', value)
+        raise _Unsupported()
+
+    def _add_array(self, array):
+        if array.dtype.hasobject:
+            raise _Unsupported()
+        offset = -(-self.size//ALIGNMENT)*ALIGNMENT
+        self.arrays.append((offset, array))
+        self.size = offset + array.nbytes
+        return ('array', offset, array.shape, array.dtype.str)
+
+    def write(self, buf):
+        for offset, array in self.arrays:
+            view = np.ndarray(array.shape, dtype=array.dtype, buffer=buf, offset=offset)
+            view[...] = array
+            del view
+
+
+def _rebuild(spec, buf):
+    """
+    build a value from its spec, with read-only views into `buf`
+    """
+
+    kind = spec[0]
+    if kind == 'array':
+        offset, shape, dtype = spec[1:]
+        array = np.ndarray(tuple(shape), dtype=np.dtype(dtype), buffer=buf, offset=offset)
+        array.setflags(write=False)
+        return array
+    if kind == 'covariance':
+        cov = Covariance(_rebuild(spec[1], buf), name=spec[3])
+        for name, factor in spec[2].items():
+            cov._factor(name, lambda: _rebuild(factor, buf))
+        return cov
+    if kind == 'tuple':
+        return tuple(_rebuild(s, buf) for s in spec[1])
+    if kind == 'list':
+        return [_rebuild(s, buf) for s in spec[1]]
+    if kind == 'dict':
+        return dict((k, _rebuild(s, buf)) for k, s in spec[1])
+    return spec[1]
+
+
+def _attach_segment(name):
+    """
+    open a segment once per process and return its buffer
+    """
+
+    from multiprocessing import shared_memory
+
+    with _lock:
+        try:
+            return _attached[name].buf
+        except KeyError:
+            pass
+        try:
+            #python >= 3.13, the creating process alone is responsible for unlinking
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            shm = shared_memory.SharedMemory(name=name)
+        _attached[name] = shm
+        return shm.buf
+
+
+def _release(shm, pid):
+    """
+    close and, in the creating process, unlink a segment
+    """
+
+    try:
+        shm.close()
+    except BufferError:
+        #views into the segment are still alive in this process
+        pass
+    if os.getpid() == pid:
+        try:
+            shm.unlink()
+        except (IOError, OSError):
+            pass
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+"""
+stack the measurements of several bins into arrays
+"""
+
+from __future__ import (division, print_function, absolute_import, unicode_literals)
+import numpy as np
+
+__all__ = ['stack_measurements']
+
+
+def stack_measurements(measurements):
+    """
+    stack wp measurements that share the same rp bins
+
+    Parameters
+    ----------
+    measurements : list
+        list of measurements as returned by the wp loaders, either
+        (measurement, covariance) or (measurement, err) tuples, or bare
+        measurement arrays of shape (2, n_rp)
+
+    Returns
+    -------
+    rp : numpy.ndarray
+        array of shape (n_rp,)
+
+    wp : numpy.ndarray
+        array of shape (n_bins, n_rp)
+
+    cov : numpy.ndarray
+        array of shape (n_bins, n_rp, n_rp) of covariance matrices.  Errors are
+        converted to diagonal matrices.  None if the measurements have no
+        errors.
+    """
+
+    rows = []
+    covs = []
+    for m in measurements:
+        if isinstance(m, tuple):
+            measurement, err = m
+            if np.ndim(err) == 2:
+                covs.append(np.asarray(err))
+            else:
+                covs.append(np.diag(np.asarray(err)**2))
+        else:
+            measurement = m
+        rows.append(np.asarray(measurement))
+
+    rp = rows[0][0]
+    for measurement in rows[1:]:
+        if not np.array_equal(measurement[0], rp, equal_nan=True):
+            msg = ("measurements do not share the same rp bins.")
+            raise ValueError(msg)
+
+    wp = np.stack([measurement[1] for measurement in rows])
+    if not covs:
+        return rp, wp, None
+    if len(covs) != len(rows):
+        msg = ("either all or none of the measurements must have errors.")
+        raise ValueError(msg)
+    return rp, wp, np.stack(covs)
@@ -6,24 +6,87 @@ callable stellar mass functions from the literature
 
 from __future__ import (division, print_function, absolute_import, unicode_literals)
 import numpy as np
+from .lazy import lazy_property
+from .littleh import native, SMF_UNITS
+from .instrumentation import timed
+from .mixins import PhiMixin
 
-from astropy.table import Table
-from astropy.modeling.models import custom_model
+__all__ = ['LiWhite_2009_phi', 'Baldry_2011_phi', 'Yang_2012_phi','Tomczak_2014_phi',
+           'Piecewise_Log_Schechter', 'log_schechter_grid', 'log_schechter_integral']
 
-__all__ = ['LiWhite_2009_phi', 'Baldry_2011_phi', 'Yang_2012_phi','Tomczak_2014_phi']
+class _DensityMixin(PhiMixin):
+    """
+    number and stellar mass densities of a stellar mass function whose
+    `_integral(a, b, moment)` integrates the published fit in closed form
+    between log10 stellar mass limits in the units of the fit
+    """
+    
+    @timed('integrate', method=True)
+    def number_density(self, m_lo, m_hi=np.inf, h=None):
+        """
+        number density of galaxies with stellar masses between `m_lo` and `m_hi`
+        
+        Parameters
+        ----------
+        m_lo, m_hi : array_like
+            lower and upper stellar mass limits in units Msol/h^2, 0 and inf
+            are accepted.  The limits broadcast against each other, so many
+            thresholds or bins are evaluated in a single call.
+        
+        h : float or array_like, optional
+            if given, the limits are in units Msol and the result is for this
+            value of h, as for `__call__`
+        
+        Returns
+        -------
+        n : float or numpy.ndarray
+            number density in units h^3 Mpc^-3, negative if m_hi < m_lo
+        
+        Notes
+        -----
+        Each Schechter component of the fit is integrated in closed form with
+        `log_schechter_integral`, over its part of the interval for the
+        piecewise fits, see `Piecewise_Log_Schechter.integral`.
+        """
+        
+        return _density(self._integral, self.littleh, m_lo, m_hi, h, 0)
+    
+    @timed('integrate', method=True)
+    def mass_density(self, m_lo, m_hi=np.inf, h=None):
+        """
+        stellar mass density of galaxies with stellar masses between `m_lo`
+        and `m_hi`, see `number_density`
+        
+        Returns
+        -------
+        rho : float or numpy.ndarray
+            stellar mass density in units h Msol Mpc^-3
+        """
+        
+        return _density(self._integral, self.littleh, m_lo, m_hi, h, 1)
 
-class LiWhite_2009_phi(object):
+
+class LiWhite_2009_phi(_DensityMixin):
     """
     stellar mass function from Li & White 2009, arXiv:0901.0706
     """
     def __init__(self, **kwargs):
         """
+        Parameters
+        ----------
+        backend : string
+            'numpy' (default) evaluates the Schechter functions directly with
+            numpy, 'astropy' evaluates the equivalent astropy.modeling
+            compound model stored in the `s` attribute.  astropy is only
+            imported when `s` is first used.
         """
         
         self.publication = ['arXiv:0901.0706']
         
         self.littleh = 1.0
         
+        self.backend = _check_backend(kwargs.get('backend', 'numpy'))
+        
         #parameters from table #1
         self.min_mstar1 = 8.0
         self.phi1 = 0.01465
@@ -43,6 +106,22 @@ class LiWhite_2009_phi(object):
         self.alpha3 = -1.9918
         self.max_mstar3 = 12.0
         
+        #numpy equivalent of `s`, evaluates each mass in its own segment only
+        self.piecewise = Piecewise_Log_Schechter(
+            breaks=[self.max_mstar1, self.max_mstar2],
+            phi0=[self.phi1, self.phi2, self.phi3],
+            x0=[self.x1, self.x2, self.x3],
+            alpha=[self.alpha1, self.alpha2, self.alpha3])
+    
+    @lazy_property
+    def s(self):
+        """
+        astropy.modeling piecewise model, built on first access
+        """
+        
+        from astropy.modeling.models import custom_model
+        Log_Schechter = _astropy_log_schechter()
+        
         #used to build piecewise function
         @custom_model
         def interval(x,x1=0.0,x2=1.0):
@@ -61,10 +140,10 @@ class LiWhite_2009_phi(object):
         s3 = Log_Schechter(phi0=self.phi3, x0=self.x3, alpha=self.alpha3)*interval(x1=self.min_mstar3,x2=np.inf)
         
         #create piecewise model
-        self.s = s1 + s2 + s3
-        
+        return s1 + s2 + s3
     
-    def __call__(self, mstar):
+    @timed('evaluate', method=True)
+    def __call__(self, mstar, h=None):
         """
         stellar mass function from Li & White 2009, arXiv:0901.0706
         
@@ -73,29 +152,86 @@ class LiWhite_2009_phi(object):
         mstar : array_like
             stellar mass in units Msol/h^2
         
+        h : float or array_like, optional
+            if given, `mstar` is in units Msol and phi in units Mpc^-3 dex^-1
+            for this value of h.  An array of h values adds a leading axis of
+            the same shape to the result.
+        
         Returns
         -------
-        phi : nunpy.array
+        phi : numpy.ndarray
             number density in units h^3 Mpc^-3 dex^-1
         """
         
         #take log of stellar masses
-        mstar = np.log10(mstar)
+        mstar, scale = native(mstar, self.littleh, h, SMF_UNITS)
+        
+        if self.backend == 'astropy':
+            phi = self.s(mstar)
+        else:
+            phi = self.piecewise(mstar)
+        return phi*scale
+    
+    def _integral(self, a, b, moment):
+        return self.piecewise.integral(a, b, moment)
+    
+    @property
+    def params(self):
+        """
+        parameter vector (phi1, x1, alpha1, phi2, x2, alpha2, phi3, x3, alpha3)
+        used by `phi_grid`
+        """
+        return np.array([self.phi1, self.x1, self.alpha1,
+                         self.phi2, self.x2, self.alpha2,
+                         self.phi3, self.x3, self.alpha3])
+    
+    def phi_grid(self, mstar, params=None):
+        """
+        evaluate the stellar mass function for many parameter vectors at once
         
-        return self.s(mstar)
+        Parameters
+        ----------
+        mstar : array_like
+            stellar mass in units Msol/h^2
+        
+        params : array_like, optional
+            array of shape (N,9) of parameter vectors ordered as
+            (phi1, x1, alpha1, phi2, x2, alpha2, phi3, x3, alpha3).  The
+            segment boundaries are fixed.  Default is `params`.
+        
+        Returns
+        -------
+        phi : numpy.ndarray
+            array of shape (N,)+mstar.shape of number densities in units
+            h^3 Mpc^-3 dex^-1
+        """
+        
+        if params is None:
+            params = self.params
+        
+        return self.piecewise.grid(np.log10(mstar), params)
 
 
-class Baldry_2011_phi(object):
+class Baldry_2011_phi(_DensityMixin):
     """
     stellar mass function from Baldry et al. 2011, arXiv:1111.5707
     """
     
     def __init__(self, **kwargs):
         """
+        Parameters
+        ----------
+        backend : string
+            'numpy' (default) evaluates the Schechter functions directly with
+            numpy, 'astropy' evaluates the equivalent astropy.modeling
+            compound model stored in the `s` attribute.  astropy is only
+            imported when `s` is first used.
         """
         
         self.littleh = 0.7
         
+        self.backend = _check_backend(kwargs.get('backend', 'numpy'))
+        
         #parameters from figure 13
         self.phi1 = 3.96*10**(-3)
         self.x1 = 10.66
@@ -104,13 +240,30 @@ class Baldry_2011_phi(object):
         self.phi2 = 0.79*10**(-3)
         self.x2 = self.x1
         self.alpha2 = -1.47
+    
+    @lazy_property
+    def s(self):
+        """
+        astropy.modeling compound model, built on first access
+        """
+        
+        Log_Schechter = _astropy_log_schechter()
         
         #define components of double Schechter function
         s1 = Log_Schechter(phi0=self.phi1, x0=self.x1, alpha=self.alpha1)
         s2 = Log_Schechter(phi0=self.phi2, x0=self.x2, alpha=self.alpha2)
         
         #create piecewise model
-        self.s = s1 + s2
+        return s1 + s2
+    
+    @lazy_property
+    def data_table(self):
+        """
+        astropy table of the measured stellar mass function, built on first
+        access
+        """
+        
+        from astropy.table import Table
         
         #data from table #1
         data_rows = [(6.25, 0.50,31.1*10**(-3), 21.6*10**(-3),9),
@@ -140,64 +293,140 @@ class Baldry_2011_phi(object):
                      (11.50,0.20,0.042*10**(-3),0.030*10**(-3),2),
                      (11.70,0.20,0.021*10**(-3),0.021*10**(-3),1),
                      (11.90,0.20,0.042*10**(-3),0.030*10**(-3),2)]
-        self.data_table = Table(rows=data_rows,
+        data_table = Table(rows=data_rows,
             names=('bin_center', 'bin_width', 'phi', 'err', 'N'),
             dtype=('f4', 'f4', 'f4', 'f4', 'i4'))
         
-        self.data_table['bin_center'] = 10**self.data_table['bin_center']
+        data_table['bin_center'] = 10**data_table['bin_center']
+        
+        data_table['bin_center'] = data_table['bin_center']*self.littleh**2
+        data_table['phi'] = data_table['phi']/self.littleh**3
+        data_table['err'] = data_table['err']/self.littleh**3
         
-        self.data_table['bin_center'] = self.data_table['bin_center']*self.littleh**2
-        self.data_table['phi'] = self.data_table['phi']/self.littleh**3
-        self.data_table['err'] = self.data_table['err']/self.littleh**3
+        return data_table
     
-    def __call__(self, mstar):
+    @timed('evaluate', method=True)
+    def __call__(self, mstar, h=None):
         """
-        stellar mass function from Li & White 2009, arXiv:0901.0706
+        stellar mass function from Baldry et al. 2011, arXiv:1111.5707
         
         Parameters
         ----------
         mstar : array_like
             stellar mass in units Msol/h^2
         
+        h : float or array_like, optional
+            if given, `mstar` is in units Msol and phi in units Mpc^-3 dex^-1
+            for this value of h.  An array of h values adds a leading axis of
+            the same shape to the result.
+        
         Returns
         -------
-        phi : nunpy.array
+        phi : numpy.ndarray
             number density in units h^3 Mpc^-3 dex^-1
         """
         
-        #convert from h=1 to h=0.7
-        mstar = mstar / self.littleh**2
+        #take log of stellar masses, converted from h=1 to h=0.7, and the
+        #factor converting phi from h=0.7 back to h=1.0
+        mstar, scale = native(mstar, self.littleh, h, SMF_UNITS)
         
-        #take log of stellar masses
-        mstar = np.log10(mstar)
+        if self.backend == 'astropy':
+            phi = self.s(mstar)
+        else:
+            phi = _log_schechter(mstar, self.phi1, self.x1, self.alpha1)
+            phi += _log_schechter(mstar, self.phi2, self.x2, self.alpha2)
+        return phi*scale
+    
+    def _integral(self, a, b, moment):
+        n = log_schechter_integral(a, b, self.phi1, self.x1, self.alpha1, moment)
+        return n + log_schechter_integral(a, b, self.phi2, self.x2, self.alpha2, moment)
+    
+    @property
+    def params(self):
+        """
+        parameter vector (phi1, x1, alpha1, phi2, x2, alpha2) used by `phi_grid`
+        """
+        return np.array([self.phi1, self.x1, self.alpha1,
+                         self.phi2, self.x2, self.alpha2])
+    
+    def phi_grid(self, mstar, params=None):
+        """
+        evaluate the stellar mass function for many parameter vectors at once
+        
+        Parameters
+        ----------
+        mstar : array_like
+            stellar mass in units Msol/h^2
+        
+        params : array_like, optional
+            array of shape (N,6) of parameter vectors ordered as
+            (phi1, x1, alpha1, phi2, x2, alpha2) in h=0.7 units.
+            Default is `params`.
+        
+        Returns
+        -------
+        phi : numpy.ndarray
+            array of shape (N,)+mstar.shape of number densities in units
+            h^3 Mpc^-3 dex^-1
+        """
+        
+        if params is None:
+            params = self.params
+        params = _check_params(params, 6)
+        
+        #convert from h=1 to h=0.7
+        mstar = np.log10(np.asarray(mstar) / self.littleh**2)
         
         #convert from h=0.7 to h=1.0
-        return self.s(mstar) / self.littleh**3
+        return log_schechter_grid(mstar, params) / self.littleh**3
 
 
-class Yang_2012_phi(object):
+class Yang_2012_phi(_DensityMixin):
     """
     stellar mass function from Yang et al. 2012, arXiv:1110.1420
     """
     
     def __init__(self, **kwargs):
         """
+        Parameters
+        ----------
+        backend : string
+            'numpy' (default) evaluates the Schechter functions directly with
+            numpy, 'astropy' evaluates the equivalent astropy.modeling
+            compound model stored in the `s` attribute.  astropy is only
+            imported when `s` is first used.
         """
         
         self.publication = ['arXiv:1110.1420']
         
         self.littleh = 1.0
         
+        self.backend = _check_backend(kwargs.get('backend', 'numpy'))
+        
         #parameters from appendix B
         self.phi1 = 0.0083635
         self.x1 = 10.673
         self.alpha1 = -1.117
+    
+    @lazy_property
+    def s(self):
+        """
+        astropy.modeling model, built on first access
+        """
+        
+        Log_Schechter = _astropy_log_schechter()
         
         #define components of double Schechter function
-        s1 = Log_Schechter(phi0=self.phi1, x0=self.x1, alpha=self.alpha1)
+        return Log_Schechter(phi0=self.phi1, x0=self.x1, alpha=self.alpha1)
+    
+    @lazy_property
+    def data_table(self):
+        """
+        astropy table of the measured stellar mass function, built on first
+        access
+        """
         
-        #create piecewise model
-        self.s = s1
+        from astropy.table import Table
         
         #data from table #6
         data_rows  = [(8.2, 3.7705, 1.5258, 0.9436, 0.7870, 2.8269, 1.2665, 3.0870, 1.6328, 0.9436, 0.7870, 2.1434, 1.3832, 0.6835, 0.9345, 0.0000, 0.0000, 0.6835, 0.9345),
@@ -236,16 +465,19 @@ class Yang_2012_phi(object):
                      (11.5, 0.0042, 0.0003, 0.0034, 0.0003, 0.0008, 0.0001, 0.0041, 0.0003, 0.0033, 0.0003, 0.0008, 0.0001, 0.0001, 0.0000, 0.0001, 0.0000, 0.0000, 0.0000),
                      (11.6, 0.0013, 0.0001, 0.0010, 0.0001, 0.0003, 0.0001, 0.0013, 0.0001, 0.0010, 0.0001, 0.0003, 0.0001, 0.0000, 0.0000, 0.0000, 0.0000, 0.0000, 0.0000),
                      (11.7, 0.0003, 0.0001, 0.0002, 0.0001, 0.0001, 0.0000, 0.0003, 0.0001, 0.0002, 0.0001, 0.0001, 0.0000, 0.0000, 0.0000, 0.0000, 0.0000, 0.0000, 0.0000)]
-        self.data_table = Table(rows=data_rows,
+        data_table = Table(rows=data_rows,
             names=('bin_center', 'all', 'all_err', 'red', 'red_err', 'blue', 'blue_err',
                    'cen_all', 'cen_all_err', 'cen_red', 'cen_red_err', 'cen_blue', 'cen_blue_err',
                    'sat_all', 'sat_all_err', 'sat_red', 'sat_red_err', 'sat_blue', 'sat_blue_err'),
             dtype=('f4', 'f4', 'f4', 'f4', 'f4','f4','f4','f4', 'f4', 'f4', 'f4', 'f4','f4','f4','f4', 'f4', 'f4', 'f4', 'f4'))
         
-        for name in self.data_table.colnames[1:]:
-            self.data_table[name] = self.data_table[name]*0.01
+        for name in data_table.colnames[1:]:
+            data_table[name] = data_table[name]*0.01
         
-    def __call__(self, mstar):
+        return data_table
+    
+    @timed('evaluate', method=True)
+    def __call__(self, mstar, h=None):
         """
         stellar mass function from Yang et al. 2012, arXiv:1110.1420
         
@@ -254,19 +486,64 @@ class Yang_2012_phi(object):
         mstar : array_like
             stellar mass in units Msol/h^2
         
+        h : float or array_like, optional
+            if given, `mstar` is in units Msol and phi in units Mpc^-3 dex^-1
+            for this value of h.  An array of h values adds a leading axis of
+            the same shape to the result.
+        
         Returns
         -------
-        phi : nunpy.array
+        phi : numpy.ndarray
             number density in units h^3 Mpc^-3 dex^-1
         """
         
         #take log of stellar masses
-        mstar = np.log10(mstar)
+        mstar, scale = native(mstar, self.littleh, h, SMF_UNITS)
         
-        return self.s(mstar)
+        if self.backend == 'astropy':
+            phi = self.s(mstar)
+        else:
+            phi = _log_schechter(mstar, self.phi1, self.x1, self.alpha1)
+        return phi*scale
+    
+    def _integral(self, a, b, moment):
+        return log_schechter_integral(a, b, self.phi1, self.x1, self.alpha1, moment)
+    
+    @property
+    def params(self):
+        """
+        parameter vector (phi1, x1, alpha1) used by `phi_grid`
+        """
+        return np.array([self.phi1, self.x1, self.alpha1])
+    
+    def phi_grid(self, mstar, params=None):
+        """
+        evaluate the stellar mass function for many parameter vectors at once
+        
+        Parameters
+        ----------
+        mstar : array_like
+            stellar mass in units Msol/h^2
+        
+        params : array_like, optional
+            array of shape (N,3) of parameter vectors ordered as
+            (phi1, x1, alpha1).  Default is `params`.
+        
+        Returns
+        -------
+        phi : numpy.ndarray
+            array of shape (N,)+mstar.shape of number densities in units
+            h^3 Mpc^-3 dex^-1
+        """
+        
+        if params is None:
+            params = self.params
+        params = _check_params(params, 3)
+        
+        return log_schechter_grid(np.log10(mstar), params)
 
 
-class Tomczak_2014_phi(object):
+class Tomczak_2014_phi(PhiMixin):
     """
     stellar mass function from Tomczak et al. 2014, arXiv:1309.5972
     """
@@ -276,16 +553,30 @@ class Tomczak_2014_phi(object):
         Parameters
         ----------
         redshift : float
-            default is 1.0
+            default is 1.0.  Can be overridden per galaxy when calling.
         
         type : string
-            default is 'all'
+            'all', 'star-forming' or 'quiescent', default is 'all'
+        
+        interpolate : bool
+            if True, interpolate the Schechter parameters linearly in
+            redshift between the centers of the redshift bins instead of
+            using the parameters of the bin containing each redshift.
+            Default is False.
+        
+        backend : string
+            'numpy' (default) evaluates the Schechter functions directly with
+            numpy, 'astropy' evaluates the equivalent astropy.modeling
+            compound model stored in the `s` attribute.  astropy is only
+            imported when `s` is first used.
         """
         
         self.publication = ['arXiv:1309.5972']
         
         self.littleh = 0.7
         
+        self.backend = _check_backend(kwargs.get('backend', 'numpy'))
+        
         if 'redshift' in kwargs:
             self.z = kwargs['redshift']
         else:
@@ -296,8 +587,16 @@ class Tomczak_2014_phi(object):
         else:
             self.type = 'all'
         
+        if self.type not in ('all', 'star-forming', 'quiescent'):
+            msg = ("type not available.  `type` must be one of "
+                   "['all', 'star-forming', 'quiescent'].")
+            raise ValueError(msg)
+        
+        self.interpolate = kwargs.get('interpolate', False)
+        
         #parameters table 2 all
-        self.z_bins = np.array([0.2,0.5,0.75,1.0,1.25,1.5,2.0,2.5,2.5,3.0])
+        self.z_bins = np.array([0.2,0.5,0.75,1.0,1.25,1.5,2.0,2.5,3.0])
+        self.z_centers = 0.5*(self.z_bins[1:]+self.z_bins[:-1])
         self.phi1_all = 10**np.array([-2.54,-2.55,-2.56,-2.72,-2.78,-3.05,-3.80,-4.54])
         self.x1_all = np.array([10.78,10.70,10.66,10.54,10.61,10.74,10.69,10.74])
         self.alpha1_all = np.array([-0.98,-0.39,-0.37,0.30,-0.12,0.04,1.03,1.62])
@@ -321,32 +620,57 @@ class Tomczak_2014_phi(object):
         self.x2_q = self.x1_all
         self.alpha2_q = np.array([-1.97,-1.69,-1.51,-1.57,-0.54,-0.18,-3.07,-2.51])
         
-        self.s_all = np.empty((8,), dtype=object)
-        self.s_sf = np.empty((8,), dtype=object)
-        self.s_q = np.empty((8,), dtype=object)
-        
-        for i in range(0,8):
-            #define components of double Schechter function
-            s1 = Log_Schechter(phi0=self.phi1_all[i], x0=self.x1_all[i], alpha=self.alpha1_all[i])
-            s2 = Log_Schechter(phi0=self.phi2_all[i], x0=self.x2_all[i], alpha=self.alpha2_all[i])
-            #create piecewise model
-            self.s_all[i] = s1 + s2
-        
-        for i in range(0,8):
-            #define components of double Schechter function
-            s1 = Log_Schechter(phi0=self.phi1_sf[i], x0=self.x1_sf[i], alpha=self.alpha1_sf[i])
-            s2 = Log_Schechter(phi0=self.phi2_sf[i], x0=self.x2_sf[i], alpha=self.alpha2_sf[i])
-            #create piecewise model
-            self.s_sf[i] = s1 + s2
-        
-        for i in range(0,8):
+        #parameter tables of shape (8,6) with columns
+        #log10(phi1), x1, alpha1, log10(phi2), x2, alpha2
+        self.param_table = {}
+        for type, params in [('all', (self.phi1_all, self.x1_all, self.alpha1_all,
+                                      self.phi2_all, self.x2_all, self.alpha2_all)),
+                             ('star-forming', (self.phi1_sf, self.x1_sf, self.alpha1_sf,
+                                               self.phi2_sf, self.x2_sf, self.alpha2_sf)),
+                             ('quiescent', (self.phi1_q, self.x1_q, self.alpha1_q,
+                                            self.phi2_q, self.x2_q, self.alpha2_q))]:
+            table = np.column_stack(params)
+            table[:,[0,3]] = np.log10(table[:,[0,3]])
+            table.setflags(write=False)
+            self.param_table[type] = table
+    
+    @lazy_property
+    def s_all(self):
+        """
+        astropy.modeling models of all galaxies in each redshift bin, built
+        on first access
+        """
+        return self._astropy_models(self.param_table['all'])
+    
+    @lazy_property
+    def s_sf(self):
+        """
+        astropy.modeling models of star-forming galaxies in each redshift
+        bin, built on first access
+        """
+        return self._astropy_models(self.param_table['star-forming'])
+    
+    @lazy_property
+    def s_q(self):
+        """
+        astropy.modeling models of quiescent galaxies in each redshift bin,
+        built on first access
+        """
+        return self._astropy_models(self.param_table['quiescent'])
+    
+    def _astropy_models(self, table):
+        Log_Schechter = _astropy_log_schechter()
+        models = np.empty((len(table),), dtype=object)
+        for i, (phi1, x1, alpha1, phi2, x2, alpha2) in enumerate(table):
             #define components of double Schechter function
-            s1 = Log_Schechter(phi0=self.phi1_q[i], x0=self.x1_q[i], alpha=self.alpha1_q[i])
-            s2 = Log_Schechter(phi0=self.phi2_q[i], x0=self.x2_q[i], alpha=self.alpha2_q[i])
+            s1 = Log_Schechter(phi0=10**phi1, x0=x1, alpha=alpha1)
+            s2 = Log_Schechter(phi0=10**phi2, x0=x2, alpha=alpha2)
             #create piecewise model
-            self.s_q[i] = s1 + s2
+            models[i] = s1 + s2
+        return models
     
-    def __call__(self, mstar):
+    @timed('evaluate', method=True)
+    def __call__(self, mstar, z=None, interpolate=None, h=None):
         """
         stellar mass function from Tomczak et al. 2014, arXiv:1309.5972
         
@@ -355,39 +679,526 @@ class Tomczak_2014_phi(object):
         mstar : array_like
             stellar mass in units Msol/h^2
         
+        z : array_like, optional
+            redshift of each galaxy, broadcast against `mstar`.  Default is
+            the redshift given at construction.
+        
+        interpolate : bool, optional
+            interpolate the parameters in redshift, see `parameters`.
+            Default is the value given at construction.
+        
+        h : float or array_like, optional
+            if given, `mstar` is in units Msol and phi in units Mpc^-3 dex^-1
+            for this value of h.  An array of h values adds a leading axis of
+            the same shape to the result.
+        
         Returns
         -------
-        phi : nunpy.array
+        phi : numpy.ndarray
             number density in units h^3 Mpc^-3 dex^-1
         """
         
-        #convert from h=1 to h=0.7
-        mstar = mstar / self.littleh**2
+        #take log of stellar masses, converted from h=1 to h=0.7, and the
+        #factor converting phi from h=0.7 back to h=1.0
+        mstar, scale = native(mstar, self.littleh, h, SMF_UNITS)
         
-        #take log of stellar masses
-        mstar = np.log10(mstar)
+        if z is None:
+            z = self.z
+        if interpolate is None:
+            interpolate = self.interpolate
         
-        i = np.searchsorted(self.z_bins,self.z)
+        if self.backend == 'numpy':
+            phi1, x1, alpha1, phi2, x2, alpha2 = self.parameters(z, interpolate)
+            phi = _log_schechter(mstar, phi1, x1, alpha1)
+            phi += _log_schechter(mstar, phi2, x2, alpha2)
+        else:
+            if interpolate or np.ndim(z) != 0:
+                msg = ("redshift arrays and interpolation require backend='numpy'.")
+                raise ValueError(msg)
+            i = self.redshift_bin(z)
+            if self.type=='all':
+                phi = self.s_all[i](mstar)
+            elif self.type=='star-forming':
+                phi = self.s_sf[i](mstar)
+            elif self.type=='quiescent':
+                phi = self.s_q[i](mstar)
         
         #convert from h=0.7 to h=1.0
-        if self.type=='all':
-            return self.s_all[i](mstar) / self.littleh**3
-        elif self.type=='star-forming':
-            return self.s_sf[i](mstar) / self.littleh**3
-        elif self.type=='quiescent':
-            return self.s_q[i](mstar) / self.littleh**3
+        return phi*scale
+    
+    def redshift_bin(self, z):
+        """
+        index of the redshift bin containing each redshift
+        
+        Redshifts outside the range of the measurements are assigned to the
+        first or last bin.
+        
+        Parameters
+        ----------
+        z : array_like
+            redshift
+        
+        Returns
+        -------
+        i : numpy.ndarray
+            integer array with the shape of `z`
+        """
+        
+        i = np.searchsorted(self.z_bins, z, side='right') - 1
+        return np.clip(i, 0, len(self.z_bins)-2)
+    
+    def parameters(self, z=None, interpolate=None, type=None):
+        """
+        double Schechter parameters at each redshift
+        
+        Parameters
+        ----------
+        z : array_like, optional
+            redshift.  Default is the redshift given at construction.
+        
+        interpolate : bool, optional
+            if False, return the parameters of the redshift bin containing
+            each z.  If True, interpolate log10(phi), x and alpha linearly
+            between the centers of the redshift bins; redshifts beyond the
+            first or last bin center take the parameters of that bin.
+            Default is the value given at construction.
+        
+        type : string, optional
+            galaxy type.  Default is the type given at construction.
+        
+        Returns
+        -------
+        phi1, x1, alpha1, phi2, x2, alpha2 : numpy.ndarray
+            arrays with the shape of `z`
+        """
+        
+        if z is None:
+            z = self.z
+        if interpolate is None:
+            interpolate = self.interpolate
+        if type is None:
+            type = self.type
+        
+        try:
+            table = self.param_table[type]
+        except KeyError:
+            msg = ("type not available.  `type` must be one of "
+                   "['all', 'star-forming', 'quiescent'].")
+            raise ValueError(msg)
+        
+        if interpolate:
+            z = np.asarray(z, dtype=float)
+            params = [np.interp(z, self.z_centers, table[:,j]) for j in range(6)]
         else:
-            print('type not available')
+            i = self.redshift_bin(z)
+            params = [table[i,j] for j in range(6)]
+        
+        params[0] = 10.0**params[0]
+        params[3] = 10.0**params[3]
+        return tuple(params)
+    
+    @timed('integrate', method=True)
+    def number_density(self, m_lo, m_hi=np.inf, z=None, interpolate=None, h=None):
+        """
+        number density of galaxies with stellar masses between `m_lo` and `m_hi`
+        
+        Parameters
+        ----------
+        m_lo, m_hi : array_like
+            lower and upper stellar mass limits in units Msol/h^2, 0 and inf
+            are accepted.  The limits broadcast against each other, so many
+            thresholds or bins are evaluated in a single call.
+        
+        z : array_like, optional
+            redshift, broadcast against the limits.  Default is the redshift
+            given at construction.
+        
+        interpolate : bool, optional
+            interpolate the parameters in redshift, see `parameters`
+        
+        h : float or array_like, optional
+            if given, the limits are in units Msol and the result is for this
+            value of h, as for `__call__`
+        
+        Returns
+        -------
+        n : float or numpy.ndarray
+            number density in units h^3 Mpc^-3, negative if m_hi < m_lo
+        
+        Notes
+        -----
+        Both Schechter components are integrated in closed form with
+        `log_schechter_integral`, with the parameters at each redshift.
+        """
+        
+        return _density(self._integral(z, interpolate), self.littleh, m_lo, m_hi, h, 0)
+    
+    @timed('integrate', method=True)
+    def mass_density(self, m_lo, m_hi=np.inf, z=None, interpolate=None, h=None):
+        """
+        stellar mass density of galaxies with stellar masses between `m_lo`
+        and `m_hi`, see `number_density`
+        
+        Returns
+        -------
+        rho : float or numpy.ndarray
+            stellar mass density in units h Msol Mpc^-3
+        """
+        
+        return _density(self._integral(z, interpolate), self.littleh, m_lo, m_hi, h, 1)
+    
+    def _integral(self, z, interpolate):
+        """
+        closed form integral of the double Schechter function at redshift `z`
+        """
+        
+        phi1, x1, alpha1, phi2, x2, alpha2 = self.parameters(z, interpolate)
+        
+        def integral(a, b, moment):
+            n = log_schechter_integral(a, b, phi1, x1, alpha1, moment)
+            return n + log_schechter_integral(a, b, phi2, x2, alpha2, moment)
+        return integral
+    
+    @property
+    def params(self):
+        """
+        parameter vector (phi1, x1, alpha1, phi2, x2, alpha2) at the redshift
+        and type given at construction, used by `phi_grid`
+        """
+        return np.array([float(p) for p in self.parameters()])
+    
+    def phi_grid(self, mstar, params=None):
+        """
+        evaluate the stellar mass function for many parameter vectors at once
+        
+        Parameters
+        ----------
+        mstar : array_like
+            stellar mass in units Msol/h^2
+        
+        params : array_like, optional
+            array of shape (N,6) of parameter vectors ordered as
+            (phi1, x1, alpha1, phi2, x2, alpha2) in h=0.7 units.
+            Default is `params`.
+        
+        Returns
+        -------
+        phi : numpy.ndarray
+            array of shape (N,)+mstar.shape of number densities in units
+            h^3 Mpc^-3 dex^-1
+        """
+        
+        if params is None:
+            params = self.params
+        params = _check_params(params, 6)
+        
+        #convert from h=1 to h=0.7
+        mstar = np.log10(np.asarray(mstar) / self.littleh**2)
+        
+        #convert from h=0.7 to h=1.0
+        return log_schechter_grid(mstar, params) / self.littleh**3
+
+
+class Piecewise_Log_Schechter(object):
+    """
+    piecewise (broken) log schecter x function
+    
+    Each x is assigned to a single segment with `numpy.searchsorted` and only
+    that segment's Schechter function is evaluated.  Segment i covers the
+    interval (breaks[i-1], breaks[i]], with the first and last segments
+    extending to -inf and +inf respectively.
+    """
+    
+    def __init__(self, breaks, phi0, x0, alpha):
+        """
+        Parameters
+        ----------
+        breaks : array_like
+            increasing array of shape (k,) of segment boundaries in log10(x)
+        
+        phi0, x0, alpha : array_like
+            arrays of shape (k+1,) of Schechter parameters of each segment
+        """
+        
+        self.breaks = np.asarray(breaks, dtype=float)
+        self.phi0 = np.asarray(phi0, dtype=float)
+        self.x0 = np.asarray(x0, dtype=float)
+        self.alpha = np.asarray(alpha, dtype=float)
+        
+        nseg = len(self.breaks)+1
+        if not (len(self.phi0) == len(self.x0) == len(self.alpha) == nseg):
+            msg = ("`phi0`, `x0` and `alpha` must have one entry per segment.")
+            raise ValueError(msg)
+        if np.any(np.diff(self.breaks) <= 0.0):
+            msg = ("`breaks` must be strictly increasing.")
+            raise ValueError(msg)
+        
+        #per segment constants of the Schechter function
+        self._norm = np.log(10.0)*self.phi0
+        self._slope = 1.0+self.alpha
+    
+    def segment(self, x):
+        """
+        return the index of the segment each x falls in
+        """
+        return np.searchsorted(self.breaks, x, side='left')
+    
+    def __call__(self, x):
+        """
+        Parameters
+        ----------
+        x : array_like
+            log10 of the independent variable
         
+        Returns
+        -------
+        phi : numpy.array
+        """
+        
+        x = np.asarray(x, dtype=float)
+        i = self.segment(x)
+        y = x - self.x0[i]
+        return self._norm[i]*(10.0**(y*self._slope[i]))*np.exp(-10.0**y)
+    
+    def grid(self, x, params):
+        """
+        evaluate for many parameter vectors at once, keeping the breaks fixed
+        
+        Parameters
+        ----------
+        x : array_like
+            log10 of the independent variable
+        
+        params : array_like
+            array of shape (N,3*(k+1)) of parameter vectors ordered as
+            (phi0, x0, alpha) of the first segment, then the second, ...
+        
+        Returns
+        -------
+        phi : numpy.ndarray
+            array of shape (N,)+x.shape
+        """
+        
+        nseg = len(self.breaks)+1
+        params = _check_params(params, 3*nseg).reshape(-1, nseg, 3)
+        
+        x = np.asarray(x, dtype=float)
+        i = self.segment(x)
+        phi0 = params[:,i,0]
+        x0 = params[:,i,1]
+        alpha = params[:,i,2]
+        return _log_schechter(x, phi0, x0, alpha)
+    
+    def integral(self, a, b, moment=0):
+        """
+        integral between log10 limits `a` and `b`, each segment integrated in
+        closed form over its part of the interval
+        
+        Parameters
+        ----------
+        a, b : array_like
+            lower and upper limits in log10 of the independent variable
+        
+        moment : int
+            0 for the integral of the function, 1 for the integral weighted
+            by 10^x, see `log_schechter_integral`
+        
+        Returns
+        -------
+        n : numpy.ndarray
+            array with the broadcast shape of `a` and `b`
+        """
+        
+        a = np.asarray(a, dtype=float)
+        b = np.asarray(b, dtype=float)
+        edges = np.concatenate([[-np.inf], self.breaks, [np.inf]])
         
+        n = 0.0
+        for i in range(len(edges)-1):
+            lo = np.clip(a, edges[i], edges[i+1])
+            hi = np.clip(b, edges[i], edges[i+1])
+            n = n + log_schechter_integral(lo, hi, self.phi0[i], self.x0[i], self.alpha[i], moment)
+        return n
+
+
+def log_schechter_grid(x, params):
+    """
+    sum of log schecter x functions for many parameter vectors at once
+    
+    Parameters
+    ----------
+    x : array_like
+        log10 of the independent variable
+    
+    params : array_like
+        array of shape (N,3*k) of parameter vectors of a sum of k Schechter
+        functions, ordered as (phi0, x0, alpha) of the first component, then
+        the second, ...  k=1 is a single and k=2 a double Schechter function.
+    
+    Returns
+    -------
+    phi : numpy.ndarray
+        array of shape (N,)+x.shape
+    """
+    
+    params = np.atleast_2d(np.asarray(params, dtype=float))
+    if params.ndim != 2 or params.shape[1] % 3 != 0:
+        msg = ("`params` must have shape (N,3*k).")
+        raise ValueError(msg)
+    
+    x = np.asarray(x, dtype=float)
+    shape = (params.shape[0],) + (1,)*x.ndim
+    
+    phi = 0.0
+    for k in range(params.shape[1]//3):
+        phi0 = params[:,3*k].reshape(shape)
+        x0 = params[:,3*k+1].reshape(shape)
+        alpha = params[:,3*k+2].reshape(shape)
+        phi = phi + _log_schechter(x, phi0, x0, alpha)
+    return phi
+
+
+def log_schechter_integral(a, b, phi0, x0, alpha, moment=0):
+    """
+    closed form integral of a log schecter x function between `a` and `b`
+    
+    Parameters
+    ----------
+    a, b : array_like
+        lower and upper limits in log10 of the independent variable, -inf and
+        inf are accepted
+    
+    phi0, x0, alpha : array_like
+        Schechter parameters, broadcast against the limits
+    
+    moment : int
+        0 for the number density, 1 for the integral weighted by 10^x, e.g.
+        the stellar mass density
+    
+    Returns
+    -------
+    n : numpy.ndarray
+        array with the broadcast shape of the inputs, negative if b < a
+    
+    Notes
+    -----
+    With y = 10^(x - x0) the integral is
+    
+    .. math::
+        \\phi_0 10^{k x_0} [\\Gamma(\\alpha+1+k, y_a) - \\Gamma(\\alpha+1+k, y_b)]
+    
+    for moment k, evaluated with `upper_incomplete_gamma`, which also handles
+    alpha+1+k <= 0.
+    """
+    
+    from .incomplete_gamma import upper_incomplete_gamma
+    
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    s = np.asarray(alpha, dtype=float) + 1.0 + moment
+    with np.errstate(over='ignore'):
+        ya = 10.0**(a - x0)
+        yb = 10.0**(b - x0)
+    with np.errstate(invalid='ignore'):
+        n = phi0*10.0**(moment*np.asarray(x0, dtype=float))*(upper_incomplete_gamma(s, ya) - upper_incomplete_gamma(s, yb))
+    #empty intervals, e.g. segments of a piecewise function outside of the limits
+    return np.where(a == b, 0.0, n)
+
+
+def _check_params(params, p):
+    """
+    return `params` as a float array of shape (N,p)
+    """
+    params = np.atleast_2d(np.asarray(params, dtype=float))
+    if params.ndim != 2 or params.shape[1] != p:
+        msg = ("`params` must have shape (N,{0}).".format(p))
+        raise ValueError(msg)
+    return params
+
+
+def _check_backend(backend):
+    if backend not in ('numpy', 'astropy'):
+        msg = ("backend must be 'numpy' or 'astropy'.")
+        raise ValueError(msg)
+    return backend
+
+
+def _density(integral, littleh, m_lo, m_hi, h, moment):
+    """
+    number (moment=0) or stellar mass (moment=1) density of a stellar mass
+    function between stellar mass limits in h=1 units, or the units of `h`
+    
+    `integral(a, b, moment)` integrates the published fit between log10
+    limits in the units of the fit.
+    """
+    
+    m_lo, m_hi = np.broadcast_arrays(np.asarray(m_lo, dtype=float), np.asarray(m_hi, dtype=float))
+    with np.errstate(divide='ignore'):
+        a, scale = native(m_lo, littleh, h, SMF_UNITS)
+        b, scale = native(m_hi, littleh, h, SMF_UNITS)
+    
+    #`scale` converts phi, r**y with r = h/littleh.  Masses convert with
+    #r**x, so the mass density with r**(x+y).
+    if moment:
+        scale = scale**((SMF_UNITS.x + SMF_UNITS.y)/SMF_UNITS.y)
+    n = integral(a, b, moment)*scale
+    if np.ndim(n) == 0:
+        return float(n)
+    return n
 
-@custom_model
-def Log_Schechter(x, phi0=0.001, x0=10.5, alpha=-1.0):
+
+def _log_schechter(x, phi0, x0, alpha, out=None):
     """
-    log schecter x function
+    log schecter x function evaluated directly with numpy
+    
+    The function is evaluated in place in two buffers of the output size,
+    one of which is `out` (float64) if given.
     """
-    x = np.asarray(x)
-    x = x.astype(float)
+    x = np.asarray(x, dtype=float)
     norm = np.log(10.0)*phi0
-    val = norm*(10.0**((x-x0)*(1.0+alpha)))*np.exp(-10.0**(x-x0))
-    return val
+    shape = np.broadcast_shapes(x.shape, np.shape(phi0), np.shape(x0), np.shape(alpha))
+    if out is None:
+        out = np.empty(shape)
+    
+    y = np.subtract(x, x0, out=np.empty(shape))
+    #exp(-10**(x-x0))
+    np.power(10.0, y, out=out)
+    np.negative(out, out=out)
+    np.exp(out, out=out)
+    #norm*10**((x-x0)*(1+alpha))
+    np.multiply(y, 1.0+alpha, out=y)
+    np.power(10.0, y, out=y)
+    np.multiply(norm, y, out=y)
+    return np.multiply(y, out, out=out)
+
+
+_Log_Schechter = None
+
+
+def _astropy_log_schechter():
+    """
+    return the astropy.modeling `Log_Schechter` model, importing astropy and
+    defining the model on the first call
+    """
+    
+    global _Log_Schechter
+    if _Log_Schechter is None:
+        from astropy.modeling.models import custom_model
+        
+        @custom_model
+        def Log_Schechter(x, phi0=0.001, x0=10.5, alpha=-1.0):
+            """
+            log schecter x function
+            """
+            return _log_schechter(x, phi0, x0, alpha)
+        
+        _Log_Schechter = Log_Schechter
+    return _Log_Schechter
+
+
+def __getattr__(name):
+    #`Log_Schechter` is defined on first use to avoid importing astropy
+    if name == 'Log_Schechter':
+        return _astropy_log_schechter()
+    msg = ("module {0!r} has no attribute {1!r}".format(__name__, name))
+    raise AttributeError(msg)
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+
+"""
+abundance matching with inverse cumulative number density tables
+"""
+
+from __future__ import (division, print_function, absolute_import, unicode_literals)
+import numpy as np
+from .. import abundance_matching, stellar_mass_functions
+
+
+class _NumericalModel(object):
+    """
+    stellar mass function without an analytic number density
+    """
+
+    def __init__(self):
+        self.model = stellar_mass_functions.Yang_2012_phi()
+        self.params = self.model.params
+
+    def phi_grid(self, mstar, params=None):
+        return self.model.phi_grid(mstar, params)
+
+
+def test_numerical_table():
+    numerical = abundance_matching.cumulative_table(_NumericalModel(), n_points=1001)
+    analytic = abundance_matching.cumulative_table(stellar_mass_functions.Yang_2012_phi(),
+                                                   n_points=1001)
+    assert numerical.quadrature_error > 0.0
+    assert analytic.quadrature_error == 0.0
+
+    n = np.logspace(-6, -1, 51)
+    x_numerical = numerical.threshold(n, log=True)
+    x_analytic = analytic.threshold(n, log=True)
+    assert np.all(np.isfinite(x_numerical))
+    dx = np.abs(x_numerical - x_analytic)
+    assert dx.max() < numerical.error + analytic.error
+    assert dx.max() < 1e-4
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+"""
+the binary store of the bundled tables
+"""
+
+from __future__ import (division, print_function, absolute_import, unicode_literals)
+import json
+import os
+import stat
+import numpy as np
+from .. import binary_store
+
+
+def test_published_mode(tmp_path):
+    store_dir = str(tmp_path)
+    umask = os.umask(0o022)
+    try:
+        index_path = binary_store.build_store(store_dir)
+    finally:
+        os.umask(umask)
+
+    blobs = [f for f in os.listdir(store_dir) if f.startswith('tables-')]
+    assert len(blobs) == 1
+    for path in (index_path, os.path.join(store_dir, blobs[0])):
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o644
+    #no temporary files are left behind
+    assert sorted(os.listdir(store_dir)) == sorted(['index.json'] + blobs)
+
+
+def test_signature_skips_hash(tmp_path, monkeypatch):
+    store_dir = str(tmp_path)
+    monkeypatch.setenv('LSS_OBSERVATIONS_STORE', store_dir)
+    monkeypatch.setattr(binary_store, '_ragged_tables', {})
+    binary_store.build_store(store_dir)
+    relpath = binary_store.source_files()[0]
+    expected = binary_store.parse_table(os.path.join(binary_store._package_dir, relpath))[0]
+
+    calls = []
+    source_hash = binary_store.source_hash
+
+    def counting_hash(files=None):
+        calls.append(1)
+        return source_hash(files)
+
+    monkeypatch.setattr(binary_store, 'source_hash', counting_hash)
+
+    #sizes and modification times match, the sources are not hashed
+    monkeypatch.setattr(binary_store, '_store', None)
+    assert np.array_equal(binary_store.get_values(relpath), expected)
+    assert calls == []
+
+    #a stale signature falls back to the hash, which matches, and is updated
+    index_path = os.path.join(store_dir, 'index.json')
+    with open(index_path) as f:
+        meta = json.load(f)
+    meta['signature'][0][2] -= 1
+    with open(index_path, 'w') as f:
+        json.dump(meta, f)
+    blob = meta['blob']
+    monkeypatch.setattr(binary_store, '_store', None)
+    assert np.array_equal(binary_store.get_values(relpath), expected)
+    assert calls == [1]
+    with open(index_path) as f:
+        meta = json.load(f)
+    assert meta['signature'] == binary_store._source_signature(binary_store.source_files())
+    assert meta['blob'] == blob
+
+    monkeypatch.setattr(binary_store, '_store', None)
+    binary_store.get_values(relpath)
+    assert calls == [1]
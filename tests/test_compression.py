@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+"""
+compression of data vectors
+"""
+
+from __future__ import (division, print_function, absolute_import, unicode_literals)
+import numpy as np
+import pytest
+from .. import likelihood, zehavi_2011_wp, hearin_2014_wp
+from ..compression import compress
+
+MEASUREMENTS = {
+    'full': lambda: zehavi_2011_wp(-21.0, -20.0),
+    'diagonal': lambda: hearin_2014_wp(10**9.49),
+    'joint': lambda: [zehavi_2011_wp(-21.0, -20.0), zehavi_2011_wp(-20.0, -19.0, 'red')],
+}
+
+
+def _models(measurements, n_models=8):
+    data = likelihood.data_vector(measurements)[0]
+    rng = np.random.default_rng(0)
+    return data*(1.0 + 0.1*rng.standard_normal((n_models, len(data))))
+
+
+@pytest.mark.parametrize('name', sorted(MEASUREMENTS))
+@pytest.mark.parametrize('signal', [False, True])
+def test_full_rank_chi_square(name, signal):
+    measurements = MEASUREMENTS[name]()
+    models = _models(measurements)
+    n = models.shape[1]
+
+    if signal:
+        c = compress(measurements, n_modes=n, signal=np.eye(n))
+    else:
+        c = compress(measurements, n_modes=n)
+    assert c.n_modes == n
+    assert np.allclose(c.chi_square(models), likelihood.chi_square(measurements, models),
+                       rtol=1e-9, atol=0)
+
+
+def test_signal_modes_whiten():
+    measurements = MEASUREMENTS['full']()
+    data, cov, mask = likelihood.data_vector(measurements)
+    signal = np.random.default_rng(1).standard_normal((3, len(data)))
+
+    c = compress(measurements, signal=signal, n_modes=3)
+    #the compressed data have unit covariance
+    assert np.allclose(c.matrix.dot(cov.array).dot(c.matrix.T), np.eye(3), atol=1e-9)
+    #and keep the Fisher information of the templates
+    fisher = signal.dot(cov.solve(signal.T))
+    compressed = c.project(signal)
+    assert np.allclose(compressed.dot(compressed.T), fisher, rtol=1e-9)
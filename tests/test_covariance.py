@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+
+"""
+covariance matrices of the shipped measurements
+"""
+
+from __future__ import (division, print_function, absolute_import, unicode_literals)
+import numpy as np
+import pytest
+from .. import catalog, likelihood
+from ..covariance import Covariance
+
+#(sample, lower edge of log10(mstar)) of the yang_2012 bins whose published
+#covariance matrix is not positive definite
+NOT_POSITIVE_DEFINITE = [('Volume1', 10.0), ('Volume1', 10.5),
+                         ('Mass-limit', 10.0), ('Mass-limit', 10.5)]
+
+
+def _covariances():
+    for entry in catalog.catalog:
+        measurement = catalog.load(entry)
+        if isinstance(measurement, tuple) and isinstance(measurement[1], Covariance):
+            yield entry, measurement
+
+
+@pytest.mark.parametrize('entry, measurement', list(_covariances()),
+                         ids=lambda x: '{0}-{1}-{2}'.format(x.paper, x.sample, x.lo)
+                         if isinstance(x, catalog.Entry) else '')
+def test_cholesky(entry, measurement):
+    cov = measurement[1]
+    if entry.paper == 'yang_2012' and (entry.sample, entry.lo) in NOT_POSITIVE_DEFINITE:
+        with pytest.raises(ValueError, match='yang_2012 {0} {1}'.format(entry.sample, entry.lo)):
+            likelihood.chi_square(measurement, measurement[0][1])
+        cov = cov.regularize()
+        assert cov.name == measurement[1].name
+    else:
+        assert cov.regularize() is cov
+    L = cov.cholesky
+    assert np.allclose(L.dot(L.T), cov.array, rtol=1e-10, atol=0)
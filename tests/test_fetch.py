@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+"""
+fetch the tables of the data manifest from a local web server
+"""
+
+from __future__ import (division, print_function, absolute_import, unicode_literals)
+import functools
+import os
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from .. import fetch
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def mirror():
+    """
+    URL of a web server serving the data tree of the package
+    """
+
+    handler = functools.partial(_QuietHandler, directory=fetch._package_dir)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield 'http://127.0.0.1:{0}'.format(server.server_address[1])
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_fetch_and_verify(mirror, tmp_path, capsys):
+    dest = str(tmp_path)
+    manifest = fetch.load_manifest()
+
+    assert fetch.main(['--verify', '--dest', dest]) == 1
+    assert fetch.main(['--mirror', mirror, '--dest', dest, '-j', '4']) == 0
+    assert fetch.main(['--verify', '--dest', dest]) == 0
+    assert fetch.verify(dest) == []
+
+    #a second run finds every table current
+    status = fetch.fetch(mirror=mirror, dest=dest)
+    assert set(status) == set(manifest)
+    assert set(status.values()) == {'current'}
+
+    #a corrupted table fails verification and is downloaded again
+    relpath = sorted(manifest)[0]
+    with open(os.path.join(dest, relpath), 'ab') as f:
+        f.write(b'0')
+    capsys.readouterr()
+    assert fetch.main(['--verify', '--dest', dest]) == 1
+    assert 'MISMATCH {0}'.format(relpath) in capsys.readouterr().out
+    assert fetch.fetch([relpath], mirror=mirror, dest=dest) == {relpath: 'downloaded'}
+    assert fetch.verify(dest) == []
+
+
+def test_fetch_rejects_mismatch(mirror, tmp_path):
+    dest = str(tmp_path)
+    manifest = fetch.load_manifest()
+    relpath = sorted(manifest)[0]
+    entry = dict(manifest[relpath], sha256='0'*64)
+
+    with pytest.raises(IOError, match='does not match the data manifest'):
+        fetch.fetch(mirror=mirror, dest=dest, retries=0, manifest={relpath: entry})
+    #nothing is left behind in the data tree
+    assert os.listdir(os.path.join(dest, os.path.dirname(relpath))) == []
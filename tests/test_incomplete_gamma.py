@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+
+"""
+upper incomplete gamma function against mpmath
+"""
+
+from __future__ import (division, print_function, absolute_import, unicode_literals)
+import numpy as np
+import pytest
+from ..incomplete_gamma import upper_incomplete_gamma
+
+mpmath = pytest.importorskip('mpmath')
+
+
+def test_upper_incomplete_gamma():
+    s = np.concatenate([np.linspace(-2.95, 2.95, 60),
+                        [-1e-9, -1e-6, 1e-9, -1.0 + 1e-9, -1.0 - 1e-9, -2.0 + 1e-7, -2.0 - 1e-12]])
+    x = np.array([1e-8, 1e-3, 0.3, 0.56, 1.0, 1.5, 5.0, 30.0])
+    G = upper_incomplete_gamma(s[:,None], x[None,:])
+
+    with mpmath.workdps(40):
+        expected = np.array([[float(mpmath.gammainc(mpmath.mpf(si), mpmath.mpf(xj))) for xj in x]
+                             for si in s])
+    assert np.allclose(G, expected, rtol=2e-13, atol=0)
+
+
+def test_limits():
+    assert upper_incomplete_gamma(-0.5, 0.0) == np.inf
+    assert upper_incomplete_gamma(-0.5, np.inf) == 0.0
+    assert upper_incomplete_gamma(0.0, 1.0) == pytest.approx(0.21938393439552029, rel=1e-15)
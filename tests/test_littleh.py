@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+
+"""
+conversion of measurements and models between values of little h
+"""
+
+from __future__ import (division, print_function, absolute_import, unicode_literals)
+import numpy as np
+from .. import luminosity_functions
+from ..watson_2014_delta_sigma import watson_2014_wp_delta_sigma
+
+H = np.array([0.6, 0.7, 1.0])
+
+
+def test_number_density_h():
+    phi = luminosity_functions.Blanton_2003_phi()
+    a = -23.0
+    b = np.array([-21.0, -20.0, -19.0, -18.0])
+    n = phi.number_density(a, b, h=H)
+    assert n.shape == H.shape + b.shape
+    for n_h, h in zip(n, H):
+        assert np.allclose(n_h, phi.number_density(a, b, h=h), rtol=1e-14, atol=0)
+    #magnitudes in units of h, converted by hand
+    shift = 5.0*np.log10(H[0])
+    assert np.allclose(n[0], phi.number_density(a - shift, b - shift)*H[0]**3,
+                       rtol=1e-14, atol=0)
+    assert np.allclose(n[-1], phi.number_density(a, b), rtol=1e-14, atol=0)
+
+
+def test_wp_delta_sigma_h():
+    result = watson_2014_wp_delta_sigma(h=H)
+    assert [x.shape[:1] for x in result] == [H.shape]*4
+    for i, h in enumerate(H):
+        for x, y in zip(result, watson_2014_wp_delta_sigma(h=h)):
+            assert np.allclose(x[i], y, rtol=1e-14, atol=0)
+    rp_wp, rp_delta_sigma, data, cov = watson_2014_wp_delta_sigma()
+    n = len(rp_wp)
+    s = np.concatenate([np.full(n, H[0]**-1), np.full(len(data) - n, H[0])])
+    assert np.allclose(result[2][0], data*s, rtol=1e-14, atol=0)
+    assert np.allclose(result[3][0], cov*np.outer(s, s), rtol=1e-14, atol=0)
+    assert np.allclose(result[3][-1], cov, rtol=1e-14, atol=0)
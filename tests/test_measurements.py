@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+
+"""
+the shipped measurements
+"""
+
+from __future__ import (division, print_function, absolute_import, unicode_literals)
+import os
+import numpy as np
+import pytest
+from .. import binary_store, catalog
+
+
+@pytest.mark.parametrize('entry', catalog.catalog.entries,
+                         ids=lambda e: '{0}-{1}-{2}-{3}'.format(e.paper, e.sample, e.method, e.lo))
+def test_measurement_is_finite(entry):
+    measurement = catalog.load(entry)
+    for a in (measurement if isinstance(measurement, tuple) else (measurement,)):
+        assert np.all(np.isfinite(np.asarray(a)))
+
+
+def test_tables_parse():
+    for relpath in binary_store.source_files():
+        path = os.path.join(binary_store._package_dir, relpath)
+        values, row_lengths = binary_store.parse_table(path)
+        assert len(values) == sum(row_lengths)
+
+
+def test_malformed_value(tmp_path):
+    path = tmp_path / 'table.dat'
+    path.write_text('#r_p wp\n0.17 3158\n0.67 525.5.9\n')
+    with pytest.raises(ValueError, match="'525.5.9' on line 3"):
+        binary_store.parse_table(str(path))
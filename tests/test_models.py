@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+
+"""
+methods shared by the stellar mass and luminosity functions
+"""
+
+from __future__ import (division, print_function, absolute_import, unicode_literals)
+import numpy as np
+import pytest
+from .. import luminosity_functions, sampling, stellar_mass_functions
+
+MODELS = [stellar_mass_functions.LiWhite_2009_phi, stellar_mass_functions.Baldry_2011_phi,
+          stellar_mass_functions.Yang_2012_phi, stellar_mass_functions.Tomczak_2014_phi,
+          luminosity_functions.Blanton_2003_phi]
+
+
+@pytest.mark.parametrize('model', MODELS, ids=lambda m: m.__name__)
+def test_sample(model):
+    phi = model()
+    x = phi.sample(1000, seed=1)
+    assert x.shape == (1000,)
+    assert np.array_equal(x, sampling.sample(phi, 1000, seed=1))
+
+
+@pytest.mark.parametrize('model', MODELS, ids=lambda m: m.__name__)
+def test_evaluate(model):
+    if model is luminosity_functions.Blanton_2003_phi:
+        #the Schechter fit is evaluated by the optional astro_utils
+        phi = model(mode='tabulated')
+    else:
+        phi = model()
+    x = phi.sample(1000, seed=2).reshape(10, 100)
+    out = phi.evaluate(x, chunk_size=64, workers=2)
+    assert out.shape == x.shape
+    assert np.allclose(out, phi(x), rtol=1e-14, atol=0, equal_nan=True)
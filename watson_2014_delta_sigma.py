@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+
+"""
+galaxy-galaxy lensing measurements from Watson et al. 2014.
+"""
+
+from __future__ import print_function, division
+import numpy as np
+from .measurement_registry import registry
+from .littleh import convert_measurement, WP_UNITS, DELTA_SIGMA_UNITS
+from .covariance import Covariance
+from .binary_store import get_table
+from .catalog import find
+from .watson_2014_wp import watson_2014_wp
+
+__all__ = ['watson_2014_delta_sigma', 'watson_2014_wp_delta_sigma']
+
+
+def watson_2014_delta_sigma(mstar_thresh=10**9.49, sample='all', h=None):
+    """
+    excess surface density measurements from Watson et al. 2014
+
+    http://arxiv.org/abs/1403.1578
+
+    Parameters
+    ----------
+    mstar_thresh : float
+         minimum stellar mass of the threshold sample in :math:`h^{-2}M_{\odot}`
+         e.g. 9.49, 9.89, 10.29 (converted to h=1).
+
+    sample : string
+        string indicating sample used in the measurement:
+        e.g. 'all', 'red', 'blue'.
+
+    h : float or array_like, optional
+        if given, the measurement is converted from h=1 units to this value
+        of h, see `littleh.convert_measurement`.  An array of h values adds
+        a leading axis of the same shape.
+
+    Returns
+    -------
+    measurement : numpy.ndarray
+        array of shape (2,24), where the first row is rp in :math:`h^{-1}` kpc
+        and the second row is Delta Sigma in :math:`hM_{\odot}pc^{-2}`.
+
+    err : numpy.array
+        error on the Delta Sigma measurement
+
+    Notes
+    -----
+    Measurements are cached in `lss_observations.measurement_registry.registry`
+    after the first call and the returned arrays are read-only.  Copy them
+    before modifying in place.
+    """
+
+    filename, column, mstar_thresh = _select(mstar_thresh, sample)
+
+    key = ('watson_2014_delta_sigma', sample, mstar_thresh, None)
+    measurement = registry.get(key, lambda: _load_delta_sigma(filename, column))
+    if h is not None:
+        return convert_measurement(measurement, h, DELTA_SIGMA_UNITS)
+    return measurement
+
+
+def watson_2014_wp_delta_sigma(mstar_thresh=10**9.49, sample='all', h=None):
+    """
+    joint wp and Delta Sigma data vector from Watson et al. 2014
+
+    Parameters
+    ----------
+    mstar_thresh : float
+         minimum stellar mass of the threshold sample in :math:`h^{-2}M_{\odot}`
+         e.g. 9.49, 9.89, 10.29 (converted to h=1).
+
+    sample : string
+        'all', 'red', 'blue'
+
+    h : float or array_like, optional
+        if given, each part of the data vector is converted from h=1 units to
+        this value of h, see `littleh.convert_measurement`.  An array of h
+        values adds a leading axis of the same shape to every returned array.
+
+    Returns
+    -------
+    rp_wp : numpy.ndarray
+        array of shape (15,) of the rp of the wp measurement
+
+    rp_delta_sigma : numpy.ndarray
+        array of shape (24,) of the rp of the Delta Sigma measurement
+
+    data : numpy.ndarray
+        contiguous array of shape (39,) of wp followed by Delta Sigma
+
+    covariance : Covariance
+        block diagonal (here diagonal) covariance matrix of shape (39,39)
+        of `data`.  For an array of h values a plain array of shape
+        h.shape + (39,39).
+
+    Notes
+    -----
+    The joint data vector is cached, so a combined clustering and lensing
+    likelihood costs one solve per evaluation, for one model or a stack of
+    models of shape (n_walkers, 39)::
+
+        model = np.concatenate([wp_model(rp_wp), ds_model(rp_delta_sigma)], axis=-1)
+        chi2 = covariance.mahalanobis(model - data)
+
+    The same data vector is used by `likelihood.chi_square` when given
+    ``[watson_2014_wp(...), watson_2014_delta_sigma(...)]``.
+    """
+
+    filename, column, mstar_thresh = _select(mstar_thresh, sample)
+
+    def load():
+        from .likelihood import data_vector
+        wp = watson_2014_wp(10**mstar_thresh, sample)
+        delta_sigma = watson_2014_delta_sigma(10**mstar_thresh, sample)
+        data, cov, mask = data_vector([wp, delta_sigma])
+        if not mask.all():
+            msg = ("joint data vector contains non-finite values.")
+            raise ValueError(msg)
+        return wp[0][0], delta_sigma[0][0], data, cov
+
+    key = ('watson_2014', sample, mstar_thresh, 'wp+delta_sigma')
+    rp_wp, rp_delta_sigma, data, cov = registry.get(key, load)
+    if h is None:
+        return rp_wp, rp_delta_sigma, data, cov
+
+    #convert the two parts with their own units, the converted unit errors
+    #are the factors scaling the rows and columns of the covariance
+    n = len(rp_wp)
+    wp, s_wp = convert_measurement((np.stack([rp_wp, data[:n]]), np.ones(n)),
+                                   h, WP_UNITS)
+    delta_sigma, s_delta_sigma = convert_measurement(
+        (np.stack([rp_delta_sigma, data[n:]]), np.ones(len(data) - n)),
+        h, DELTA_SIGMA_UNITS)
+    s = np.concatenate([s_wp, s_delta_sigma], axis=-1)
+    data = np.concatenate([wp[..., 1, :], delta_sigma[..., 1, :]], axis=-1)
+    converted = np.asarray(cov)*s[..., :, None]*s[..., None, :]
+    if np.ndim(h) == 0:
+        converted = Covariance(converted, name=cov.name)
+    return wp[..., 0, :], delta_sigma[..., 0, :], data, converted
+
+
+def _select(mstar_thresh, sample):
+    """
+    return the file, column and log10 threshold of a sample
+    """
+
+    #the thresholds of h=0.7 converted to h=1
+    entry = find('watson_2014_delta_sigma', sample, mstar_thresh, None)
+    filename, column = entry.source
+    return filename, column, entry.lo
+
+
+def _load_delta_sigma(filename, column):
+    """
+    read the Delta Sigma measurement and errors stored in `column` of `filename`
+    """
+
+    #read in data
+    data = get_table('delta_sigma_measurements/watson_2014/'+filename)
+
+    rp = data[:,0]
+    delta_sigma = data[:,column]
+    sigma = data[:,column+1]
+
+    measurement = np.vstack((rp,delta_sigma))
+
+    return measurement, sigma
@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+
+"""
+resample wp measurements and model predictions onto other rp grids
+"""
+
+from __future__ import (division, print_function, absolute_import, unicode_literals)
+import numpy as np
+from .covariance import Covariance
+from .measurement_registry import MeasurementRegistry
+
+__all__ = ['WpInterpolator', 'interpolator', 'loglog_interp']
+
+#bracketing indices and weights of pairs of rp grids
+_segments = MeasurementRegistry(maxsize=256, name='interpolation_segments')
+
+#interpolators of the measurements, keyed by the identity of the inputs
+_interpolators = MeasurementRegistry(maxsize=256, name='interpolators')
+
+
+class WpInterpolator(object):
+    """
+    log-log interpolator of one wp measurement
+
+    wp is interpolated linearly in (log rp, log wp), and linearly in
+    (log rp, wp) on intervals where wp is not positive.  Interpolation is a
+    linear map of the measured values, up to the log-log linearization, so
+    the covariance matrix is propagated with the same resampling weights.
+    The weights of each target grid are computed once and cached.
+
+    Examples
+    --------
+    >>> from lss_observations import zehavi_2011_wp
+    >>> from lss_observations.wp_interpolation import interpolator
+    >>> f = interpolator(zehavi_2011_wp(-21.0, -20.0))
+    >>> wp, cov = f.resample(rp_simulation)
+    """
+
+    def __init__(self, rp, wp, cov=None, extrapolate=False, maxsize=64):
+        """
+        Parameters
+        ----------
+        rp : array_like
+            increasing array of shape (n,) of projected radii
+
+        wp : array_like
+            array of shape (n,) of wp values
+
+        cov : array_like, optional
+            covariance matrix of shape (n,n), or errors of shape (n,)
+
+        extrapolate : bool
+            if False, values outside the range of `rp` are NaN.  Otherwise
+            the first and last intervals are extended.
+
+        maxsize : int
+            number of target grids whose weights are cached
+        """
+
+        self.rp = np.asarray(rp, dtype=np.float64)
+        self.wp = np.asarray(wp, dtype=np.float64)
+        if self.rp.ndim != 1 or self.rp.shape != self.wp.shape or len(self.rp) < 2:
+            msg = ("rp and wp must be one dimensional arrays of the same length >= 2.")
+            raise ValueError(msg)
+        if not np.all(np.diff(self.rp) > 0):
+            msg = ("rp must be strictly increasing.")
+            raise ValueError(msg)
+
+        if cov is not None:
+            if np.ndim(cov) == 1:
+                cov = Covariance.from_errors(cov)
+            elif not isinstance(cov, Covariance):
+                cov = Covariance(cov)
+            if cov.shape[0] != len(self.rp):
+                msg = ("covariance matrix does not match the length of wp.")
+                raise ValueError(msg)
+        self.cov = cov
+        self.extrapolate = extrapolate
+        self._weights = MeasurementRegistry(maxsize=maxsize, name='interpolation_weights')
+
+    def weights(self, rp_new):
+        """
+        resampling weights onto a grid
+
+        Parameters
+        ----------
+        rp_new : array_like
+            array of shape (..., m) of target radii, e.g. (n_grids, m)
+
+        Returns
+        -------
+        index : numpy.ndarray
+            integer array of shape (..., m, 2) of the measured points each
+            target point depends on
+
+        weights : numpy.ndarray
+            array of shape (..., m, 2), d wp(rp_new) / d wp(rp[index])
+
+        wp_new : numpy.ndarray
+            interpolated wp of shape (..., m)
+        """
+
+        rp_new = np.asarray(rp_new, dtype=np.float64)
+        key = (rp_new.shape, rp_new.tobytes())
+        return self._weights.get(key, lambda: self._compute_weights(rp_new))
+
+    def matrix(self, rp_new):
+        """
+        dense resampling matrix of shape (..., m, n), the Jacobian of the
+        interpolated wp with respect to the measured wp
+        """
+
+        index, w, wp_new = self.weights(rp_new)
+        m = np.zeros(index.shape[:-1] + (len(self.rp),))
+        np.put_along_axis(m, index[..., :1], w[..., :1], axis=-1)
+        np.put_along_axis(m, index[..., 1:], w[..., 1:], axis=-1)
+        return m
+
+    def __call__(self, rp_new):
+        """
+        interpolated wp of shape (..., m) at `rp_new`
+        """
+        return self.weights(rp_new)[2]
+
+    def covariance(self, rp_new):
+        """
+        covariance matrix of the interpolated wp
+
+        Returns
+        -------
+        cov : numpy.ndarray
+            array of shape (..., m, m)
+        """
+
+        if self.cov is None:
+            msg = ("the interpolator was built without a covariance matrix.")
+            raise ValueError(msg)
+
+        #sum over the two points each target point depends on, so that
+        #masked (NaN) entries of the covariance do not leak into other rows
+        index, w, wp_new = self.weights(rp_new)
+        c = self.cov.array[index[..., :, :, None, None], index[..., None, None, :, :]]
+        return np.einsum('...ak,...bl,...akbl->...ab', w, w, c)
+
+    def resample(self, rp_new):
+        """
+        interpolated wp and its covariance matrix
+
+        Returns
+        -------
+        wp : numpy.ndarray
+            array of shape (..., m)
+
+        cov : numpy.ndarray
+            array of shape (..., m, m)
+        """
+        return self(rp_new), self.covariance(rp_new)
+
+    def _compute_weights(self, rp_new):
+        lo, t = _segment(self.rp, rp_new, self.extrapolate)
+        yi = self.wp[lo]
+        yj = self.wp[lo+1]
+        wp_new, positive = _interp(yi, yj, t)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            w_lo = np.where(positive, (1.0-t)*wp_new/yi, 1.0-t)
+            w_hi = np.where(positive, t*wp_new/yj, t)
+        index = np.stack([lo, lo+1], axis=-1)
+        w = np.stack([w_lo, w_hi], axis=-1)
+        return index, w, wp_new
+
+
+def interpolator(measurement, extrapolate=False):
+    """
+    cached `WpInterpolator` of a measurement returned by one of the loaders
+
+    Parameters
+    ----------
+    measurement : tuple
+        (measurement, covariance) or (measurement, err) as returned by the wp
+        loaders, or a bare measurement array of shape (2,n)
+
+    extrapolate : bool
+        see `WpInterpolator`
+
+    Returns
+    -------
+    f : WpInterpolator
+
+    Notes
+    -----
+    Interpolators are cached on the identity of the inputs, like
+    `likelihood.data_vector`, so repeated calls with the (cached) objects
+    returned by the loaders return the same interpolator.
+    """
+
+    if isinstance(measurement, tuple):
+        data, err = measurement
+        key = (id(data), id(err), extrapolate)
+    else:
+        data, err = measurement, None
+        key = (id(data), None, extrapolate)
+
+    def build():
+        f = WpInterpolator(data[0], data[1], err, extrapolate=extrapolate)
+        #hold a reference to the inputs so the ids used in the key stay valid
+        f._refs = measurement
+        return f
+
+    return _interpolators.get(key, build)
+
+
+def loglog_interp(rp_new, rp, wp, extrapolate=False):
+    """
+    interpolate wp linearly in (log rp, log wp), a drop-in for `numpy.interp`
+
+    Parameters
+    ----------
+    rp_new : array_like
+        array of shape (m,) of target radii
+
+    rp : array_like
+        increasing array of shape (n,) of radii `wp` is sampled at
+
+    wp : array_like
+        array of shape (..., n), e.g. (n_walkers, n) model predictions on
+        fixed simulation bins.  Intervals where wp is not positive are
+        interpolated linearly in (log rp, wp).
+
+    extrapolate : bool
+        if False, values outside the range of `rp` are NaN
+
+    Returns
+    -------
+    wp_new : numpy.ndarray
+        array of shape (..., m)
+
+    Notes
+    -----
+    The bracketing indices and weights of each pair of grids are computed
+    once and cached, so for fixed grids each call costs a gather and a few
+    elementwise operations.
+    """
+
+    rp = np.asarray(rp, dtype=np.float64)
+    rp_new = np.asarray(rp_new, dtype=np.float64)
+    wp = np.asarray(wp, dtype=np.float64)
+    if wp.shape[-1] != len(rp):
+        msg = ("the last axis of wp must have the length of rp.")
+        raise ValueError(msg)
+
+    key = (rp.tobytes(), rp_new.shape, rp_new.tobytes(), extrapolate)
+    lo, t = _segments.get(key, lambda: _segment(rp, rp_new, extrapolate))
+    return _interp(wp[..., lo], wp[..., lo+1], t)[0]
+
+
+def _segment(rp, rp_new, extrapolate):
+    """
+    index of the interval containing each target point and the fractional
+    position in log rp
+    """
+
+    x = np.log(rp)
+    x_new = np.log(rp_new)
+    lo = np.clip(np.searchsorted(x, x_new, side='right') - 1, 0, len(x) - 2)
+    t = (x_new - x[lo])/(x[lo+1] - x[lo])
+    if not extrapolate:
+        t = np.where((x_new < x[0]) | (x_new > x[-1]), np.nan, t)
+    return lo, t
+
+
+def _interp(yi, yj, t):
+    positive = (yi > 0) & (yj > 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        loglog = np.exp((1.0-t)*np.log(yi) + t*np.log(yj))
+    linear = yi + t*(yj - yi)
+    return np.where(positive, loglog, linear), positive
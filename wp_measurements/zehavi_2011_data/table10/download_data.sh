@@ -1,8 +0,0 @@
-#!/bin/bash  
-
-curl -O "http://astroweb.cwru.edu/izehavi/dr7_covar/table10/wp_covar_18.0_17.0_mred.dat"
-curl -O "http://astroweb.cwru.edu/izehavi/dr7_covar/table10/wp_covar_19.0_18.0_mred.dat"
-curl -O "http://astroweb.cwru.edu/izehavi/dr7_covar/table10/wp_covar_20.0_19.0_mred.dat"
-curl -O "http://astroweb.cwru.edu/izehavi/dr7_covar/table10/wp_covar_21.0_20.0_mred.dat"
-curl -O "http://astroweb.cwru.edu/izehavi/dr7_covar/table10/wp_covar_22.0_21.0_mred.dat"
-curl -O "http://astroweb.cwru.edu/izehavi/dr7_covar/table10/wp_covar_23.0_23.0_mred.dat"
\ No newline at end of file
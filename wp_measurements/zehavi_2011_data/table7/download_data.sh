@@ -1,8 +0,0 @@
-#!/bin/bash  
-
-curl -O "http://astroweb.cwru.edu/izehavi/dr7_covar/table7/wp_covar_18.0_17.0.dat"
-curl -O "http://astroweb.cwru.edu/izehavi/dr7_covar/table7/wp_covar_19.0_18.0.dat"
-curl -O "http://astroweb.cwru.edu/izehavi/dr7_covar/table7/wp_covar_20.0_19.0.dat"
-curl -O "http://astroweb.cwru.edu/izehavi/dr7_covar/table7/wp_covar_21.0_20.0.dat"
-curl -O "http://astroweb.cwru.edu/izehavi/dr7_covar/table7/wp_covar_22.0_21.0.dat"
-curl -O "http://astroweb.cwru.edu/izehavi/dr7_covar/table7/wp_covar_23.0_22.0.dat"
\ No newline at end of file
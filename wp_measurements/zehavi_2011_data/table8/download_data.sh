@@ -1,11 +0,0 @@
-#!/bin/bash  
-
-curl -O "http://astroweb.cwru.edu/izehavi/dr7_covar/table8/wp_covar_18.0.dat"
-curl -O "http://astroweb.cwru.edu/izehavi/dr7_covar/table8/wp_covar_18.5.dat"
-curl -O "http://astroweb.cwru.edu/izehavi/dr7_covar/table8/wp_covar_19.0.dat"
-curl -O "http://astroweb.cwru.edu/izehavi/dr7_covar/table8/wp_covar_19.5.dat"
-curl -O "http://astroweb.cwru.edu/izehavi/dr7_covar/table8/wp_covar_20.0.dat"
-curl -O "http://astroweb.cwru.edu/izehavi/dr7_covar/table8/wp_covar_20.5.dat"
-curl -O "http://astroweb.cwru.edu/izehavi/dr7_covar/table8/wp_covar_21.0.dat"
-curl -O "http://astroweb.cwru.edu/izehavi/dr7_covar/table8/wp_covar_21.5.dat"
-curl -O "http://astroweb.cwru.edu/izehavi/dr7_covar/table8/wp_covar_22.0.dat"
\ No newline at end of file
@@ -7,15 +7,18 @@ projected two point correlation function measurements from Yang et al. 2012
 """
 
 from __future__ import print_function, division
-from astropy.table import Table
-from astropy.io import ascii
-import os
 import numpy as np
+from .measurement_registry import registry
+from .littleh import convert_measurement, WP_UNITS
+from .covariance import Covariance
+from .binary_store import get_values
+from .catalog import find
+from .stacking import stack_measurements
 
-__all__ = ['yang_2012_wp']
+__all__ = ['yang_2012_wp', 'yang_2012_wp_bins']
 __author__=['Duncan Campbell']
 
-def yang_2012_wp(min_mstar=10**9.0, max_mstar=10**9.5, sample='Volume1'):
+def yang_2012_wp(min_mstar=10**9.0, max_mstar=10**9.5, sample='Volume1', h=None):
     """
     projected two point correlation function measurements from Yang et al. 2012
     
@@ -33,68 +36,107 @@ def yang_2012_wp(min_mstar=10**9.0, max_mstar=10**9.5, sample='Volume1'):
         string indicating sample used in the wp calculation:
         e.g. 'Volume1', 'Volume2', 'Mass-limit'.
     
+    h : float or array_like, optional
+        if given, the measurement is converted from h=1 units to this value
+        of h, see `littleh.convert_measurement`.  An array of h values adds
+        a leading axis of the same shape.
+    
     Returns
     -------
     measurement : numpy.ndarray
         array of shape (2,14), where the first row is rp in :math:`h^-1` Mpc, and 
         the second row is wp in :math:`h^-1` Mpc.
     
-    covariance : numpy.matrix
-        matrix of shape (14,14) of covariances between the ith and jth rp
-        measurments of wp 
+    covariance : Covariance
+        array of shape (14,14) of covariances between the ith and jth rp
+        measurments of wp.  The Cholesky factor, precision matrix and
+        log-determinant are cached on the object, see `Covariance`.
+    
+    Notes
+    -----
+    Measurements are cached in `lss_observations.measurement_registry.registry`
+    after the first call and the returned arrays are read-only.  Copy them
+    before modifying in place.
+    
+    The covariance matrices of four bins as published are not positive
+    definite: 10.0 < log10(mstar) < 10.5 and 10.5 < log10(mstar) < 11.0 of
+    the 'Volume1' and 'Mass-limit' samples, with smallest eigenvalues from
+    -2.7e-4 to -8.7e-3.  Their Cholesky factor, and so
+    `likelihood.chi_square`, raise a ValueError.  Use
+    `Covariance.regularize` or leave these bins out of the fit.
     """
     
-    #get files for specified sample
-    if sample == 'Volume1':
-        filenames = ['xi01.dat','xi02.dat','xi03.dat','xi04.dat','xi05.dat']
-    elif sample == 'Volume2':
-        filenames = ['xi06.dat','xi07.dat','xi08.dat','xi09.dat','xi10.dat']
-    elif sample == 'Mass-limit':
-        filenames = ['xi11.dat','xi12.dat','xi13.dat','xi14.dat','xi15.dat']
-    else:
-        msg = ("sample not recognized.")
-        raise ValueError(msg)
-    
-    min_mstar = np.log10(min_mstar)
-    max_mstar = np.log10(max_mstar)
-    mass_bin = (min_mstar,max_mstar)
-    
-    #get files for specified stellar mass bin
-    if mass_bin==(9.0,9.5):
-        filename = filenames[0]
-    elif mass_bin==(9.5,10.0):
-        filename = filenames[1]
-    elif mass_bin==(10.0,10.5):
-        filename = filenames[2]
-    elif mass_bin==(10.5,11.0):
-        filename = filenames[3]
-    elif mass_bin==(11.0,11.5):
-        filename = filenames[4]
-    else:
-        msg = ("requested mass bin not available.")
-        raise ValueError(msg)
-    
-    #read in data
-    filepath = os.path.dirname(__file__)
-    filepath = os.path.join(filepath,'wp_measurements/yang_2012_data/')
-    wp_data = ascii.read(filepath+filename, data_start=1, data_end = 15)
-    cov_data = ascii.read(filepath+filename, data_start=15, data_end = 29)
-    
-    rp = np.array(wp_data.columns[0])
-    wp = np.array(wp_data.columns[1])
-    sigma = np.array(wp_data.columns[2])
-    
-    measurement = np.vstack((rp,wp))
-    
-    #create covariance matrix
-    cov = np.array([cov_data[c] for c in cov_data.columns])
-    
-    N = len(wp)
-    for i in range(0,N):
-        for j in range(0,N):
-            cov[i,j] = wp[i]*wp[j]*cov[i,j]
-    cov = np.matrix(cov)
+    #get file for specified sample and stellar mass bin
+    entry = find('yang_2012', sample, min_mstar, max_mstar)
+    filename = entry.source
+    mass_bin = (entry.lo, entry.hi)
+    
+    key = ('yang_2012', sample, mass_bin, None)
+    name = 'yang_2012 {0} {1:.1f} < log10(mstar) < {2:.1f}'.format(sample, entry.lo, entry.hi)
+    measurement = registry.get(key, lambda: _load_wp(filename, name))
+    if h is not None:
+        return convert_measurement(measurement, h, WP_UNITS)
+    return measurement
+
+
+def yang_2012_wp_bins(sample='Volume1'):
+    """
+    all stellar mass bins of a sample from Yang et al. 2012 in one call
     
-    return measurement, cov
+    Parameters
+    ----------
+    sample : string
+        'Volume1', 'Volume2', 'Mass-limit'
+    
+    Returns
+    -------
+    rp : numpy.ndarray
+        array of shape (14,) of rp in :math:`h^-1` Mpc
+    
+    wp : numpy.ndarray
+        array of shape (5,14) of wp in :math:`h^-1` Mpc
+    
+    covariance : numpy.ndarray
+        array of shape (5,14,14) of covariance matrices
+    
+    bins : numpy.ndarray
+        array of shape (5,2) of (min_mstar, max_mstar) of each bin in
+        :math:`h^{-2}M_{\odot}`
     
-    
\ No newline at end of file
+    Notes
+    -----
+    Each bin is the cached measurement returned by `yang_2012_wp`.  The
+    stacked arrays are cached and read-only.
+    """
+    
+    bins = [(10**lo, 10**(lo+0.5)) for lo in (9.0, 9.5, 10.0, 10.5, 11.0)]
+    
+    def load():
+        rp, wp, cov = stack_measurements([yang_2012_wp(min_mstar, max_mstar, sample)
+                                          for min_mstar, max_mstar in bins])
+        return rp, wp, cov, np.array(bins)
+    
+    key = ('yang_2012', sample, 'bins', None)
+    return registry.get(key, load)
+
+
+def _load_wp(filename, name):
+    """
+    read the wp measurement and covariance matrix stored in `filename`
+    """
+    
+    #read in data, the first row holds the bin edges and number of rp bins
+    data = get_values('wp_measurements/yang_2012_data/'+filename)
+    wp_data = data[3:45].reshape(14,3)
+    cov_data = data[45:241].reshape(14,14)
+    
+    rp = wp_data[:,0]
+    wp = wp_data[:,1]
+    
+    measurement = wp_data[:,:2].T
+    
+    #create covariance matrix from the correlation coefficients
+    cov = wp[:,np.newaxis]*wp[np.newaxis,:]*cov_data.T
+    cov = Covariance(cov, name=name)
+    
+    return measurement, cov
@@ -7,17 +7,20 @@ projected two point correlation function measurements from Zehavi et al. 2011
 """
 
 from __future__ import print_function, division
-from astropy.table import Table
-from astropy.io import ascii
-import os
 import numpy as np
+from .measurement_registry import registry
+from .littleh import convert_measurement, WP_UNITS
+from .covariance import Covariance
+from .binary_store import get_table, get_values
+from .catalog import find
+from .stacking import stack_measurements
 
 
-__all__ = ['zehavi_2011_wp']
+__all__ = ['zehavi_2011_wp', 'zehavi_2011_wp_bins']
 __author__=['Duncan Campbell']
 
 
-def zehavi_2011_wp(Mr_min = -18.0, Mr_max = -17.0, sample='all'):
+def zehavi_2011_wp(Mr_min = -18.0, Mr_max = -17.0, sample='all', h=None):
     """
     projected two point correlation function measurements from Zehavi et al. 2011
     
@@ -36,143 +39,123 @@ def zehavi_2011_wp(Mr_min = -18.0, Mr_max = -17.0, sample='all'):
     sample : string
         'all', 'red', 'blue'
     
+    h : float or array_like, optional
+        if given, the measurement is converted from h=1 units to this value
+        of h, see `littleh.convert_measurement`.  An array of h values adds
+        a leading axis of the same shape.
+    
     Returns
     -------
     measurement : numpy.ndarray
         array of shape (2,13), where the first row is rp in :math:`h^-1` Mpc, and 
         the second row is wp in :math:`h^-1` Mpc.
     
-    covariance : numpy.matrix
-        matrix of shape (13,13) of covariances between the ith and jth rp
-        measurments of wp 
-    """
+    covariance : Covariance
+        array of shape (13,13) of covariances between the ith and jth rp
+        measurments of wp.  The Cholesky factor, precision matrix and
+        log-determinant are cached on the object, see `Covariance`.
     
-    filepath = os.path.dirname(__file__)
-    filepath = os.path.join(filepath,'wp_measurements/zehavi_2011_data/')
+    Notes
+    -----
+    Measurements are cached in `lss_observations.measurement_registry.registry`
+    after the first call and the returned arrays are read-only.  Copy them
+    before modifying in place.
+    """
     
     #is this a threshold sample
     if Mr_min == None: 
-        threshold=True
-        Mr_max = float(Mr_max)
-        Mbin = (None,Mr_max)
+        entry = find('zehavi_2011', sample, None, Mr_max, method='threshold')
+        Mbin = (None, entry.hi)
     else: 
-        Mr_max = float(Mr_max)
-        Mr_min = float(Mr_min)
-        Mbin = (float(Mr_min),float(Mr_max))
-        threshold=False
-    
-    #get files for specified sample
-    if (sample == 'all') & (not threshold):
-        filepath = filepath = os.path.join(filepath,'table7/')
-        cov_filenames = ['wp_covar_23.0_22.0.dat',
-                         'wp_covar_22.0_21.0.dat',
-                         'wp_covar_21.0_20.0.dat',
-                         'wp_covar_20.0_19.0.dat',
-                         'wp_covar_19.0_18.0.dat',
-                         'wp_covar_18.0_17.0.dat']
-        wp_filename = 'table7.dat'
-    elif (sample == 'all') & (threshold):
-        filepath = filepath = os.path.join(filepath,'table8/')
-        cov_filenames = ['wp_covar_22.0.dat',
-                         'wp_covar_21.5.dat',
-                         'wp_covar_21.0.dat',
-                         'wp_covar_20.5.dat',
-                         'wp_covar_20.0.dat',
-                         'wp_covar_19.5.dat',
-                         'wp_covar_19.0.dat',
-                         'wp_covar_18.5.dat',
-                         'wp_covar_18.0.dat']
-        wp_filename = 'table8.dat'
-    elif (sample == 'blue') & (not threshold):
-        filepath = filepath = os.path.join(filepath,'table9/')
-        cov_filenames = ['wp_covar_23.0_22.0_mblue.dat',
-                         'wp_covar_22.0_21.0_mblue.dat',
-                         'wp_covar_21.0_20.0_mblue.dat',
-                         'wp_covar_20.0_19.0_mblue.dat',
-                         'wp_covar_19.0_18.0_mblue.dat',
-                         'wp_covar_18.0_17.0_mblue.dat']
-        wp_filename = 'table9.dat'
-    elif (sample == 'red') & (not threshold):
-        filepath = filepath = os.path.join(filepath,'table10/')
-        cov_filenames = ['wp_covar_23.0_22.0_mred.dat',
-                         'wp_covar_22.0_21.0_mred.dat',
-                         'wp_covar_21.0_20.0_mred.dat',
-                         'wp_covar_20.0_19.0_mred.dat',
-                         'wp_covar_19.0_18.0_mred.dat',
-                         'wp_covar_18.0_17.0_mred.dat']
-        wp_filename = 'table10.dat'
-    else:
-        msg = ("sample and/or threshold combination not available.")
-        raise ValueError(msg)
-    
-    if Mbin == (-23.0,-22.0): #binned samples
-        cov_filename = cov_filenames[0]
-        wp_col = 1
-    elif Mbin == (-22.0,-21.0):
-        cov_filename = cov_filenames[1]
-        wp_col = 3
-    elif Mbin == (-21.0,-20.0):
-        cov_filename = cov_filenames[2]
-        wp_col = 5
-    elif Mbin == (-20.0,-19.0):
-        cov_filename = cov_filenames[3]
-        wp_col = 7
-    elif Mbin == (-19.0,-18.0):
-        cov_filename = cov_filenames[4]
-        wp_col = 9
-    elif Mbin == (-18.0,-17.0):
-        cov_filename = cov_filenames[5]
-        wp_col = 11
-    elif Mbin == (None,-22.0): #threshold samples
-        cov_filename = cov_filenames[0]
-        wp_col = 1
-    elif Mbin == (None,-21.5):
-        cov_filename = cov_filenames[1]
-        wp_col = 3
-    elif Mbin == (None,-21.0):
-        cov_filename = cov_filenames[2]
-        wp_col = 5
-    elif Mbin == (None,-20.5):
-        cov_filename = cov_filenames[3]
-        wp_col = 7
-    elif Mbin == (None,-20.0):
-        cov_filename = cov_filenames[4]
-        wp_col = 9
-    elif Mbin == (None,-19.5):
-        cov_filename = cov_filenames[5]
-        wp_col = 11
-    elif Mbin == (None,-19.0):
-        cov_filename = cov_filenames[6]
-        wp_col = 13
-    elif Mbin == (None,-18.5):
-        cov_filename = cov_filenames[7]
-        wp_col = 15
-    elif Mbin == (None,-18.0):
-        cov_filename = cov_filenames[8]
-        wp_col = 17
+        entry = find('zehavi_2011', sample, Mr_min, Mr_max)
+        Mbin = (entry.lo, entry.hi)
+    
+    #get files and column of the specified sample and magnitude bin
+    filepath, wp_filename, wp_col, cov_filename = entry.source
+    
+    key = ('zehavi_2011', sample, Mbin, None)
+    measurement = registry.get(key, lambda: _load_wp(filepath, wp_filename, wp_col, cov_filename))
+    if h is not None:
+        return convert_measurement(measurement, h, WP_UNITS)
+    return measurement
+
+
+def zehavi_2011_wp_bins(sample='all', threshold=False):
+    """
+    all magnitude bins of a sample from Zehavi et al. 2011 in one call
+    
+    Parameters
+    ----------
+    sample : string
+        'all', 'red', 'blue'
+    
+    threshold : bool
+        if True, return the threshold samples (only available for 'all')
+        instead of the magnitude bins
+    
+    Returns
+    -------
+    rp : numpy.ndarray
+        array of shape (13,) of rp in :math:`h^-1` Mpc
+    
+    wp : numpy.ndarray
+        array of shape (n_bins,13) of wp in :math:`h^-1` Mpc
+    
+    covariance : numpy.ndarray
+        array of shape (n_bins,13,13) of covariance matrices
+    
+    bins : numpy.ndarray
+        array of shape (n_bins,2) of (Mr_min, Mr_max) of each bin, with
+        Mr_min NaN for threshold samples.  The red and blue samples have no
+        covariance matrix for -23 < Mr < -22 and start at -22.
+    
+    Notes
+    -----
+    The bins share one parsed table, and each bin is the cached measurement
+    returned by `zehavi_2011_wp`.  The stacked arrays are cached and
+    read-only.
+    """
+    
+    if threshold:
+        bins = [(None, Mr_max) for Mr_max in
+                (-22.0, -21.5, -21.0, -20.5, -20.0, -19.5, -19.0, -18.5, -18.0)]
+    elif sample == 'all':
+        bins = [(Mr_min, Mr_min+1.0) for Mr_min in
+                (-23.0, -22.0, -21.0, -20.0, -19.0, -18.0)]
     else:
-        msg = ("sample bin is not available")
-        raise ValueError(msg)
+        #no covariance matrix of the -23 < Mr < -22 bin of the red and blue
+        #samples is available (the download returns an error page)
+        bins = [(Mr_min, Mr_min+1.0) for Mr_min in
+                (-22.0, -21.0, -20.0, -19.0, -18.0)]
+    
+    def load():
+        rp, wp, cov = stack_measurements([zehavi_2011_wp(Mr_min, Mr_max, sample)
+                                          for Mr_min, Mr_max in bins])
+        edges = np.array([(np.nan if Mr_min is None else Mr_min, Mr_max)
+                          for Mr_min, Mr_max in bins])
+        return rp, wp, cov, edges
+    
+    key = ('zehavi_2011', sample, 'threshold bins' if threshold else 'bins', None)
+    return registry.get(key, load)
+
+
+def _load_wp(filepath, wp_filename, wp_col, cov_filename):
+    """
+    read one wp measurement and its covariance matrix
+    """
     
     #open relavent files
     #read in data wp data
-    wp_data = ascii.read(filepath+wp_filename, delimiter  = '\s')
-    rp = wp_data.columns[0]
-    wp = wp_data.columns[wp_col]
+    wp_data = get_table(filepath+wp_filename)
+    rp = wp_data[:,0]
+    wp = wp_data[:,wp_col]
     measurement = np.vstack((rp,wp))
     
-    #read in covariance matrix
-    cov_file= open(filepath+cov_filename)
-    cov_data = cov_file.read()
-    cov_data = cov_data.split()
-    
+    #read in covariance matrix, stored as a flat list of N*N values
     N = len(wp_data)
-    cov = np.zeros((N,N))
-    for i in range(0,N):
-        for j in range(0,N):
-            cov[i,j] = float(cov_data[int(i*N+j)])
+    cov_data = get_values(filepath+cov_filename)
+    cov = cov_data[:N*N].reshape(N,N)
     
-    cov = np.matrix(cov)
+    cov = Covariance(cov)
     
     return measurement, cov
-    
\ No newline at end of file